@@ -0,0 +1,136 @@
+"""
+Query budgets for every route in accounts/urls.py.
+
+Each request runs against datasets of 1, 5 and 20 users (with roles and
+activity records); the number of queries must stay within a fixed budget at
+every size.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.models import Role, UserActivity
+from pulse_news.testing import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class AccountsQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.roles = [Role.objects.get_or_create(name=name)[0] for name in (Role.READER, Role.EDITOR, Role.ADMIN)]
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass12345', role=self.roles[2]
+        )
+        self.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass12345', role=self.roles[0]
+        )
+        self.users = []
+        self.created = 0
+
+    def grow(self, size):
+        while len(self.users) < size:
+            i = self.created
+            self.created += 1
+            user = User.objects.create_user(
+                username=f'user{i}', email=f'user{i}@example.com', password='pass12345',
+                role=self.roles[i % len(self.roles)],
+            )
+            for actor in (user, self.user, self.admin):
+                UserActivity.objects.create(user=actor, action='login', ip_address='127.0.0.1')
+            self.users.append(user)
+
+    # Authentication
+
+    def test_register(self):
+        names = iter(range(100))
+
+        def register():
+            i = next(names)
+            return self.client.post('/api/v1/auth/register/', {
+                'username': f'new{i}', 'email': f'new{i}@example.com', 'password': 'Str0ngPass!',
+                'password2': 'Str0ngPass!', 'first_name': 'New', 'last_name': 'User',
+            }, format='json')
+
+        self.assertQueryBudget(8, register)
+
+    def test_login(self):
+        self.assertQueryBudget(10, lambda: self.client.post(
+            '/api/v1/auth/login/', {'username': 'reader', 'password': 'pass12345'}, format='json'
+        ))
+
+    def issue_token(self):
+        # Refresh tokens are single-use (rotation with blacklisting)
+        self.refresh = RefreshToken.for_user(self.user)
+
+    def test_token_refresh_and_verify(self):
+        self.assertQueryBudget(14, lambda: self.client.post(
+            '/api/v1/auth/token/refresh/', {'refresh': str(self.refresh)}, format='json'
+        ), prepare=self.issue_token)
+        self.assertQueryBudget(1, lambda: self.client.post(
+            '/api/v1/auth/token/verify/', {'token': str(self.refresh.access_token)}, format='json'
+        ), prepare=self.issue_token)
+
+    def test_logout(self):
+        self.client.force_authenticate(self.user)
+        self.assertQueryBudget(8, lambda: self.client.post(
+            '/api/v1/auth/logout/', {'refresh': str(self.refresh)}, format='json'
+        ), prepare=self.issue_token)
+
+    def test_profile(self):
+        self.client.force_authenticate(self.user)
+        self.assertQueryBudget(0, lambda: self.client.get('/api/v1/auth/profile/'))
+        self.assertQueryBudget(2, lambda: self.client.patch(
+            '/api/v1/auth/profile/', {'bio': 'Hello'}, format='json'
+        ))
+
+    def test_profile_delete(self):
+        def sign_in_new_user():
+            self.grow(len(self.users) + 1)
+            self.client.force_authenticate(self.users.pop())
+
+        self.assertQueryBudget(
+            11, lambda: self.client.delete('/api/v1/auth/profile/'), status=204, prepare=sign_in_new_user
+        )
+
+    def test_password_change(self):
+        self.client.force_authenticate(self.user)
+        passwords = iter(['pass12345'] + [f'Next{i}Pass!' for i in range(3)])
+        current = [next(passwords)]
+
+        def change():
+            new = next(passwords)
+            response = self.client.post('/api/v1/auth/password/change/', {
+                'old_password': current[0], 'new_password': new, 'new_password2': new,
+            }, format='json')
+            current[0] = new
+            return response
+
+        self.assertQueryBudget(2, change)
+
+    # Users, roles, activities
+
+    def test_user_list(self):
+        self.client.force_authenticate(self.admin)
+        self.assertQueryBudget(2, lambda: self.client.get('/api/v1/users/'))
+
+    def test_user_detail_and_me(self):
+        self.client.force_authenticate(self.user)
+        self.assertQueryBudget(1, lambda: self.client.get(f'/api/v1/users/{self.admin.username}/'))
+        self.assertQueryBudget(0, lambda: self.client.get('/api/v1/users/me/'))
+
+    def test_my_activities(self):
+        self.client.force_authenticate(self.user)
+        self.assertQueryBudget(1, lambda: self.client.get('/api/v1/users/my_activities/'))
+
+    def test_roles(self):
+        self.assertQueryBudget(2, lambda: self.client.get('/api/v1/roles/'))
+        self.assertQueryBudget(1, lambda: self.client.get(f'/api/v1/roles/{self.roles[0].pk}/'))
+        self.assertQueryBudget(1, lambda: self.client.get('/api/v1/roles/public/'))
+
+    def test_activities(self):
+        self.client.force_authenticate(self.admin)
+        self.assertQueryBudget(2, lambda: self.client.get('/api/v1/activities/'))
+        activity = UserActivity.objects.filter(user=self.user).first()
+        self.client.force_authenticate(self.user)
+        self.assertQueryBudget(1, lambda: self.client.get(f'/api/v1/activities/{activity.pk}/'))
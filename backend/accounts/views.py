@@ -241,7 +241,7 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         """Get current user's activity log."""
         activities = UserActivity.objects.filter(
             user=request.user
-        ).order_by('-created_at')[:50]
+        ).select_related('user__role').order_by('-created_at')[:50]
         
         serializer = UserActivitySerializer(activities, many=True)
         return Response(serializer.data)
@@ -272,7 +272,7 @@ class UserActivityViewSet(viewsets.ReadOnlyModelViewSet):
     Only admins can view all activities.
     Users can view their own activities.
     """
-    queryset = UserActivity.objects.select_related('user').all()
+    queryset = UserActivity.objects.select_related('user__role').all()
     serializer_class = UserActivitySerializer
     permission_classes = [IsAuthenticated]
     
@@ -0,0 +1,77 @@
+"""
+Cost of listing an article's comments with `/comments/?article=`.
+
+Seeds one article with `--threads` top-level comments, each the root of a
+reply chain `--depth` levels deep, and compares the default listing (every
+comment with its nested replies, so deep replies repeat once per ancestor)
+with `mode=flat` and `mode=nested`: time, queries and payload size of
+fetching every page, e.g.:
+
+    python -m benchmarks.bench_comment_modes --threads 20 --depth 10
+"""
+import argparse
+
+from .harness import measure, report, setup_django, test_database
+
+
+def seed(threads, depth):
+    from django.contrib.auth import get_user_model
+    from news.models import Article, Comment
+
+    author = get_user_model().objects.create_user(username='bench', email='bench@example.com', password='pass')
+    article = Article.objects.create(title='Thread', content='Body', author=author, status='published')
+    for thread in range(threads):
+        parent = None
+        for level in range(depth + 1):
+            parent = Comment.objects.create(
+                article=article, author=author, content=f'Comment {thread}.{level}', parent=parent
+            )
+    return article
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=20)
+    parser.add_argument('--depth', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+
+    with test_database():
+        article = seed(args.threads, args.depth)
+        client = APIClient()
+        cases = [
+            ('default (nested per comment)', {}),
+            ('mode=flat', {'mode': 'flat'}),
+            ('mode=nested', {'mode': 'nested'}),
+        ]
+
+        def fetch_all(params):
+            """Follow `next` links; returns the total payload size."""
+            response = client.get('/api/v1/comments/', {'article': article.pk, **params})
+            size = len(response.content)
+            while response.json()['next']:
+                response = client.get(response.json()['next'])
+                size += len(response.content)
+            return size
+
+        rows = []
+        sizes = []
+        for label, params in cases:
+            with CaptureQueriesContext(connection) as queries:
+                size = fetch_all(params)
+            sizes.append((label, len(queries), size))
+            rows.append((label, measure(lambda: fetch_all(params), args.repeat, warmup=2)))
+
+        report(f'Comment listing ({args.threads} threads, {args.depth} levels deep)', rows)
+        print(f"\n{'case':<40}{'queries':>10}{'bytes':>12}")
+        for label, count, size in sizes:
+            print(f'{label:<40}{count:>10}{size:>12}')
+
+
+if __name__ == '__main__':
+    main()
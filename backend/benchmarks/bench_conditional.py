@@ -0,0 +1,52 @@
+"""
+Cost of conditional GETs on the article endpoints.
+
+Compares a full list/detail response with a `304 Not Modified`
+revalidation, which only runs the validator aggregate.
+"""
+import argparse
+
+from .harness import measure, report, setup_django, test_database
+
+
+def seed(articles):
+    from django.utils import timezone
+    from news.models import Article, Category
+
+    category = Category.objects.create(name='Benchmark')
+    now = timezone.now()
+    Article.objects.bulk_create([
+        Article(
+            title=f'Article {i}', slug=f'article-{i}', content='Lorem ipsum ' * 50,
+            category=category, status='published', published_at=now,
+        )
+        for i in range(articles)
+    ], batch_size=1000)
+    return Article.objects.order_by('-pk').values_list('pk', flat=True)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    with test_database(), override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=0):
+        article_id = seed(args.articles)
+        client = APIClient()
+        rows = []
+        for label, url in (('list', '/api/v1/articles/'), ('detail', f'/api/v1/articles/{article_id}/')):
+            etag = client.get(url)['ETag']
+            rows.append((f'{label}: 200 full response', measure(lambda: client.get(url), args.repeat)))
+            rows.append((f'{label}: 304 revalidation', measure(
+                lambda: client.get(url, HTTP_IF_NONE_MATCH=etag), args.repeat
+            )))
+        report(f'Conditional GET ({args.articles} articles)', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Reactions to one hot article from many threads at once.
+
+Each thread likes the article as its own users through `set_reaction` (the
+reaction upsert and the counter update in one transaction), optionally
+holding the transaction open for `--hold-ms` like a longer request would.
+Compares counters on the article row (NEWS_COUNTER_SHARDS=0) with
+`--shards` counter shards: throughput, latency per reaction and the time
+`compact_shards` takes to fold the shards afterwards, e.g.:
+
+    DJANGO_SETTINGS_MODULE=<postgresql settings> \\
+        python -m benchmarks.bench_counter_shards --threads 32 --reactions 100
+
+Needs a database with row-level locking (PostgreSQL); SQLite serializes
+all writers regardless of the rows they touch.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from .harness import setup_django, test_database
+
+
+def seed(label, users):
+    from django.contrib.auth import get_user_model
+    from news.models import Article
+
+    User = get_user_model()
+    author = User.objects.create_user(username=f'{label}-author', email=f'{label}@example.com', password='pass')
+    article = Article.objects.create(title=label, content='Body', author=author, status='published')
+    readers = User.objects.bulk_create(
+        User(username=f'{label}-{i}', email=f'{label}-{i}@example.com', password='!') for i in range(users)
+    )
+    return article, readers
+
+
+def hammer(article, users, threads, hold_ms):
+    """Like `article` as every user from `threads` threads; returns (seconds, latencies in ms)."""
+    from django.db import connection, transaction
+    from news.models import Reaction
+    from news.reactions import set_reaction
+
+    latencies = []
+    errors = []
+    barrier = threading.Barrier(threads)
+
+    def work(chunk):
+        try:
+            barrier.wait()
+            for user in chunk:
+                start = time.perf_counter()
+                with transaction.atomic():
+                    set_reaction(article.pk, user, Reaction.LIKE)
+                    if hold_ms:
+                        time.sleep(hold_ms / 1000)
+                latencies.append((time.perf_counter() - start) * 1000)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=work, args=(users[i::threads],)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if errors:
+        raise errors[0]
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--reactions', type=int, default=100, help='reactions per thread')
+    parser.add_argument('--shards', type=int, default=16)
+    parser.add_argument('--hold-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test import override_settings
+    from news import counters
+
+    if connection.vendor == 'sqlite':
+        parser.error('run against PostgreSQL (set DJANGO_SETTINGS_MODULE)')
+
+    total = args.threads * args.reactions
+    with test_database():
+        rows = []
+        for label, shards in (('article row', 0), (f'{args.shards} shards', args.shards)):
+            article, users = seed(label.replace(' ', '-'), total)
+            with override_settings(NEWS_COUNTER_SHARDS=shards):
+                seconds, latencies = hammer(article, users, args.threads, args.hold_ms)
+                start = time.perf_counter()
+                counters.compact_shards()
+                compact_ms = (time.perf_counter() - start) * 1000
+            article.refresh_from_db()
+            assert article.likes_count == total, (label, article.likes_count, total)
+            rows.append((label, total / seconds, statistics.fmean(latencies),
+                         latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)], compact_ms))
+
+        print(f'\n{total} likes of one article from {args.threads} threads (hold {args.hold_ms} ms)')
+        print(f"{'case':<20}{'likes/s':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'compact ms':>12}")
+        for label, rate, mean, p50, p95, compact_ms in rows:
+            print(f'{label:<20}{rate:>10.0f}{mean:>10.2f}{p50:>10.2f}{p95:>10.2f}{compact_ms:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
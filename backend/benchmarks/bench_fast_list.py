@@ -0,0 +1,80 @@
+"""
+Cost of rendering `/articles/` pages.
+
+Compares ArticleListSerializer + JSONRenderer with the `.values()` fast
+path + ORJSONRenderer, reporting latency, requests/sec and peak memory
+allocated per request.
+"""
+import argparse
+
+from .harness import allocations, measure, report, setup_django, test_database
+
+
+def seed(articles):
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+    from news.models import Article, Category, Tag
+
+    author = get_user_model().objects.create_user(username='bench', email='bench@example.com', password='x')
+    category = Category.objects.create(name='Benchmark')
+    tags = [Tag.objects.create(name=f'tag-{i}') for i in range(3)]
+    now = timezone.now()
+    created = Article.objects.bulk_create([
+        Article(
+            title=f'Article {i}', slug=f'article-{i}', content='Lorem ipsum ' * 50, excerpt='Lorem ipsum',
+            author=author, category=category, status='published', published_at=now,
+        )
+        for i in range(articles)
+    ], batch_size=1000)
+    through = Article.tags.through
+    through.objects.bulk_create([
+        through(article_id=article.pk, tag_id=tag.pk) for article in created for tag in tags
+    ], batch_size=1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=500)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import override_settings
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.test import APIClient
+    from news.renderers import ORJSONRenderer
+    from news.views import ArticleViewSet
+
+    cases = (
+        ('serializer + JSONRenderer', False, JSONRenderer),
+        ('fast path + ORJSONRenderer', True, ORJSONRenderer),
+    )
+    renderer_classes = ArticleViewSet.renderer_classes
+    with test_database(), override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=0):
+        seed(args.articles)
+        client = APIClient()
+        params = {'pagination': 'cursor', 'page_size': args.page_size}
+
+        def request():
+            client.get('/api/v1/articles/', params)
+
+        rows = []
+        memory = []
+        try:
+            for label, fast_path, renderer in cases:
+                ArticleViewSet.renderer_classes = [renderer]
+                with override_settings(NEWS_ARTICLE_LIST_FAST_PATH=fast_path):
+                    rows.append((label, measure(request, args.repeat)))
+                    memory.append(allocations(request))
+        finally:
+            ArticleViewSet.renderer_classes = renderer_classes
+
+        report(f'Article list, {args.page_size} per page ({args.articles} articles)', rows)
+        print(f"\n{'case':<40}{'req/s':>10}{'peak KiB':>10}")
+        for (label, stats), kib in zip(rows, memory):
+            print(f"{label:<40}{1000 / stats['mean']:>10.0f}{kib:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Cost of multi-tag article filtering.
+
+Times the count and first page of `/articles/?tags=...` for 1 to 5 tags with
+the former join + DISTINCT filter and with `ArticleQuerySet.tagged` in
+`any` and `all` mode, e.g.:
+
+    python -m benchmarks.bench_tag_filter --articles 100000 --tags 50
+"""
+import argparse
+import random
+
+from .harness import measure, report, setup_django, test_database
+
+
+def seed(articles, tags, tags_per_article, seed_value=0):
+    from django.utils import timezone
+    from news.models import Article, ArticleTag, Tag
+
+    rng = random.Random(seed_value)
+    tag_ids = [Tag.objects.create(name=f'tag-{i}').pk for i in range(tags)]
+    now = timezone.now()
+    for start in range(0, articles, 5000):
+        created = Article.objects.bulk_create([
+            Article(
+                title=f'Article {i}', slug=f'article-{i}', content='Lorem ipsum ' * 50,
+                status='published', published_at=now,
+            )
+            for i in range(start, min(start + 5000, articles))
+        ])
+        ArticleTag.objects.bulk_create([
+            ArticleTag(article_id=article.pk, tag_id=tag_id)
+            for article in created
+            for tag_id in rng.sample(tag_ids, rng.randint(1, tags_per_article))
+        ], batch_size=5000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=100000)
+    parser.add_argument('--tags', type=int, default=50)
+    parser.add_argument('--tags-per-article', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from news.models import Article
+
+    def page(queryset):
+        queryset = queryset.order_by('-published_at', '-created_at')
+        queryset.count()
+        list(queryset[:12])
+
+    with test_database():
+        seed(args.articles, args.tags, args.tags_per_article)
+        articles = Article.objects.filter(status='published')
+        rows = []
+        for count in range(1, 6):
+            slugs = [f'tag-{i}' for i in range(count)]
+            rows.append((f'{count} tags: join + DISTINCT', measure(
+                lambda: page(articles.filter(tags__slug__in=slugs).distinct()), args.repeat, warmup=2
+            )))
+            rows.append((f'{count} tags: tag_mode=any', measure(
+                lambda: page(articles.tagged(slugs)), args.repeat, warmup=2
+            )))
+            rows.append((f'{count} tags: tag_mode=all', measure(
+                lambda: page(articles.tagged(slugs, match_all=True)), args.repeat, warmup=2
+            )))
+        report(f'Tag filter ({args.articles} articles, {args.tags} tags)', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Shared harness for the benchmarks in this package.
+
+Benchmarks run against a throw-away test database created from the
+configured settings (`pulse_news.settings.test` unless
+DJANGO_SETTINGS_MODULE is set), e.g.:
+
+    cd backend
+    python -m benchmarks.bench_conditional --articles 5000
+"""
+import os
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pulse_news.settings.test')
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database(verbosity=0):
+    """Create the test database for the duration of the block."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity)
+        teardown_test_environment()
+
+
+def measure(func, repeat=200, warmup=10):
+    """Call `func` repeatedly and return timing statistics in milliseconds."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'mean': statistics.fmean(samples),
+        'p50': samples[len(samples) // 2],
+        'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+
+def allocations(func, repeat=20):
+    """Return the mean peak memory traced while calling `func`, in KiB."""
+    func()
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(repeat):
+            tracemalloc.reset_peak()
+            start = tracemalloc.get_traced_memory()[0]
+            func()
+            peaks.append(tracemalloc.get_traced_memory()[1] - start)
+    finally:
+        tracemalloc.stop()
+    return statistics.fmean(peaks) / 1024
+
+
+def report(title, rows):
+    """Print `rows` of (label, stats) as a table."""
+    print(f'\n{title}')
+    print(f"{'case':<40}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for label, stats in rows:
+        print(f"{label:<40}{stats['mean']:>10.3f}{stats['p50']:>10.3f}{stats['p95']:>10.3f}")
@@ -0,0 +1,168 @@
+"""
+Comment trees assembled in memory.
+
+`attach_replies` loads every active reply of the articles the given comments
+belong to in one query (authors and their roles joined, as
+`CommentSerializer` renders them), groups them by parent in a single pass
+and stores each comment's active children on ``_active_replies``. Walking
+the tree from a comment through those lists yields exactly the replies the
+recursive ``replies.filter(is_active=True)`` lookups did: an inactive reply
+hides its whole subtree.
+
+`attach_thread_previews` prepares one level of a lazily expanded thread
+(top-level comments, or the replies of one comment): for the whole level it
+loads the first few active replies of every comment in one window-function
+query and the number of active replies of every comment in another, so a
+page costs the same number of queries whatever its size.
+
+`build_thread` turns one fetch of an article's comments in thread order
+into the tree the nested listing shows, in a single pass.
+
+`backfill_paths` fills the materialized path (`Comment.path`, see
+`CommentQuerySet`) of comments that have none.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F
+from django.db.models.expressions import Window
+from django.db.models.functions import RowNumber
+
+from .models import Comment, comment_path_segment
+
+
+def reply_queryset(article_ids):
+    return (
+        Comment.objects.filter(article_id__in=article_ids, parent__isnull=False, is_active=True)
+        .select_related('author__role')
+    )
+
+
+def reply_queryset_for_parents(parent_ids):
+    return Comment.objects.filter(parent_id__in=parent_ids, is_active=True).select_related('author__role')
+
+
+def attach_replies(comments):
+    """Set ``_active_replies`` on `comments` and all their active descendants."""
+    pending = [comment for comment in comments if not hasattr(comment, '_active_replies')]
+    if not pending:
+        return
+    children = defaultdict(list)
+    replies = list(reply_queryset({comment.article_id for comment in pending}))
+    for reply in replies:
+        children[reply.parent_id].append(reply)
+    for comment in pending:
+        comment._active_replies = children.get(comment.pk, [])
+    for reply in replies:
+        reply._active_replies = children.get(reply.pk, [])
+
+
+def build_thread(comments, hide_inactive=False):
+    """
+    Visible comments of `comments` (one article's, in thread order), in
+    that order, with ``_active_replies`` set on each.
+
+    Replies are kept when active and under a kept comment, like the nested
+    replies of `CommentSerializer`. Comments whose parent is not among
+    `comments` (filtered out by the caller, e.g. ``?parent=``) are listed
+    like top-level ones; those are kept as given, or only when active with
+    `hide_inactive` (inactive rows are then only fetched to hide their
+    replies).
+    """
+    visible = []
+    fetched = set()
+    kept = {}
+    for comment in comments:
+        fetched.add(comment.pk)
+        if comment.parent_id in fetched:
+            if not (comment.is_active and comment.parent_id in kept):
+                continue
+            kept[comment.parent_id]._active_replies.append(comment)
+        elif hide_inactive and not comment.is_active:
+            continue
+        comment._active_replies = []
+        kept[comment.pk] = comment
+        visible.append(comment)
+    return visible
+
+
+def iter_subtree(comment):
+    """`comment` and the replies below it (``_active_replies``), depth-first."""
+    yield comment
+    for reply in comment._active_replies:
+        yield from iter_subtree(reply)
+
+
+def attach_thread_previews(comments, limit):
+    """
+    Set ``reply_count`` and ``_reply_preview`` (the first `limit` active
+    replies, in thread order) on `comments`; the previewed replies get
+    their own ``reply_count`` and an empty preview.
+    """
+    pending = [comment for comment in comments if not hasattr(comment, '_reply_preview')]
+    if not pending:
+        return
+    parent_ids = [comment.pk for comment in pending]
+    previews = []
+    if limit:
+        previews = list(
+            reply_queryset_for_parents(parent_ids)
+            .annotate(position=Window(RowNumber(), partition_by=[F('parent_id')], order_by=F('path').asc()))
+            .filter(position__lte=limit)
+            .order_by('path')
+        )
+    counts = dict(
+        Comment.objects.filter(parent_id__in=parent_ids + [reply.pk for reply in previews], is_active=True)
+        .order_by()
+        .values_list('parent_id')
+        .annotate(total=Count('pk'))
+    )
+    by_parent = defaultdict(list)
+    for reply in previews:
+        by_parent[reply.parent_id].append(reply)
+        reply.reply_count = counts.get(reply.pk, 0)
+        reply._reply_preview = []
+    for comment in pending:
+        comment.reply_count = counts.get(comment.pk, 0)
+        comment._reply_preview = by_parent.get(comment.pk, [])
+
+
+def backfill_paths(model=Comment, batch_size=1000, log=None):
+    """
+    Set `path` and `depth` of every comment without a path; returns how many
+    were updated.
+
+    The table is walked in primary key order, one index range per batch, so
+    parents (created first) normally get their path before their replies.
+    Replies whose parent comes later are picked up by another pass.
+    """
+    updated = 0
+    while True:
+        last_pk = 0
+        progress = 0
+        while True:
+            batch = list(
+                model._base_manager.filter(pk__gt=last_pk, path='')
+                .order_by('pk')
+                .values_list('pk', 'parent_id', 'parent__path', 'parent__depth')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            known = {}
+            changed = []
+            for pk, parent_id, parent_path, parent_depth in batch:
+                if parent_id is not None:
+                    parent_path, parent_depth = known.get(parent_id, (parent_path, parent_depth))
+                    if not parent_path:
+                        continue
+                path = (parent_path or '') + comment_path_segment(pk)
+                depth = parent_depth + 1 if parent_id is not None else 0
+                known[pk] = (path, depth)
+                changed.append(model(pk=pk, path=path, depth=depth))
+            model._base_manager.bulk_update(changed, ['path', 'depth'])
+            progress += len(changed)
+            if log:
+                log(f'Backfilled {updated + progress} comment paths...')
+        updated += progress
+        if not progress:
+            return updated
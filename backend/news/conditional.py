@@ -0,0 +1,133 @@
+"""
+Conditional GET (ETag / Last-Modified) support for read endpoints.
+
+Validators are computed with one aggregate query (or a cache lookup) instead
+of serializing the payload, so `304 Not Modified` responses skip the
+serializers, pagination and the response cache entirely:
+
+* querysets: ``MAX(updated_at)``, ``COUNT(*)`` and the sums of
+  `validator_fields` (denormalized counters change without touching
+  ``updated_at``);
+* small tables such as tags and categories (`versioned = True`): the
+  table generation maintained by `news.response_cache`;
+* lists of views with `get_validator_scopes()` (articles): the
+  `news.response_cache` generations of those scopes, a cache lookup instead
+  of an aggregate over the whole filtered set. Every write that changes the
+  response must bump one of them, as the signals, `news.reactions` and
+  `news.counters` do. Details (one row, which must exist) and lists with
+  extra `get_validator_aggregates()` (the viewer's own reactions and
+  bookmarks) still run the aggregate, with the generations folded in.
+
+The ETag also covers the requesting user, the full path and the negotiated
+media type. From an aggregate, `Last-Modified` reflects row edits only (a
+deletion does not move it), so clients should prefer `If-None-Match`, which
+takes precedence.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import status
+
+from . import response_cache
+
+
+class ConditionalGetMixin:
+    """Adds ETag / Last-Modified validators to `list` and `retrieve`."""
+    validator_fields = ()
+    versioned = False
+
+    def get_validator_queryset(self, queryset):
+        """Rows whose changes affect the response; defaults to `queryset`."""
+        return queryset
+
+    def get_validator_aggregates(self):
+        """Aggregates folded into the ETag besides the defaults."""
+        return {}
+
+    def get_validator_scopes(self):
+        """Response cache scopes whose generations validate the response."""
+        return []
+
+    def get_validators(self, queryset):
+        """Return (values folded into the ETag, last modified datetime or None)."""
+        if self.versioned:
+            generation = response_cache.get_table_generation(queryset.model)
+            return [generation], datetime.fromtimestamp(generation / 1e9, tz=timezone.utc)
+
+        scopes = self.get_validator_scopes()
+        generations = response_cache.get_generations(scopes) if scopes else []
+        bumped = datetime.fromtimestamp(max(generations) / 1e9, tz=timezone.utc) if generations else None
+        extra = self.get_validator_aggregates()
+        if generations and not extra and self.action == 'list':
+            return generations, bumped
+
+        aggregates = {'last_modified': Max('updated_at'), 'count': Count('pk')}
+        for field in self.validator_fields:
+            aggregates[field] = Sum(field)
+        aggregates.update(extra)
+        values = self.get_validator_queryset(queryset).order_by().aggregate(**aggregates)
+        if not values['count']:
+            return None, None
+        last_modified = values['last_modified']
+        if bumped is not None:
+            last_modified = max(last_modified, bumped) if last_modified else bumped
+        return [values[name] for name in sorted(values)] + generations, last_modified
+
+    def make_etag(self, request, seed):
+        raw = '|'.join(map(str, [
+            request.user.pk,
+            request.get_full_path(),
+            request.accepted_media_type,
+            *seed,
+        ]))
+        return '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+    def set_validator_headers(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+
+    def conditional_response(self, request, queryset, handler, *args, **kwargs):
+        seed, last_modified = self.get_validators(queryset)
+        if seed is None:
+            # Nothing to validate against (empty list or missing object)
+            return handler(request, *args, **kwargs)
+
+        etag = self.make_etag(request, seed)
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+        if not_modified is not None:
+            self.on_not_modified(request, *args, **kwargs)
+            response = not_modified
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        self.set_validator_headers(response, etag, last_modified)
+        return response
+
+    def on_not_modified(self, request, *args, **kwargs):
+        """Side effects of the skipped handler that must still happen."""
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(request, queryset, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if not self.versioned:
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            try:
+                queryset = queryset.filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+            except (TypeError, ValueError, ValidationError):
+                # Malformed lookups get the regular 404 from the handler
+                return super().retrieve(request, *args, **kwargs)
+        return self.conditional_response(request, queryset, super().retrieve, *args, **kwargs)
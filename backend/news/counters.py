@@ -0,0 +1,218 @@
+"""
+Denormalized engagement counters stored on Article.
+
+Writes go through small F()-expression deltas so concurrent requests never
+overwrite each other; `recount_expressions` rebuilds the exact values from
+the Reaction and Comment tables (see the `reconcile_article_counters`
+management command).
+
+Every delta still updates the article row, so when thousands of users react
+to one article within seconds their transactions queue on that row's lock.
+With NEWS_COUNTER_SHARDS above 1 deltas are added to one of that many
+`ArticleCounterShard` rows of the article instead, picked at random, and
+`compact_shards` (run by Celery beat) periodically folds the shards into the
+article columns. Lists read the compacted totals; the article detail adds
+the shards not folded yet (`add_unsettled`).
+
+Writes here bypass the model signals; callers of the deltas invalidate the
+response cache themselves, while compaction and reconciliation bump the
+generations of the articles they change (lists and their ETags depend on
+them, see `news.conditional`).
+"""
+import random
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from . import response_cache
+from .models import Article, ArticleCounterShard, Comment, Reaction
+
+COUNTER_FIELDS = ('views', 'likes_count', 'dislikes_count', 'active_comment_count')
+
+
+def shard_count():
+    return getattr(settings, 'NEWS_COUNTER_SHARDS', 0)
+
+
+def sharded():
+    return shard_count() > 1
+
+
+def _update_articles(article_ids, deltas):
+    changes = {field: Greatest(F(field) + delta, Value(0)) for field, delta in deltas.items()}
+    Article.objects.filter(pk__in=article_ids).update(**changes)
+
+
+def _add_to_shard(article_id, deltas):
+    shard = random.randrange(shard_count())
+    rows = ArticleCounterShard.objects.filter(article_id=article_id, shard=shard)
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            ArticleCounterShard.objects.create(article_id=article_id, shard=shard, **deltas)
+    except IntegrityError:
+        # Created concurrently
+        rows.update(**changes)
+
+
+def apply_deltas(article_id, **deltas):
+    """Atomically add the given deltas to the article counters."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    if sharded():
+        _add_to_shard(article_id, deltas)
+    else:
+        _update_articles([article_id], deltas)
+
+
+def apply_view_deltas(pending):
+    """
+    Add {article_id: views}; articles with the same delta share one UPDATE
+    unless counters are sharded.
+    """
+    if sharded():
+        for article_id, delta in pending.items():
+            apply_deltas(article_id, views=delta)
+        return
+    by_delta = defaultdict(list)
+    for article_id, delta in pending.items():
+        by_delta[delta].append(article_id)
+    for delta, article_ids in by_delta.items():
+        _update_articles(article_ids, {'views': delta})
+
+
+def _fold_shards(shards, limit=None):
+    """
+    Lock the given shard rows (the first `limit`), add them to the article
+    columns and delete them (inside a transaction); returns the number of
+    rows folded.
+    """
+    rows = shards.select_for_update().order_by('pk').values('pk', 'article_id', *COUNTER_FIELDS)
+    rows = list(rows[:limit] if limit is not None else rows)
+    totals = defaultdict(Counter)
+    for row in rows:
+        for field in COUNTER_FIELDS:
+            totals[row['article_id']][field] += row[field]
+    for article_id, deltas in totals.items():
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if deltas:
+            _update_articles([article_id], deltas)
+    ArticleCounterShard.objects.filter(pk__in=[row['pk'] for row in rows]).delete()
+    if totals:
+        response_cache.invalidate_articles(*totals)
+    return len(rows)
+
+
+def compact_shards(article_ids=None, batch_size=1000):
+    """
+    Fold counter shards (of `article_ids`, or all) into the article columns
+    and delete them; returns the number of shard rows folded.
+
+    Each batch is one transaction; the shard rows are locked so increments
+    racing with the fold wait and then start new rows.
+    """
+    folded = 0
+    while True:
+        with transaction.atomic():
+            shards = ArticleCounterShard.objects.all()
+            if article_ids is not None:
+                shards = shards.filter(article_id__in=article_ids)
+            batch = _fold_shards(shards, limit=batch_size)
+        folded += batch
+        if batch < batch_size:
+            return folded
+
+
+def unsettled_counts(article_ids):
+    """Return {article_id: {field: delta}} still held in counter shards."""
+    if not sharded() or not article_ids:
+        return {}
+    rows = (
+        ArticleCounterShard.objects.filter(article_id__in=article_ids)
+        .order_by()
+        .values('article_id')
+        .annotate(**{field: Sum(field) for field in COUNTER_FIELDS})
+    )
+    return {row.pop('article_id'): row for row in rows}
+
+
+def add_unsettled(article):
+    """Add the deltas still in counter shards to the loaded counters of `article`."""
+    deferred = article.get_deferred_fields()
+    for field, delta in unsettled_counts([article.pk]).get(article.pk, {}).items():
+        if field not in deferred:
+            setattr(article, field, max(getattr(article, field) + delta, 0))
+
+
+def reaction_deltas(previous, current):
+    """
+    Return counter deltas for a reaction changing from `previous` to `current`.
+
+    Either value may be None (no reaction), so the same helper covers
+    creation, deletion and like/dislike flips.
+    """
+    deltas = {'likes_count': 0, 'dislikes_count': 0}
+    for value, step in ((previous, -1), (current, 1)):
+        if value == Reaction.LIKE:
+            deltas['likes_count'] += step
+        elif value == Reaction.DISLIKE:
+            deltas['dislikes_count'] += step
+    return deltas
+
+
+def apply_reaction_change(article_id, previous, current):
+    """Update like/dislike counters for a single reaction write."""
+    if previous != current:
+        apply_deltas(article_id, **reaction_deltas(previous, current))
+
+
+def apply_comment_change(article_id, delta):
+    """Update the active comment counter by `delta`."""
+    apply_deltas(article_id, active_comment_count=delta)
+
+
+def _count_subquery(queryset):
+    counts = queryset.order_by().values('article').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=models.IntegerField()), 0)
+
+
+def recount_expressions():
+    """Expressions that recompute every counter column from source rows."""
+    return {
+        'likes_count': _count_subquery(
+            Reaction.objects.filter(article=OuterRef('pk'), value=Reaction.LIKE)
+        ),
+        'dislikes_count': _count_subquery(
+            Reaction.objects.filter(article=OuterRef('pk'), value=Reaction.DISLIKE)
+        ),
+        'active_comment_count': _count_subquery(
+            Comment.objects.filter(article=OuterRef('pk'), is_active=True)
+        ),
+    }
+
+
+def reconcile_articles(article_ids):
+    """
+    Recompute counters for the given articles in a single UPDATE; returns
+    the number of articles updated.
+
+    Shards hold deltas on top of the columns being replaced, so they are
+    folded (only their views survive the recount) in the same transaction as
+    the recount, with the articles and their shards locked: a reaction or comment committed
+    meanwhile would otherwise be counted by the recount and again by its
+    shard. New shard rows wait for the article lock (their foreign key check
+    takes a share lock on the article), increments of existing ones for the
+    shard locks, and both land on top of the recount.
+    """
+    with transaction.atomic():
+        list(Article.objects.select_for_update().filter(pk__in=article_ids).order_by('pk').values_list('pk'))
+        _fold_shards(ArticleCounterShard.objects.filter(article_id__in=article_ids))
+        updated = Article.objects.filter(pk__in=article_ids).update(**recount_expressions())
+        response_cache.invalidate_articles(*article_ids)
+    return updated
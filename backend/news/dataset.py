@@ -0,0 +1,386 @@
+"""
+Seeded synthetic dataset for benchmarks and load tests.
+
+`DatasetGenerator` creates users across roles, categories, tags, articles
+with Russian text of realistic length, threaded comments, reactions,
+bookmarks and user activity in chunks: rows whose primary keys are needed
+(users, articles, comments) go through `bulk_create`, link tables (article
+tags, reactions, bookmarks, activity) through plain multi-row INSERTs.
+Reactions, comments, bookmarks and views per article, as well as the
+activity of users, follow a power law.
+
+The same seed produces the same rows; timestamps are relative to the time
+of generation. Model signals are not sent: the denormalized article counters
+are computed here, while derived data (search index, trending scores,
+related articles) has to be rebuilt afterwards.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import Role, UserActivity
+from .models import Article, ArticleTag, Bookmark, Category, Comment, Reaction, Tag, comment_path_segment
+
+User = get_user_model()
+
+DAY = 86400.0
+
+WORDS = (
+    'новость', 'город', 'власти', 'заявили', 'проект', 'развитие', 'компания', 'рынок', 'рост', 'цены',
+    'эксперты', 'считают', 'решение', 'правительство', 'страна', 'регион', 'жители', 'область', 'москва',
+    'россия', 'мир', 'экономика', 'технологии', 'искусственный', 'интеллект', 'данные', 'сеть', 'система',
+    'программа', 'исследование', 'учёные', 'университет', 'открытие', 'космос', 'спутник', 'запуск',
+    'команда', 'матч', 'победа', 'сезон', 'чемпионат', 'тренер', 'игрок', 'болельщики', 'стадион',
+    'культура', 'выставка', 'театр', 'фестиваль', 'фильм', 'премьера', 'книга', 'автор', 'музей',
+    'здоровье', 'врачи', 'больница', 'лечение', 'пациенты', 'вакцина', 'погода', 'снег', 'дождь',
+    'температура', 'неделя', 'год', 'месяц', 'сегодня', 'вчера', 'утром', 'вечером', 'время', 'число',
+    'новый', 'большой', 'главный', 'важный', 'российский', 'местный', 'первый', 'последний', 'крупный',
+    'сообщил', 'отметил', 'рассказал', 'объявил', 'начал', 'получил', 'провёл', 'открыл', 'представил',
+    'будет', 'может', 'должен', 'стало', 'более', 'около', 'после', 'также', 'однако', 'кроме', 'того',
+    'в', 'на', 'по', 'с', 'и', 'для', 'что', 'это', 'как', 'не', 'из', 'о', 'к', 'за', 'от', 'до',
+)
+
+CATEGORIES = (
+    ('Технологии', 'technology'), ('Политика', 'politics'), ('Экономика', 'economy'), ('Спорт', 'sport'),
+    ('Наука', 'science'), ('Культура', 'culture'), ('Общество', 'society'), ('Здоровье', 'health'),
+    ('Происшествия', 'incidents'), ('Авто', 'auto'), ('Путешествия', 'travel'), ('Мнения', 'opinions'),
+)
+
+ROLE_SHARES = ((Role.READER, 0.9), (Role.EDITOR, 0.09), (Role.ADMIN, 0.01))
+STATUS_SHARES = (('published', 0.9), ('draft', 0.08), ('archived', 0.02))
+ACTION_SHARES = (
+    ('login', 0.45), ('logout', 0.2), ('profile_update', 0.05), ('comment_create', 0.2),
+    ('article_create', 0.05), ('article_update', 0.04), ('password_change', 0.01),
+)
+USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_0) Safari/605.1.15',
+    'Mozilla/5.0 (Linux; Android 14) Chrome/120.0 Mobile',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0) Safari/604.1',
+)
+LIKE_SHARE = 0.8
+INACTIVE_COMMENT_SHARE = 0.05
+REPLY_SHARE = 0.4
+PARAGRAPH_POOL = 1000
+SENTENCE_POOL = 2000
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk inserts set `auto_now`/`auto_now_add` fields of `models`."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def power_law_weights(rng, size, exponent=1.1):
+    """Zipf-like weights summing to 1, in random order."""
+    weights = 1.0 / np.arange(1, size + 1) ** exponent
+    return rng.permutation(weights / weights.sum())
+
+
+def to_datetime(timestamp):
+    return datetime.fromtimestamp(float(timestamp), tz=dt_timezone.utc)
+
+
+class DatasetGenerator:
+    """Generates the dataset; `log` receives progress messages."""
+
+    def __init__(self, seed=42, batch_size=5000, prefix='gen', days=365, log=None):
+        self.rng = np.random.default_rng(seed)
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.days = days
+        self.log = log or (lambda message: None)
+        self.now = timezone.now().timestamp()
+        self.sentences = [self._sentence(6, 16) for _ in range(SENTENCE_POOL)]
+        self.paragraphs = [
+            ' '.join(self.sentences[i] for i in self.rng.integers(0, SENTENCE_POOL, self.rng.integers(3, 8)))
+            for _ in range(PARAGRAPH_POOL)
+        ]
+
+    # Helpers
+
+    def _sentence(self, shortest, longest):
+        words = [WORDS[i] for i in self.rng.integers(0, len(WORDS), self.rng.integers(shortest, longest))]
+        return ' '.join(words).capitalize() + '.'
+
+    def _sample(self, cdf, count):
+        """Draw `count` indices from the distribution with cumulative weights `cdf`."""
+        return np.minimum(np.searchsorted(cdf, self.rng.random(count), side='right'), len(cdf) - 1)
+
+    def _after(self, timestamps, mean_delay):
+        """Event times following `timestamps` by an exponential delay, capped at now."""
+        return np.minimum(timestamps + self.rng.exponential(mean_delay, len(timestamps)), self.now)
+
+    def _bulk_create(self, model, objects):
+        return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def _insert(self, model, columns, rows):
+        """
+        Multi-row INSERT of `rows` (tuples of database values for `columns`),
+        for link tables whose primary keys are not needed; skips the per-value
+        preparation of `bulk_create`.
+        """
+        rows = list(rows)
+        quote = connection.ops.quote_name
+        size = max(1, min(self.batch_size, connection.ops.bulk_batch_size(columns, rows)))
+        placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), size):
+                batch = rows[start:start + size]
+                cursor.execute(
+                    f'INSERT INTO {quote(model._meta.db_table)} ({", ".join(quote(c) for c in columns)}) '
+                    f'VALUES {", ".join([placeholders] * len(batch))}',
+                    [value for row in batch for value in row],
+                )
+
+    def _timestamps(self, timestamps):
+        adapt = connection.ops.adapt_datetimefield_value
+        return [adapt(to_datetime(timestamp)) for timestamp in timestamps]
+
+    def _engaged_users(self, counts):
+        """
+        (article, user) index pairs giving article `i` up to `counts[i]`
+        distinct users. Users are drawn by popularity; repeats are dropped
+        and redrawn, finally uniformly so saturated articles still fill up.
+        """
+        articles = users = np.empty(0, dtype=np.int64)
+        deficit = counts
+        for attempt in range(4):
+            drawn = np.repeat(np.arange(len(counts)), deficit)
+            if attempt < 3:
+                picks = self._sample(self.user_cdf, len(drawn))
+            else:
+                picks = self.rng.integers(0, len(self.user_pks), len(drawn))
+            articles, users = np.concatenate([articles, drawn]), np.concatenate([users, picks])
+            _, first = np.unique(articles * len(self.user_pks) + users, return_index=True)
+            first.sort()
+            articles, users = articles[first], users[first]
+            deficit = counts - np.bincount(articles, minlength=len(counts))
+            if not deficit.any():
+                break
+        return articles, users
+
+    # Tables
+
+    def create_users(self, count):
+        roles = {
+            name: Role.objects.get_or_create(name=name, defaults={'display_name': label})[0]
+            for name, label in Role.ROLE_CHOICES
+        }
+        names = [name for name, _ in ROLE_SHARES]
+        role_index = self.rng.choice(len(names), size=count, p=[share for _, share in ROLE_SHARES])
+        joined = self.now - self.rng.uniform(0, self.days + 30, count) * DAY
+        password = make_password('password')
+
+        pks = []
+        for start in range(0, count, self.batch_size):
+            users = [
+                User(
+                    username=f'{self.prefix}_user{i}', email=f'{self.prefix}_user{i}@example.com',
+                    password=password, first_name=WORDS[i % len(WORDS)].capitalize(), last_name=f'#{i}',
+                    role=roles[names[role_index[i]]], is_staff=names[role_index[i]] == Role.ADMIN,
+                    date_joined=to_datetime(joined[i]), created_at=to_datetime(joined[i]),
+                    updated_at=to_datetime(joined[i]),
+                )
+                for i in range(start, min(start + self.batch_size, count))
+            ]
+            pks.extend(user.pk for user in self._bulk_create(User, users))
+            self.log(f'Users: {len(pks)}/{count}')
+
+        self.user_pks = np.array(pks, dtype=np.int64)
+        self.user_cdf = np.cumsum(power_law_weights(self.rng, count))
+        self.author_pks = self.user_pks[np.isin(role_index, [names.index(Role.EDITOR), names.index(Role.ADMIN)])]
+        if not len(self.author_pks):
+            self.author_pks = self.user_pks[:1]
+
+    def create_taxonomy(self, tag_count):
+        categories = []
+        for name, slug in CATEGORIES:
+            category, _ = Category.objects.get_or_create(
+                slug=f'{self.prefix}-{slug}', defaults={'name': f'{name} ({self.prefix})', 'description': name}
+            )
+            categories.append(category.pk)
+        self.category_pks = np.array(categories, dtype=np.int64)
+        self.category_cdf = np.cumsum(power_law_weights(self.rng, len(categories), exponent=0.8))
+
+        tags = [
+            Tag(name=f'{WORDS[i % len(WORDS)]} {self.prefix}{i}', slug=f'{self.prefix}-tag-{i}')
+            for i in range(tag_count)
+        ]
+        self.tag_pks = np.array([tag.pk for tag in self._bulk_create(Tag, tags)], dtype=np.int64)
+        self.tag_cdf = np.cumsum(power_law_weights(self.rng, tag_count))
+        self.log(f'Categories: {len(categories)}, tags: {tag_count}')
+
+    def create_articles(self, count, comments, reactions, bookmarks, max_depth):
+        statuses = [status for status, _ in STATUS_SHARES]
+        status_index = self.rng.choice(len(statuses), size=count, p=[share for _, share in STATUS_SHARES])
+        published = status_index != statuses.index('draft')
+        weights = power_law_weights(self.rng, count) * published
+        weights /= weights.sum()
+        # Engagement per article; a user reacts to / bookmarks an article at most once
+        reaction_counts = np.minimum(self.rng.multinomial(reactions, weights), len(self.user_pks))
+        comment_counts = self.rng.multinomial(comments, weights)
+        bookmark_counts = np.minimum(self.rng.multinomial(bookmarks, weights), len(self.user_pks))
+        published_at = self.now - self.rng.power(0.5, count) * self.days * DAY
+
+        created = 0
+        for start in range(0, count, self.batch_size):
+            end = min(start + self.batch_size, count)
+            with transaction.atomic():
+                self._create_article_batch(
+                    start, end, [statuses[i] for i in status_index[start:end]], published_at[start:end],
+                    reaction_counts[start:end], comment_counts[start:end], bookmark_counts[start:end], max_depth,
+                )
+            created = end
+            self.log(f'Articles: {created}/{count}')
+
+    def _create_article_batch(self, start, end, statuses, published_at, reaction_counts, comment_counts,
+                              bookmark_counts, max_depth):
+        size = end - start
+        local = np.arange(size)
+
+        # Reactions
+        reaction_articles, reaction_users = self._engaged_users(reaction_counts)
+        likes = self.rng.random(len(reaction_articles)) < LIKE_SHARE
+        reaction_times = self._after(published_at[reaction_articles], 2 * DAY)
+        like_counts = np.bincount(reaction_articles[likes], minlength=size)
+        dislike_counts = np.bincount(reaction_articles[~likes], minlength=size)
+
+        # Comments, ordered by time within each article
+        comment_articles = np.repeat(local, comment_counts)
+        comment_times = self._after(published_at[comment_articles], DAY)
+        order = np.lexsort((comment_times, comment_articles))
+        comment_articles, comment_times = comment_articles[order], comment_times[order]
+        comment_active = self.rng.random(len(comment_articles)) >= INACTIVE_COMMENT_SHARE
+        active_counts = np.bincount(comment_articles[comment_active], minlength=size)
+
+        # Articles
+        lengths = np.clip(self.rng.lognormal(1.6, 0.5, size).astype(int), 1, 30)
+        views = self.rng.poisson(15 * (like_counts + dislike_counts) + 5)
+        article_objects = []
+        for offset in range(size):
+            i = start + offset
+            status = statuses[offset]
+            content = '\n\n'.join(
+                self.paragraphs[p] for p in self.rng.integers(0, PARAGRAPH_POOL, lengths[offset])
+            )
+            when = to_datetime(published_at[offset])
+            article_objects.append(Article(
+                title=self._sentence(4, 10)[:-1][:200], slug=f'{self.prefix}-article-{i}',
+                content=content, excerpt=content[:300],
+                author_id=int(self.author_pks[self.rng.integers(len(self.author_pks))]),
+                category_id=int(self.category_pks[self._sample(self.category_cdf, 1)[0]]),
+                status=status, created_at=when, updated_at=when,
+                published_at=None if status == 'draft' else when,
+                views=int(views[offset]) if status != 'draft' else 0,
+                likes_count=int(like_counts[offset]), dislikes_count=int(dislike_counts[offset]),
+                active_comment_count=int(active_counts[offset]),
+            ))
+        article_pks = np.array(
+            [article.pk for article in self._bulk_create(Article, article_objects)], dtype=np.int64
+        )
+
+        # Tags (none to link with --tags 0)
+        if len(self.tag_pks):
+            tag_articles = np.repeat(local, self.rng.integers(1, 6, size))
+            tags = self._sample(self.tag_cdf, len(tag_articles))
+            _, first = np.unique(tag_articles * len(self.tag_pks) + tags, return_index=True)
+            first.sort()
+            self._insert(ArticleTag, ('article_id', 'tag_id'), zip(
+                article_pks[tag_articles[first]].tolist(), self.tag_pks[tags[first]].tolist()
+            ))
+
+        self._insert(Reaction, ('article_id', 'user_id', 'value', 'created_at'), zip(
+            article_pks[reaction_articles].tolist(), self.user_pks[reaction_users].tolist(),
+            np.where(likes, Reaction.LIKE, Reaction.DISLIKE).tolist(), self._timestamps(reaction_times),
+        ))
+        self._create_comments(article_pks, comment_articles, comment_times, comment_active, max_depth)
+
+        bookmark_articles, bookmark_users = self._engaged_users(bookmark_counts)
+        self._insert(Bookmark, ('article_id', 'user_id', 'created_at'), zip(
+            article_pks[bookmark_articles].tolist(), self.user_pks[bookmark_users].tolist(),
+            self._timestamps(self._after(published_at[bookmark_articles], 3 * DAY)),
+        ))
+
+    def _create_comments(self, article_pks, articles, times, active, max_depth):
+        """Insert comments level by level so replies can reference their parent's pk."""
+        count = len(articles)
+        parents = np.full(count, -1)
+        depths = np.zeros(count, dtype=np.int64)
+        picks = self.rng.random(count)
+        replies = self.rng.random(count) < REPLY_SHARE
+        thread_start = 0
+        for j in range(count):
+            if j and articles[j] != articles[j - 1]:
+                thread_start = j
+            if replies[j] and j > thread_start:
+                parent = thread_start + int(picks[j] * (j - thread_start))
+                if depths[parent] < max_depth:
+                    parents[j] = parent
+                    depths[j] = depths[parent] + 1
+
+        authors = self._sample(self.user_cdf, count)
+        sentences = self.rng.integers(0, SENTENCE_POOL, (count, 3))
+        lengths = self.rng.integers(1, 4, count)
+        pks = np.zeros(count, dtype=np.int64)
+        paths = [''] * count
+        for depth in range(int(depths.max(initial=0)) + 1):
+            level = np.flatnonzero(depths == depth)
+            comments = [
+                Comment(
+                    article_id=int(article_pks[articles[j]]), author_id=int(self.user_pks[authors[j]]),
+                    parent_id=int(pks[parents[j]]) if parents[j] >= 0 else None,
+                    content=' '.join(self.sentences[s] for s in sentences[j, :lengths[j]]),
+                    is_active=bool(active[j]), created_at=to_datetime(times[j]), updated_at=to_datetime(times[j]),
+                    depth=depth,
+                )
+                for j in level
+            ]
+            pks[level] = [comment.pk for comment in self._bulk_create(Comment, comments)]
+            # Materialized paths end with the comment's own id
+            for j, comment in zip(level, comments):
+                paths[j] = comment.path = (paths[parents[j]] if parents[j] >= 0 else '') + comment_path_segment(comment.pk)
+            Comment.objects.bulk_update(comments, ['path'], batch_size=self.batch_size)
+
+    def create_activities(self, count):
+        actions = [action for action, _ in ACTION_SHARES]
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            users = self._sample(self.user_cdf, size)
+            action_index = self.rng.choice(len(actions), size=size, p=[share for _, share in ACTION_SHARES])
+            times = self.now - self.rng.uniform(0, self.days, size) * DAY
+            addresses = self.rng.integers(1, 255, (size, 4))
+            agents = self.rng.integers(0, len(USER_AGENTS), size)
+            self._insert(UserActivity, ('user_id', 'action', 'ip_address', 'user_agent', 'details', 'created_at'), (
+                (
+                    int(self.user_pks[users[j]]), actions[action_index[j]], '.'.join(map(str, addresses[j])),
+                    USER_AGENTS[agents[j]], '{}', timestamp,
+                )
+                for j, timestamp in enumerate(self._timestamps(times))
+            ))
+            self.log(f'Activities: {start + size}/{count}')
+
+    def generate(self, users, articles, tags, comments, reactions, bookmarks, activities, max_depth=3):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise RuntimeError(f'{connection.vendor} does not return primary keys from bulk inserts')
+        with explicit_timestamps(User, Article, Comment):
+            self.create_users(users)
+            self.create_taxonomy(tags)
+            self.create_articles(articles, comments, reactions, bookmarks, max_depth)
+            self.create_activities(activities)
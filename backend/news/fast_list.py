@@ -0,0 +1,150 @@
+"""
+Serializer-free fast path for the article list.
+
+`ArticleListSerializer` builds several serializer instances per row and
+converts every field through `to_representation`, which dominates CPU time
+on `/articles/`. This module produces the same dicts (same keys, order and
+formatting) from a `.values()` query plus one batched lookup each for
+authors, tags and buffered views. Requests that need serializer features
+(sparse fieldsets) keep the regular path.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from accounts.models import Role
+from . import view_counter
+from .models import Article, Tag
+
+User = get_user_model()
+
+ARTICLE_COLUMNS = (
+    'id', 'title', 'slug', 'excerpt', 'cover_image', 'author_id', 'category_id',
+    'category__name', 'category__slug', 'category__description', 'category__created_at',
+    'status', 'created_at', 'published_at', 'views', 'active_comment_count',
+    'likes_count', 'dislikes_count',
+)
+MANAGER_ROLES = (Role.EDITOR, Role.ADMIN)
+
+
+def article_rows(queryset):
+    """Turn an article queryset into the `.values()` rows the fast path renders."""
+    # Annotations (e.g. search rank) stay available to keyset pagination
+    return queryset.select_related(None).prefetch_related(None).values(
+        *ARTICLE_COLUMNS, *queryset.query.annotations
+    )
+
+
+def _authors(author_ids):
+    rows = User.objects.filter(pk__in=author_ids).values(
+        'id', 'username', 'email', 'first_name', 'last_name', 'is_staff', 'is_superuser', 'role__name'
+    )
+    return {
+        row['id']: {
+            'id': row['id'],
+            'username': row['username'],
+            'email': row['email'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            # Same rule as User.can_manage_articles()
+            'can_manage_articles': (
+                row['role__name'] in MANAGER_ROLES or row['is_staff'] or row['is_superuser']
+            ),
+        }
+        for row in rows
+    }
+
+
+def _tags(article_ids):
+    tags = defaultdict(list)
+    rows = Tag.objects.filter(articles__in=article_ids).values(
+        'id', 'name', 'slug', article_pk=F('articles__id')
+    )
+    for row in rows:
+        tags[row['article_pk']].append({'id': row['id'], 'name': row['name'], 'slug': row['slug']})
+    return tags
+
+
+def serialize_articles(rows, request=None):
+    """Build `ArticleListSerializer`-equivalent dicts from `article_rows`."""
+    rows = list(rows)
+    article_ids = [row['id'] for row in rows]
+    authors = _authors({row['author_id'] for row in rows if row['author_id'] is not None})
+    tags = _tags(article_ids)
+    pending = view_counter.pending_views(article_ids)
+    datetime_field = serializers.DateTimeField()
+    cover_storage = Article._meta.get_field('cover_image').storage
+
+    def format_datetime(value):
+        return None if value is None else datetime_field.to_representation(value)
+
+    def cover_url(name):
+        if not name:
+            return None
+        url = cover_storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    data = []
+    for row in rows:
+        category = None
+        if row['category_id'] is not None:
+            category = {
+                'id': row['category_id'],
+                'name': row['category__name'],
+                'slug': row['category__slug'],
+                'description': row['category__description'],
+                'created_at': format_datetime(row['category__created_at']),
+            }
+        data.append({
+            'id': row['id'],
+            'title': row['title'],
+            'slug': row['slug'],
+            'excerpt': row['excerpt'],
+            'cover_image': cover_url(row['cover_image']),
+            'author': authors.get(row['author_id']),
+            'category': category,
+            'tags': tags.get(row['id'], []),
+            'status': row['status'],
+            'created_at': format_datetime(row['created_at']),
+            'published_at': format_datetime(row['published_at']),
+            'views': row['views'] + pending.get(row['id'], 0),
+            'comment_count': row['active_comment_count'],
+            'reaction_summary': {'likes': row['likes_count'], 'dislikes': row['dislikes_count']},
+            'likes_count': row['likes_count'],
+            'dislikes_count': row['dislikes_count'],
+        })
+        if 'is_bookmarked' in row:
+            # Annotated by `ArticleQuerySet.with_viewer_state`
+            data[-1]['my_reaction'] = row['my_reaction']
+            data[-1]['is_bookmarked'] = row['is_bookmarked']
+    return data
+
+
+class FastArticleListMixin:
+    """
+    Serves `list` through `serialize_articles` when
+    `NEWS_ARTICLE_LIST_FAST_PATH` is enabled and no sparse fieldset is
+    requested.
+    """
+    fast_list_serializer_class = None
+
+    def use_fast_list(self):
+        return (
+            getattr(settings, 'NEWS_ARTICLE_LIST_FAST_PATH', False)
+            and getattr(self, 'fieldset', None) is None
+            and self.get_serializer_class() is self.fast_list_serializer_class
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_list():
+            return super().list(request, *args, **kwargs)
+
+        queryset = article_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize_articles(page, request))
+        return Response(serialize_articles(queryset, request))
@@ -0,0 +1,228 @@
+"""
+Sparse fieldsets (`?fields=`) and embed control (`?expand=`).
+
+* ``?fields=id,title,author`` limits the output to the listed fields. Dotted
+  names select fields of nested objects (``author.username``).
+* When `fields` is given, related objects are rendered as primary keys unless
+  they are listed in ``?expand=`` (or selected with a dotted name), in which
+  case they are embedded. Without `fields` the output is unchanged.
+
+Views pass the parsed `Fieldset` to serializers through the context, and
+`prune_queryset` narrows the queryset to what will be rendered: `.only()`
+for columns, `select_related` for embedded foreign keys and prefetches only
+for many-to-many relations that are requested.
+
+Serializer fields that are not plain model attributes (method fields,
+properties) declare the model attributes they read in
+``Meta.field_dependencies``; unknown sources disable column pruning.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+class Fieldset:
+    """Requested fields and embeds for one level of nesting."""
+
+    def __init__(self):
+        self.selected = None  # None means all fields
+        self.expanded = set()
+        self.children = {}
+
+    def child(self, name):
+        if name not in self.children:
+            self.children[name] = Fieldset()
+        return self.children[name]
+
+    def add_field(self, path):
+        name, _, rest = path.partition('.')
+        if self.selected is None:
+            self.selected = set()
+        self.selected.add(name)
+        if rest:
+            self.expanded.add(name)
+            self.child(name).add_field(rest)
+
+    def add_expand(self, path):
+        name, _, rest = path.partition('.')
+        self.expanded.add(name)
+        if rest:
+            self.child(name).add_expand(rest)
+
+    @classmethod
+    def from_params(cls, query_params, fields_param='fields', expand_param='expand'):
+        """Parse comma-separated params; returns None when neither is given."""
+        fields = [f.strip() for f in query_params.get(fields_param, '').split(',') if f.strip()]
+        expand = [f.strip() for f in query_params.get(expand_param, '').split(',') if f.strip()]
+        if not fields and not expand:
+            return None
+        fieldset = cls()
+        for path in fields:
+            fieldset.add_field(path)
+        for path in expand:
+            fieldset.add_expand(path)
+        return fieldset
+
+
+def _nested_serializer(field):
+    """Return the embedded serializer of a field (unwrapping many=True), if any."""
+    if isinstance(field, serializers.ListSerializer):
+        field = field.child
+    return field if isinstance(field, serializers.BaseSerializer) else None
+
+
+class SparseFieldsetMixin:
+    """
+    Applies the `Fieldset` from the context (or assigned by a parent
+    serializer) to `fields`.
+    """
+
+    def _get_fieldset(self):
+        fieldset = getattr(self, '_fieldset', None)
+        if fieldset is None and (self.root is self or self.root is self.parent):
+            fieldset = self.context.get('fieldset')
+        return fieldset
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self._get_fieldset()
+        if fieldset is None:
+            return fields
+
+        if fieldset.selected is not None:
+            fields = {name: field for name, field in fields.items() if name in fieldset.selected}
+
+        for name, field in list(fields.items()):
+            nested = _nested_serializer(field)
+            if nested is None:
+                continue
+            if fieldset.selected is not None and name not in fieldset.expanded:
+                # Collapse to primary keys
+                fields[name] = serializers.PrimaryKeyRelatedField(
+                    source=field.source, many=isinstance(field, serializers.ListSerializer), read_only=True
+                )
+            elif name in fieldset.children:
+                nested._fieldset = fieldset.children[name]
+        return fields
+
+
+def _plan(serializer):
+    """
+    Return (columns, select_related, prefetch lookups) needed to render
+    `serializer`, relative to its model; columns is None when unknown.
+    """
+    model = serializer.Meta.model
+    dependencies = getattr(serializer.Meta, 'field_dependencies', {})
+    columns = {model._meta.pk.name}
+    select = set()
+    prefetch = {}
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in dependencies:
+            sources = dependencies[name]
+        elif field.source == '*':
+            columns = None
+            continue
+        else:
+            sources = [field.source]
+
+        for source in sources:
+            path = source.split('.')
+            try:
+                model_field = model._meta.get_field(path[0])
+            except FieldDoesNotExist:
+                # Property or method: the columns it reads are unknown
+                columns = None
+                continue
+
+            if model_field.many_to_many or model_field.one_to_many:
+                nested = _nested_serializer(field) if name not in dependencies else None
+                related_model = model_field.related_model
+                if nested is not None:
+                    sub_columns, sub_select, sub_prefetch = _plan(nested)
+                    queryset = related_model._default_manager.all()
+                    if sub_columns is not None:
+                        queryset = queryset.only(*sub_columns)
+                    if sub_select:
+                        queryset = queryset.select_related(*sub_select)
+                    if sub_prefetch:
+                        queryset = queryset.prefetch_related(*sub_prefetch.values())
+                else:
+                    queryset = related_model._default_manager.only(related_model._meta.pk.name)
+                prefetch[model_field.name] = Prefetch(model_field.name, queryset=queryset)
+            elif model_field.is_relation:
+                if columns is not None:
+                    columns.add(model_field.name)
+                nested = _nested_serializer(field) if name not in dependencies else None
+                if nested is not None:
+                    sub_columns, sub_select, sub_prefetch = _plan(nested)
+                elif len(path) > 1:
+                    # Dependency on an attribute of the related object
+                    sub_columns, sub_select, sub_prefetch = {path[1]}, set(), {}
+                else:
+                    continue
+                select.add(model_field.name)
+                select.update(f'{model_field.name}__{lookup}' for lookup in sub_select)
+                if sub_columns is None:
+                    # Nested sources are unknown, load whole rows
+                    columns = None
+                elif columns is not None:
+                    columns.update(f'{model_field.name}__{column}' for column in sub_columns)
+                for lookup, item in sub_prefetch.items():
+                    prefixed = f'{model_field.name}__{lookup}'
+                    prefetch[prefixed] = Prefetch(prefixed, queryset=item.queryset)
+            elif columns is not None:
+                columns.add(model_field.name)
+
+    return columns, select, prefetch
+
+
+def prune_queryset(queryset, serializer):
+    """Restrict `queryset` to the columns and relations `serializer` renders."""
+    columns, select, prefetch = _plan(serializer)
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if columns is not None:
+        # Keyset pagination reads the sort key from the rows
+        concrete = {field.name for field in queryset.model._meta.concrete_fields}
+        columns.update(
+            field.lstrip('-') for field in queryset.query.order_by
+            if isinstance(field, str) and field.lstrip('-') in concrete
+        )
+    if select:
+        queryset = queryset.select_related(*sorted(select))
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch.values())
+    if columns is not None:
+        queryset = queryset.only(*sorted(columns))
+    return queryset
+
+
+class SparseFieldsetViewMixin:
+    """
+    View side of sparse fieldsets: parses `?fields=`/`?expand=`, passes
+    the result to the serializer and prunes the filtered queryset.
+    """
+    fieldset_actions = ('list', 'retrieve')
+
+    @property
+    def fieldset(self):
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = None
+            if self.request is not None and self.action in self.fieldset_actions:
+                self._fieldset = Fieldset.from_params(self.request.query_params)
+        return self._fieldset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.fieldset is not None:
+            context['fieldset'] = self.fieldset
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.fieldset is not None:
+            serializer_class = self.get_serializer_class()
+            queryset = prune_queryset(queryset, serializer_class(context=self.get_serializer_context()))
+        return queryset
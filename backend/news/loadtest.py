@@ -0,0 +1,352 @@
+"""
+HTTP load testing against a running server.
+
+Virtual users (asyncio tasks, each with its own keep-alive connection, like
+a browser tab) repeatedly pick a weighted scenario and run its steps:
+
+* ``browse``: anonymous feed browsing (article list pages, trending, tags);
+* ``read``: anonymous article detail with its comments and related articles;
+* ``react``: an authenticated user likes or dislikes an article;
+* ``bookmark``: an authenticated user bookmarks an article, lists the
+  bookmarks and removes the bookmark again;
+* ``auth``: login followed by a token refresh.
+
+Authenticated scenarios log in as ``--username-template`` users (e.g. the
+ones created by ``generate_dataset``). Every request is recorded under an
+endpoint name; `summarize` reports the latency percentiles, throughput and
+error rate per endpoint, and `compare` the changes against an earlier run.
+
+The HTTP/1.1 client is a small stdlib implementation, so the load generator
+has no dependencies beyond the project's own.
+"""
+import asyncio
+import random
+import ssl
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlencode, urlsplit
+
+import orjson
+
+API_PREFIX = '/api/v1'
+PERCENTILES = (50, 95, 99)
+DEFAULT_WEIGHTS = {'browse': 5, 'read': 4, 'react': 1, 'bookmark': 1, 'auth': 1}
+
+
+class ResponseError(Exception):
+    """The server closed the connection or sent a malformed response."""
+
+
+class HTTPClient:
+    """Minimal HTTP/1.1 client over one keep-alive connection."""
+
+    def __init__(self, base_url, timeout=30.0):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == 'https' else 80)
+        self.ssl = ssl.create_default_context() if url.scheme == 'https' else None
+        self.host_header = url.netloc
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, json=None, headers=None):
+        """Return (status, body); reconnects once if a kept-alive connection went stale."""
+        body = orjson.dumps(json) if json is not None else b''
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host_header}', 'Accept: application/json',
+                 f'Content-Length: {len(body)}']
+        if json is not None:
+            lines.append('Content-Type: application/json')
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        message = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+        for attempt in range(2):
+            reused = self.writer is not None
+            if not reused:
+                self.reader, self.writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout
+                )
+            try:
+                self.writer.write(message)
+                await self.writer.drain()
+                status, response_headers, content = await asyncio.wait_for(
+                    self._read_response(method), self.timeout
+                )
+            except (ConnectionError, asyncio.IncompleteReadError, ResponseError):
+                await self.close()
+                if reused and not attempt:
+                    continue
+                raise
+            except BaseException:
+                await self.close()
+                raise
+            if response_headers.get('connection', '').lower() == 'close':
+                await self.close()
+            return status, content
+
+    async def _read_response(self, method):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ResponseError('connection closed')
+        parts = status_line.split(None, 2)
+        if len(parts) < 2 or not parts[1].isdigit():
+            raise ResponseError(f'malformed status line {status_line!r}')
+        status = int(parts[1])
+
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            return status, headers, b''
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if not size:
+                    await self.reader.readline()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            return status, headers, b''.join(chunks)
+        if 'content-length' in headers:
+            return status, headers, await self.reader.readexactly(int(headers['content-length']))
+        headers['connection'] = 'close'
+        return status, headers, await self.reader.read()
+
+
+class Recorder:
+    """Latencies, statuses and errors per endpoint name."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+
+    def record(self, endpoint, latency, status, ok):
+        self.latencies[endpoint].append(latency)
+        self.statuses[endpoint][str(status)] += 1
+        if not ok:
+            self.errors[endpoint] += 1
+
+
+class VirtualUser:
+    """Runs scenarios on its own connection, with its own credentials."""
+
+    def __init__(self, base_url, recorder, rng, articles, credentials, timeout):
+        self.client = HTTPClient(base_url, timeout)
+        self.recorder = recorder
+        self.rng = rng
+        self.articles = articles
+        self.credentials = credentials
+        self.access = self.refresh = None
+
+    async def call(self, endpoint, method, path, json=None, expect=(200,), auth=False):
+        """Send a request and record it; returns the decoded body or None on failure."""
+        headers = {'Authorization': f'Bearer {self.access}'} if auth and self.access else None
+        start = time.perf_counter()
+        try:
+            status, content = await self.client.request(method, API_PREFIX + path, json, headers)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ResponseError) as exc:
+            self.recorder.record(endpoint, (time.perf_counter() - start) * 1000, type(exc).__name__, False)
+            return None
+        ok = status in expect
+        self.recorder.record(endpoint, (time.perf_counter() - start) * 1000, status, ok)
+        if auth and status == 401:
+            # Expired access token: log in again on the next scenario
+            self.access = None
+        if not ok or not content:
+            return None
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return None
+
+    def article(self):
+        return self.rng.choice(self.articles)
+
+    async def login(self):
+        username, password = self.credentials
+        data = await self.call('auth:login', 'POST', '/auth/login/', {'username': username, 'password': password})
+        if data:
+            self.access, self.refresh = data.get('access'), data.get('refresh')
+        return bool(self.access)
+
+    async def ensure_login(self):
+        return bool(self.access) or await self.login()
+
+    # Scenarios
+
+    async def browse(self):
+        data = await self.call('articles:list', 'GET', '/articles/')
+        # Scroll down the feed a few pages
+        for _ in range(self.rng.randint(0, 2)):
+            if not isinstance(data, dict) or not data.get('next'):
+                break
+            url = urlsplit(data['next'])
+            data = await self.call('articles:list', 'GET', url.path[len(API_PREFIX):] + '?' + url.query)
+        await self.call('articles:trending', 'GET', '/articles/trending/')
+        await self.call('tags:list', 'GET', '/tags/')
+        await self.call('articles:list', 'GET', '/articles/?ordering=-views')
+
+    async def read(self):
+        article = self.article()
+        await self.call('articles:detail', 'GET', f'/articles/{article}/')
+        await self.call('articles:comments', 'GET', f'/articles/{article}/comments/')
+        await self.call('articles:related', 'GET', f'/articles/{article}/related/')
+
+    async def react(self):
+        if not await self.ensure_login():
+            return
+        article = self.article()
+        await self.call('articles:detail', 'GET', f'/articles/{article}/', auth=True)
+        await self.call('reactions:create', 'POST', '/reactions/',
+                        {'article': article, 'value': self.rng.choice((1, -1))}, expect=(200, 201), auth=True)
+
+    async def bookmark(self):
+        if not await self.ensure_login():
+            return
+        article = self.article()
+        # Posting an existing bookmark removes it (answered with 400)
+        await self.call('bookmarks:toggle', 'POST', '/bookmarks/', {'article_id': article},
+                        expect=(201, 400), auth=True)
+        await self.call('bookmarks:list', 'GET', '/bookmarks/', auth=True)
+        await self.call('bookmarks:toggle', 'POST', '/bookmarks/', {'article_id': article},
+                        expect=(201, 400), auth=True)
+
+    async def auth(self):
+        if not await self.login():
+            return
+        data = await self.call('auth:refresh', 'POST', '/auth/token/refresh/', {'refresh': self.refresh})
+        if data:
+            self.access = data.get('access', self.access)
+            self.refresh = data.get('refresh', self.refresh)
+
+
+async def discover_articles(base_url, pages=5, timeout=30.0):
+    """Ids of published articles from the first `pages` pages of the list."""
+    client = HTTPClient(base_url, timeout)
+    ids = []
+    try:
+        for page in range(1, pages + 1):
+            status, content = await client.request(
+                'GET', f'{API_PREFIX}/articles/?{urlencode({"page": page, "page_size": 100})}'
+            )
+            if status != 200:
+                break
+            data = orjson.loads(content)
+            rows = data.get('results', []) if isinstance(data, dict) else data
+            ids.extend(row['id'] for row in rows)
+            if not isinstance(data, dict) or not data.get('next'):
+                break
+    finally:
+        await client.close()
+    return ids
+
+
+async def run(base_url, duration=30.0, concurrency=10, weights=None, seed=0, think_time=0.0,
+              username_template='gen_user{}', user_count=100, password='password', timeout=30.0):
+    """
+    Run the load test for `duration` seconds with `concurrency` virtual
+    users; returns (recorder, elapsed seconds).
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    unknown = set(weights) - set(DEFAULT_WEIGHTS)
+    if unknown:
+        raise ValueError(f'Unknown scenarios: {", ".join(sorted(unknown))}')
+    articles = await discover_articles(base_url, timeout=timeout)
+    if not articles:
+        raise ValueError(f'No published articles found at {base_url}')
+
+    names = list(weights)
+    recorder = Recorder()
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def virtual_user(index):
+        user = VirtualUser(
+            base_url, recorder, random.Random(seed * 100003 + index), articles,
+            (username_template.format(index % user_count), password), timeout,
+        )
+        try:
+            while time.perf_counter() < deadline:
+                scenario = user.rng.choices(names, [weights[name] for name in names])[0]
+                await getattr(user, scenario)()
+                if think_time:
+                    await asyncio.sleep(user.rng.expovariate(1 / think_time))
+        finally:
+            await user.client.close()
+
+    await asyncio.gather(*(virtual_user(index) for index in range(concurrency)))
+    return recorder, time.perf_counter() - start
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return None
+    return ordered[max(0, min(len(ordered) - 1, -(-pct * len(ordered) // 100) - 1))]
+
+
+def _stats(latencies, errors, statuses, elapsed):
+    ordered = sorted(latencies)
+    stats = {
+        'requests': len(ordered),
+        'errors': errors,
+        'error_rate': round(errors / len(ordered), 4) if ordered else 0.0,
+        'throughput': round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(ordered) / len(ordered), 3) if ordered else None,
+        'max_ms': round(ordered[-1], 3) if ordered else None,
+    }
+    for pct in PERCENTILES:
+        value = percentile(ordered, pct)
+        stats[f'p{pct}_ms'] = round(value, 3) if value is not None else None
+    if statuses is not None:
+        stats['statuses'] = dict(sorted(statuses.items()))
+    return stats
+
+
+def summarize(recorder, elapsed):
+    """Per-endpoint and total statistics (JSON-serializable)."""
+    endpoints = {
+        endpoint: _stats(latencies, recorder.errors[endpoint], recorder.statuses[endpoint], elapsed)
+        for endpoint, latencies in sorted(recorder.latencies.items())
+    }
+    everything = [latency for latencies in recorder.latencies.values() for latency in latencies]
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'total': _stats(everything, sum(recorder.errors.values()), None, elapsed),
+        'endpoints': endpoints,
+    }
+
+
+def compare(current, baseline):
+    """
+    Relative change ((current - baseline) / baseline) of throughput, p50,
+    p95, p99 and the absolute change of the error rate per endpoint.
+    """
+    changes = {}
+    endpoints = {'total': (current['total'], baseline['total'])}
+    endpoints.update(
+        (name, (stats, baseline['endpoints'][name]))
+        for name, stats in current['endpoints'].items() if name in baseline['endpoints']
+    )
+    for name, (new, old) in endpoints.items():
+        change = {'error_rate': round(new['error_rate'] - old['error_rate'], 4)}
+        for key in ('throughput', 'p50_ms', 'p95_ms', 'p99_ms'):
+            if new[key] is not None and old[key]:
+                change[key] = round((new[key] - old[key]) / old[key], 4)
+        changes[name] = change
+    return changes
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from news.comment_tree import backfill_paths
+
+
+class Command(BaseCommand):
+    help = 'Fill the materialized path and depth of comments that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of comments updated per statement (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        updated = backfill_paths(batch_size=options['batch_size'], log=self.stdout.write)
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully backfilled paths for {updated} comments')
+        )
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import UserActivity
+from news import response_cache
+from news.dataset import DatasetGenerator
+from news.models import COMMENT_MAX_DEPTH, Article, ArticleTag, Bookmark, Comment, Reaction, Tag
+
+
+class Command(BaseCommand):
+    help = 'Generate a large seeded synthetic dataset for benchmarks and load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users (default: 1000)')
+        parser.add_argument('--articles', type=int, default=10000, help='Number of articles (default: 10000)')
+        parser.add_argument('--tags', type=int, default=200, help='Number of tags (default: 200)')
+        parser.add_argument('--comments', type=int, default=50000, help='Number of comments (default: 50000)')
+        parser.add_argument('--reactions', type=int, default=100000,
+                            help='Upper bound on reactions; duplicates per user are dropped (default: 100000)')
+        parser.add_argument('--bookmarks', type=int, default=20000,
+                            help='Upper bound on bookmarks; duplicates per user are dropped (default: 20000)')
+        parser.add_argument('--activities', type=int, default=50000,
+                            help='Number of user activity records (default: 50000)')
+        parser.add_argument('--max-depth', type=int, default=3, help='Deepest comment reply level (default: 3)')
+        parser.add_argument('--days', type=int, default=365, help='Time span of the history in days (default: 365)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows per bulk insert and articles per transaction (default: 5000)')
+        parser.add_argument('--prefix', default='gen',
+                            help='Prefix of generated usernames, slugs and tag names (default: gen)')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if get_user_model().objects.filter(username__startswith=f'{prefix}_user').exists():
+            raise CommandError(f'A dataset with prefix "{prefix}" already exists; pass another --prefix')
+        if options['users'] < 1:
+            raise CommandError('--users must be at least 1')
+        if options['tags'] < 0:
+            raise CommandError('--tags must not be negative')
+        if not 0 <= options['max_depth'] <= COMMENT_MAX_DEPTH:
+            raise CommandError(f'--max-depth must be between 0 and {COMMENT_MAX_DEPTH}')
+
+        generator = DatasetGenerator(
+            seed=options['seed'], batch_size=options['batch_size'], prefix=prefix, days=options['days'],
+            log=self.stdout.write,
+        )
+        try:
+            generator.generate(
+                users=options['users'], articles=options['articles'], tags=options['tags'],
+                comments=options['comments'], reactions=options['reactions'], bookmarks=options['bookmarks'],
+                activities=options['activities'], max_depth=options['max_depth'],
+            )
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+        # Bulk inserts bypass the signals that invalidate cached responses
+        response_cache.invalidate_all(*(
+            response_cache.table_scope(model)
+            for model in (Article, ArticleTag, Tag, Comment, Reaction, Bookmark, UserActivity)
+        ))
+        self.stdout.write(self.style.SUCCESS('Successfully generated the dataset'))
+        self.stdout.write(
+            'Derived data is not built: run "rebuild_search_index" and the '
+            'compute_trending_scores and rebuild_related_articles tasks.'
+        )
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import subprocess
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news import loadtest
+
+
+def parse_weights(value):
+    """Parse "browse=5,read=3" into {'browse': 5.0, 'read': 3.0}."""
+    weights = {}
+    for item in filter(None, value.split(',')):
+        name, _, weight = item.partition('=')
+        try:
+            weights[name.strip()] = float(weight) if weight else 1.0
+        except ValueError:
+            raise CommandError(f'Invalid scenario weight "{item}"')
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Drive mixed API scenarios against a running server and report latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='Base URL of the running server (default: http://127.0.0.1:8000)')
+        parser.add_argument('--duration', type=float, default=30, help='Test duration in seconds (default: 30)')
+        parser.add_argument('--concurrency', type=int, default=10,
+                            help='Number of concurrent virtual users (default: 10)')
+        parser.add_argument('--scenarios',
+                            default=','.join(f'{name}={weight}' for name, weight in loadtest.DEFAULT_WEIGHTS.items()),
+                            help='Weighted scenario mix, e.g. "browse=5,read=4,react=1" '
+                                 f'(available: {", ".join(loadtest.DEFAULT_WEIGHTS)})')
+        parser.add_argument('--think-time', type=float, default=0,
+                            help='Mean pause between scenarios in seconds (default: 0)')
+        parser.add_argument('--username-template', default='gen_user{}',
+                            help='Login names of authenticated virtual users (default: gen_user{})')
+        parser.add_argument('--user-count', type=int, default=100,
+                            help='Number of distinct accounts used (default: 100)')
+        parser.add_argument('--password', default='password', help='Password of those accounts (default: password)')
+        parser.add_argument('--timeout', type=float, default=30, help='Request timeout in seconds (default: 30)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+
+    def handle(self, *args, **options):
+        weights = parse_weights(options['scenarios'])
+        if not weights:
+            raise CommandError('No scenario has a positive weight')
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        started = datetime.now(timezone.utc)
+        try:
+            recorder, elapsed = asyncio.run(loadtest.run(
+                options['url'], duration=options['duration'], concurrency=options['concurrency'],
+                weights=weights, seed=options['seed'], think_time=options['think_time'],
+                username_template=options['username_template'], user_count=max(1, options['user_count']),
+                password=options['password'], timeout=options['timeout'],
+            ))
+        except (ValueError, OSError) as exc:
+            raise CommandError(str(exc))
+
+        results = {
+            'meta': {
+                'url': options['url'],
+                'started_at': started.isoformat(),
+                'revision': git_revision(),
+                'duration_s': options['duration'],
+                'concurrency': options['concurrency'],
+                'scenarios': weights,
+                'seed': options['seed'],
+            },
+            **loadtest.summarize(recorder, elapsed),
+        }
+        if baseline is not None:
+            results['comparison'] = {
+                'baseline_revision': baseline.get('meta', {}).get('revision'),
+                'changes': loadtest.compare(results, baseline),
+            }
+
+        self._print(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+    def _print(self, results):
+        header = f"{'endpoint':<22}{'requests':>10}{'req/s':>9}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        self.stdout.write(header)
+        rows = list(results['endpoints'].items()) + [('total', results['total'])]
+        for name, stats in rows:
+            self.stdout.write(
+                f"{name:<22}{stats['requests']:>10}{stats['throughput']:>9.1f}{stats['error_rate']:>9.1%}"
+                + ''.join(
+                    f"{stats[key]:>10.1f}" if stats[key] is not None else f"{'-':>10}"
+                    for key in ('p50_ms', 'p95_ms', 'p99_ms')
+                )
+            )
+        for name, change in results.get('comparison', {}).get('changes', {}).items():
+            self.stdout.write(
+                f'{name}: ' + ', '.join(
+                    f'{key} {value:+.1%}' if key != 'error_rate' else f'{key} {value:+.2%}'
+                    for key, value in change.items()
+                )
+            )
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from news.models import Article
+from news.search_index import article_documents, get_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the segment search index (NEWS_SEARCH_INDEX_DIR) from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of articles written per segment before the final merge (default: 5000)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = 0
+        indexed = 0
+
+        # The old index stays searchable until the final commit; incremental
+        # updates queued meanwhile wait for the writer lock and apply afterwards
+        with get_index().writer() as writer:
+            writer.clear()
+            while True:
+                batch = list(article_documents(
+                    Article.objects.filter(pk__gt=last_pk).order_by('pk')[:batch_size]
+                ))
+                if not batch:
+                    break
+                writer.add_documents(batch)
+                indexed += len(batch)
+                last_pk = batch[-1][0]
+                self.stdout.write(f'Indexed {indexed} articles...')
+            writer.merge_all()
+            writer.commit()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully indexed {indexed} articles')
+        )
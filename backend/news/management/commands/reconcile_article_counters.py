@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from news.counters import reconcile_articles
+from news.models import Article
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized like/dislike/comment counters on articles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of articles updated per statement (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk = 0
+        updated = 0
+        
+        # Walk the table in primary key order so each batch is an index range
+        while True:
+            batch = list(
+                Article.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            updated += reconcile_articles(batch)
+            last_pk = batch[-1]
+            self.stdout.write(f'Reconciled {updated} articles...')
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully reconciled counters for {updated} articles')
+        )
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Article = apps.get_model('news', 'Article')
+    Comment = apps.get_model('news', 'Comment')
+    Reaction = apps.get_model('news', 'Reaction')
+
+    def count(queryset):
+        totals = queryset.order_by().values('article').annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(totals, output_field=models.IntegerField()), 0)
+
+    Article.objects.update(
+        likes_count=count(Reaction.objects.filter(article=OuterRef('pk'), value=1)),
+        dislikes_count=count(Reaction.objects.filter(article=OuterRef('pk'), value=-1)),
+        active_comment_count=count(Comment.objects.filter(article=OuterRef('pk'), is_active=True)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='active_comment_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Активные комментарии'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='dislikes_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Дизлайки'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Лайки'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:07
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Weighted Russian tsvector: title (A), excerpt (B), content (C)
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('pg_catalog.russian', coalesce({row}title, '')), 'A') || "
+    "setweight(to_tsvector('pg_catalog.russian', coalesce({row}excerpt, '')), 'B') || "
+    "setweight(to_tsvector('pg_catalog.russian', coalesce({row}content, '')), 'C')"
+)
+
+CREATE_SQL = [
+    f'''
+    CREATE OR REPLACE FUNCTION news_article_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {SEARCH_VECTOR_SQL.format(row='NEW.')};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE TRIGGER news_article_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, excerpt, content ON news_article
+    FOR EACH ROW EXECUTE FUNCTION news_article_search_vector_update()
+    ''',
+    f'UPDATE news_article SET search_vector = {SEARCH_VECTOR_SQL.format(row="")}',
+    'CREATE INDEX news_article_search_vector_gin ON news_article USING gin (search_vector)',
+]
+
+DROP_SQL = [
+    'DROP INDEX IF EXISTS news_article_search_vector_gin',
+    'DROP TRIGGER IF EXISTS news_article_search_vector_trigger ON news_article',
+    'DROP FUNCTION IF EXISTS news_article_search_vector_update()',
+]
+
+
+def _run_on_postgres(statements):
+    def run(apps, schema_editor):
+        # Full-text search is PostgreSQL only; other databases keep the column NULL
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0002_article_engagement_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(_run_on_postgres(CREATE_SQL), _run_on_postgres(DROP_SQL)),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_article_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField(verbose_name='Место')),
+                ('score', models.FloatField(verbose_name='Рейтинг')),
+                ('computed_at', models.DateTimeField(verbose_name='Дата расчёта')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_scores', to='news.article', verbose_name='Статья')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='trending_scores', to='news.category', verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': 'Популярная статья',
+                'verbose_name_plural': 'Популярные статьи',
+                'ordering': ['category', 'rank'],
+                'indexes': [models.Index(fields=['category', 'rank'], name='news_trendi_categor_65901f_idx')],
+            },
+        ),
+    ]
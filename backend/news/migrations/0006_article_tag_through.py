@@ -0,0 +1,41 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    """
+    Declare the existing news_article_tags table as the ArticleTag model
+    (state only) and index it by (tag, article).
+    """
+
+    dependencies = [
+        ('news', '0005_related_article'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ArticleTag',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='news.article')),
+                        ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='news.tag')),
+                    ],
+                    options={
+                        'db_table': 'news_article_tags',
+                        'unique_together': {('article', 'tag')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='article',
+                    name='tags',
+                    field=models.ManyToManyField(blank=True, related_name='articles', through='news.ArticleTag', to='news.tag', verbose_name='Теги'),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='articletag',
+            index=models.Index(fields=['tag', 'article'], name='news_articletag_tag_article'),
+        ),
+    ]
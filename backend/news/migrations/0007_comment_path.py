@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copies of the news.models path constants
+PATH_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+PATH_STEP = 8
+BATCH_SIZE = 1000
+
+
+def path_segment(pk):
+    digits = []
+    while pk:
+        pk, digit = divmod(pk, 36)
+        digits.append(PATH_DIGITS[digit])
+    return ''.join(reversed(digits)).rjust(PATH_STEP, '0')
+
+
+def backfill_paths(apps, schema_editor):
+    """
+    Set `path` and `depth` of every comment, one primary key range per batch
+    (parents normally come before their replies; the others are picked up by
+    another pass). The path column has no fixed length, so threads of any
+    depth keep their shape.
+    """
+    Comment = apps.get_model('news', 'Comment')
+    comments = Comment._base_manager
+    while True:
+        last_pk = 0
+        progress = 0
+        while True:
+            batch = list(
+                comments.filter(pk__gt=last_pk, path='')
+                .order_by('pk')
+                .values_list('pk', 'parent_id', 'parent__path', 'parent__depth')[:BATCH_SIZE]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            known = {}
+            changed = []
+            for pk, parent_id, parent_path, parent_depth in batch:
+                if parent_id is not None:
+                    parent_path, parent_depth = known.get(parent_id, (parent_path, parent_depth))
+                    if not parent_path:
+                        continue
+                path = (parent_path or '') + path_segment(pk)
+                depth = parent_depth + 1 if parent_id is not None else 0
+                known[pk] = (path, depth)
+                changed.append(Comment(pk=pk, path=path, depth=depth))
+            comments.bulk_update(changed, ['path', 'depth'])
+            progress += len(changed)
+        if not progress:
+            return
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_article_tag_through'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Глубина'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Путь'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', 'path'], name='news_comment_article_path'),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
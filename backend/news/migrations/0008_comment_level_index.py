@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0007_comment_path'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', 'depth', 'path'], name='news_comment_level_path'),
+        ),
+    ]
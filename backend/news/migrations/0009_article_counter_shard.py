@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0008_comment_level_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='Шард')),
+                ('views', models.IntegerField(default=0, verbose_name='Просмотры')),
+                ('likes_count', models.IntegerField(default=0, verbose_name='Лайки')),
+                ('dislikes_count', models.IntegerField(default=0, verbose_name='Дизлайки')),
+                ('active_comment_count', models.IntegerField(default=0, verbose_name='Активные комментарии')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counter_shards', to='news.article', verbose_name='Статья')),
+            ],
+            options={
+                'verbose_name': 'Шард счётчиков',
+                'verbose_name_plural': 'Шарды счётчиков',
+                'unique_together': {('article', 'shard')},
+            },
+        ),
+    ]
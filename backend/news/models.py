@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import Count, Exists, OuterRef, Subquery, Value
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.utils.text import slugify
 from django.urls import reverse
 from django.utils import timezone
@@ -53,6 +55,65 @@ class Tag(models.Model):
         super().save(*args, **kwargs)
 
 
+class ArticleQuerySet(models.QuerySet):
+    """QuerySet with helpers for article feeds."""
+
+    def with_feed_data(self):
+        """
+        Prepare articles for list/detail serialization.
+
+        Joins author (with role) and category and prefetches tags, so that a
+        page of articles is loaded with a fixed number of queries regardless
+        of its size. Engagement counts are stored on the article itself.
+        """
+        return self.select_related('author__role', 'category').prefetch_related('tags')
+
+    def tagged(self, slugs, match_all=False):
+        """
+        Articles with any (or, with `match_all`, every) tag in `slugs`.
+
+        Uses a subquery on the article-tag table instead of a join, so rows
+        are not duplicated and no DISTINCT is needed.
+        """
+        slugs = set(slugs)
+        links = ArticleTag.objects.filter(tag__slug__in=slugs)
+        if not match_all:
+            return self.filter(pk__in=links.values('article_id'))
+        matching = (
+            links.values('article_id')
+            .annotate(matched=Count('tag_id'))
+            .filter(matched=len(slugs))
+            .values('article_id')
+        )
+        return self.filter(pk__in=matching)
+
+    def with_viewer_state(self, user):
+        """
+        Annotate `my_reaction` (the value of `user`'s reaction, or None) and
+        `is_bookmarked`; anonymous users get None and False.
+
+        Both are correlated subqueries on the (article, user) unique indexes,
+        so rows are not duplicated and a page is still one query.
+        """
+        if not user.is_authenticated:
+            return self.annotate(
+                my_reaction=Value(None, output_field=models.SmallIntegerField()),
+                is_bookmarked=Value(False),
+            )
+        reactions = Reaction.objects.filter(article=OuterRef('pk'), user=user).order_by()
+        return self.annotate(
+            my_reaction=Subquery(reactions.values('value')[:1]),
+            is_bookmarked=Exists(Bookmark.objects.filter(article=OuterRef('pk'), user=user)),
+        )
+
+
+class ArticleManager(models.Manager.from_queryset(ArticleQuerySet)):
+    """Default article manager; never loads the search vector column."""
+
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
+
 class Article(models.Model):
     """Article model for news posts."""
     STATUS_CHOICES = [
@@ -86,6 +147,7 @@ class Article(models.Model):
     
     tags = models.ManyToManyField(
         Tag,
+        through='ArticleTag',
         related_name='articles',
         blank=True,
         verbose_name='Теги'
@@ -102,8 +164,17 @@ class Article(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
     published_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата публикации')
     views = models.PositiveIntegerField(default=0, verbose_name='Просмотры')
+    likes_count = models.PositiveIntegerField(default=0, verbose_name='Лайки')
+    dislikes_count = models.PositiveIntegerField(default=0, verbose_name='Дизлайки')
+    active_comment_count = models.PositiveIntegerField(default=0, verbose_name='Активные комментарии')
     source_url = models.URLField(null=True, blank=True, verbose_name='Источник')
     
+    # Maintained by a database trigger on PostgreSQL (see migration 0003),
+    # which also creates the GIN index; always NULL on other databases.
+    search_vector = SearchVectorField(null=True, editable=False, verbose_name='Поисковый вектор')
+    
+    objects = ArticleManager()
+    
     class Meta:
         verbose_name = 'Статья'
         verbose_name_plural = 'Статьи'
@@ -125,6 +196,16 @@ class Article(models.Model):
             'slug': self.slug
         })
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so the related-articles signal can skip
+        # saves that keep it
+        loaded = dict(zip(field_names, values))
+        if 'category_id' in loaded and 'status' in loaded:
+            instance._loaded_related_state = (loaded['category_id'], loaded['status'])
+        return instance
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
@@ -137,6 +218,94 @@ class Article(models.Model):
         super().save(*args, **kwargs)
 
 
+class ArticleTag(models.Model):
+    """
+    Article-tag link (the former auto-created `Article.tags` table), declared
+    explicitly to index it by tag for `ArticleQuerySet.tagged`.
+    """
+    article = models.ForeignKey(Article, on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = 'news_article_tags'
+        unique_together = ('article', 'tag')
+        indexes = [
+            models.Index(fields=['tag', 'article'], name='news_articletag_tag_article'),
+        ]
+
+    def __str__(self):
+        return f'{self.article_id} -> {self.tag_id}'
+
+
+COMMENT_PATH_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+COMMENT_PATH_STEP = 8
+# Deepest reply the API accepts (depth counts from 0); the path itself has
+# no fixed length, so older, deeper threads keep their shape
+COMMENT_MAX_DEPTH = 30
+
+
+def comment_path_segment(pk):
+    """Fixed-width base-36 `pk`, so paths sort like their ids level by level."""
+    digits = []
+    while pk:
+        pk, digit = divmod(pk, 36)
+        digits.append(COMMENT_PATH_DIGITS[digit])
+    return ''.join(reversed(digits)).rjust(COMMENT_PATH_STEP, '0')
+
+
+def comment_path_end(path):
+    """Smallest path after every path starting with `path` (its next sibling)."""
+    return path[:-COMMENT_PATH_STEP] + comment_path_segment(int(path[-COMMENT_PATH_STEP:], 36) + 1)
+
+
+class CommentQuerySet(models.QuerySet):
+    """
+    Thread queries on the materialized path.
+
+    `Comment.path` is the path of the parent followed by the comment's own
+    id as a fixed-width segment, so a comment's subtree is the contiguous
+    range of paths starting with its own and sorting by path lists a thread
+    depth-first, siblings in id (creation) order. Each helper is one range
+    scan on the (article, path) index, or on (article, depth, path) for a
+    single level.
+    """
+
+    def in_thread_order(self):
+        return self.order_by('path')
+
+    def thread(self, article_id, max_depth=None):
+        """All comments of an article in thread order, optionally down to `max_depth`."""
+        queryset = self.filter(article_id=article_id)
+        if max_depth is not None:
+            queryset = queryset.filter(depth__lte=max_depth)
+        return queryset.in_thread_order()
+
+    def top_level(self, article_id):
+        """Comments of an article that are not replies, in thread order."""
+        return self.filter(article_id=article_id, depth=0).in_thread_order()
+
+    def children(self, comment):
+        """Direct replies of `comment`, in thread order."""
+        return self.filter(
+            article_id=comment.article_id, depth=comment.depth + 1,
+            path__gt=comment.path, path__lt=comment_path_end(comment.path),
+        ).in_thread_order()
+
+    def subtree(self, comment, max_depth=None, include_self=True):
+        """
+        `comment` and its descendants in thread order; `max_depth` counts
+        levels below `comment`.
+        """
+        queryset = self.filter(article_id=comment.article_id, path__lt=comment_path_end(comment.path))
+        if include_self:
+            queryset = queryset.filter(path__gte=comment.path)
+        else:
+            queryset = queryset.filter(path__gt=comment.path)
+        if max_depth is not None:
+            queryset = queryset.filter(depth__lte=comment.depth + max_depth)
+        return queryset.in_thread_order()
+
+
 class Comment(models.Model):
     """Comment model for articles."""
     article = models.ForeignKey(
@@ -167,14 +336,44 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
     is_active = models.BooleanField(default=True, verbose_name='Активен')
+    # Materialized path (see CommentQuerySet), set on insert; empty until
+    # backfilled for comments created before it existed
+    path = models.TextField(blank=True, default='', editable=False, verbose_name='Путь')
+    depth = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Глубина')
+    
+    objects = CommentQuerySet.as_manager()
     
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['article', 'path'], name='news_comment_article_path'),
+            models.Index(fields=['article', 'depth', 'path'], name='news_comment_level_path'),
+        ]
     
     def __str__(self):
         return f'Комментарий от {self.author.username} к статье "{self.article.title}"'
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so counter signals can detect moderation toggles
+        instance._loaded_is_active = dict(zip(field_names, values)).get('is_active')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding or self.path:
+            return super().save(*args, **kwargs)
+        parent = self.parent if self.parent_id else None
+        self.depth = parent.depth + 1 if parent else 0
+        using = kwargs.get('using') or router.db_for_write(Comment, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+            # The path ends with the new id; below an unbackfilled parent it is left to the backfill
+            if parent is None or parent.path:
+                self.path = (parent.path if parent else '') + comment_path_segment(self.pk)
+                Comment._base_manager.using(using).filter(pk=self.pk).update(path=self.path)
 
 
 class Reaction(models.Model):
@@ -212,6 +411,13 @@ class Reaction(models.Model):
 
     def __str__(self):
         return f'{self.user.username} -> {self.get_value_display()} -> {self.article.title}'
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored value so counter signals can detect like/dislike flips
+        instance._loaded_value = dict(zip(field_names, values)).get('value')
+        return instance
 
 
 class Bookmark(models.Model):
@@ -240,3 +446,102 @@ class Bookmark(models.Model):
     
     def __str__(self):
         return f'{self.user.username} -> {self.article.title}'
+
+
+class TrendingScore(models.Model):
+    """
+    Precomputed trending rank of an article, globally (category is NULL)
+    and within its category. Rebuilt by `news.trending.compute_trending`.
+    """
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name='trending_scores',
+        verbose_name='Статья'
+    )
+
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='trending_scores',
+        verbose_name='Категория'
+    )
+
+    rank = models.PositiveIntegerField(verbose_name='Место')
+    score = models.FloatField(verbose_name='Рейтинг')
+    computed_at = models.DateTimeField(verbose_name='Дата расчёта')
+
+    class Meta:
+        verbose_name = 'Популярная статья'
+        verbose_name_plural = 'Популярные статьи'
+        ordering = ['category', 'rank']
+        indexes = [
+            models.Index(fields=['category', 'rank']),
+        ]
+
+    def __str__(self):
+        return f'#{self.rank} {self.article_id} ({self.score:.3f})'
+
+
+class RelatedArticle(models.Model):
+    """
+    Precomputed "read next" neighbour of an article, scored by tag/category
+    similarity. Maintained by `news.related`.
+    """
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name='related_entries',
+        verbose_name='Статья'
+    )
+
+    related = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожая статья'
+    )
+
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        verbose_name = 'Похожая статья'
+        verbose_name_plural = 'Похожие статьи'
+        unique_together = ('article', 'related')
+        ordering = ['article', '-score', 'related']
+        indexes = [
+            models.Index(fields=['article', '-score', 'related']),
+        ]
+
+    def __str__(self):
+        return f'{self.article_id} -> {self.related_id} ({self.score:.3f})'
+
+
+class ArticleCounterShard(models.Model):
+    """
+    Counter increments of an article that have not been folded into its
+    columns yet, spread over NEWS_COUNTER_SHARDS rows (see news.counters).
+    Deltas may be negative.
+    """
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name='counter_shards',
+        verbose_name='Статья'
+    )
+
+    shard = models.PositiveSmallIntegerField(verbose_name='Шард')
+    views = models.IntegerField(default=0, verbose_name='Просмотры')
+    likes_count = models.IntegerField(default=0, verbose_name='Лайки')
+    dislikes_count = models.IntegerField(default=0, verbose_name='Дизлайки')
+    active_comment_count = models.IntegerField(default=0, verbose_name='Активные комментарии')
+
+    class Meta:
+        verbose_name = 'Шард счётчиков'
+        verbose_name_plural = 'Шарды счётчиков'
+        unique_together = ('article', 'shard')
+
+    def __str__(self):
+        return f'{self.article_id}#{self.shard}'
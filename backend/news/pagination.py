@@ -0,0 +1,225 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by the sort key of the last row instead of an OFFSET, so
+every page is a single indexed range scan and no COUNT(*) is executed. The
+sort key is whatever ordering the filter backends left on the queryset, with
+the primary key appended as a tie-breaker; NULLs always sort last.
+"""
+import base64
+import json
+import operator
+from datetime import date, datetime
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Forward-only cursor pagination over a composite sort key."""
+    ordering = ('-id',)
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.keys = self.get_keys(queryset)
+
+        queryset = queryset.order_by(*[
+            F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_last=True)
+            for name, descending in self.keys
+        ])
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_after_condition(position))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_keys(self, queryset):
+        """Return [(field name, descending)] ending with the primary key."""
+        ordering = [
+            field for field in queryset.query.order_by if isinstance(field, str)
+        ] or list(self.ordering)
+        keys = []
+        for field in ordering:
+            name = field.lstrip('-')
+            if name == 'pk':
+                name = self.model._meta.pk.name
+            keys.append((name, field.startswith('-')))
+        if self.model._meta.pk.name not in [name for name, _ in keys]:
+            keys.append((self.model._meta.pk.name, False))
+        return keys
+
+    def _is_nullable(self, name):
+        try:
+            return self.model._meta.get_field(name).null
+        except FieldDoesNotExist:
+            # Annotations (e.g. search rank) may be NULL
+            return True
+
+    def get_after_condition(self, position):
+        """
+        Build `(k1, k2, ...) > (v1, v2, ...)` respecting per-key direction.
+
+        Expanded as k1 > v1 OR (k1 = v1 AND k2 > v2) OR ... so that it works
+        with mixed ASC/DESC keys and NULL values.
+        """
+        terms = []
+        equal = Q()
+        for (name, descending), value in zip(self.keys, position):
+            if value is None:
+                # NULLs sort last, so only rows with the same NULL can follow
+                equal &= Q(**{f'{name}__isnull': True})
+                continue
+            step = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+            if self._is_nullable(name):
+                step |= Q(**{f'{name}__isnull': True})
+            terms.append(equal & step)
+            equal &= Q(**{name: value})
+        if not terms:
+            return Q(pk__in=[])
+        return reduce(operator.or_, terms)
+
+    def _field_value(self, row, name):
+        if isinstance(row, dict):
+            # .values() rows (see news.fast_list)
+            return row.get(name)
+        value = row
+        for part in name.split('__'):
+            value = getattr(value, part, None)
+            if value is None:
+                return None
+        if hasattr(value, 'pk'):
+            return value.pk
+        return value
+
+    def encode_cursor(self, row):
+        position = []
+        for name, _ in self.keys:
+            value = self._field_value(row, name)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            position.append(value)
+        raw = json.dumps(position, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            position = json.loads(raw)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+
+        values = []
+        for (name, _), value in zip(self.keys, position):
+            if value is not None and '__' not in name:
+                try:
+                    value = self.model._meta.get_field(name).to_python(value)
+                except FieldDoesNotExist:
+                    pass
+                except Exception:
+                    raise NotFound(self.invalid_cursor_message)
+            values.append(value)
+        return values
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class ArticleCursorPagination(KeysetPagination):
+    """Keyset pagination for the article feed"""
+    ordering = ('-published_at', '-created_at', 'id')
+
+
+class CommentCursorPagination(KeysetPagination):
+    """Keyset pagination for comment lists"""
+    ordering = ('created_at', 'id')
+
+
+class CommentThreadPagination(KeysetPagination):
+    """
+    Keyset pagination for one level of a comment thread (top-level comments
+    or the replies of one comment), in thread order. The materialized path
+    is unique, so it is the whole sort key.
+    """
+    ordering = ('path',)
+    page_size = 20
+
+    def get_keys(self, queryset=None):
+        return [('path', False)]
+
+    def cursor_after(self, comment):
+        """Cursor of the page following `comment`."""
+        self.keys = self.get_keys()
+        return self.encode_cursor(comment)
+
+
+class SelectablePaginationMixin:
+    """
+    Lets clients switch a view to keyset pagination per request.
+
+    `?pagination=cursor` (or any request carrying a cursor) uses
+    `cursor_pagination_class`; other requests keep `pagination_class`.
+    """
+    cursor_pagination_class = None
+
+    def use_cursor_pagination(self):
+        params = self.request.query_params
+        return self.cursor_pagination_class is not None and (
+            params.get('pagination') == 'cursor'
+            or self.cursor_pagination_class.cursor_query_param in params
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.request is not None and self.use_cursor_pagination():
+                self._paginator = self.cursor_pagination_class()
+            else:
+                return super().paginator
+        return self._paginator
@@ -0,0 +1,183 @@
+"""
+Reaction writes without read-modify-write races.
+
+`update_or_create` reads the reaction and then inserts or updates it in
+separate round trips, so concurrent clicks could both insert (one fails on
+the unique constraint) or apply counter deltas from a stale value. On
+PostgreSQL every write here is one statement:
+
+* `set_reaction`: ``INSERT ... ON CONFLICT (article_id, user_id) DO UPDATE
+  ... WHERE value <> EXCLUDED.value RETURNING``. A returned row was either
+  inserted (no previous reaction) or flipped from the opposite value; no row
+  means the value was already set. The previous value is therefore known
+  without reading it, and the like/dislike counter deltas are applied from it.
+* `clear_reaction`: ``DELETE ... RETURNING value``.
+
+Other databases lock the row (where supported) and write through the model
+inside a transaction; the model signals maintain the counters.
+"""
+from django.db import IntegrityError, connections, router, transaction
+from django.utils import timezone
+
+from . import counters, response_cache
+from .models import Reaction
+
+VALUES = (Reaction.LIKE, Reaction.DISLIKE)
+
+
+def _connection():
+    return connections[router.db_for_write(Reaction)]
+
+
+def _uses_upsert(connection):
+    return connection.vendor == 'postgresql'
+
+
+def _check_value(value):
+    # The previous value of a flipped row is inferred as the other one
+    if value not in VALUES:
+        raise ValueError(f'Reaction value must be one of {VALUES}, not {value!r}')
+
+
+def _applied(article_id, previous, current):
+    counters.apply_reaction_change(article_id, previous, current)
+    response_cache.invalidate_articles(article_id)
+
+
+def _table(connection):
+    """Quoted table name and column names by field name."""
+    quote = connection.ops.quote_name
+    columns = {field.name: quote(field.column) for field in Reaction._meta.concrete_fields}
+    return quote(Reaction._meta.db_table), columns
+
+
+def _upsert(connection, article_id, user, value):
+    """
+    Insert or flip the reaction; returns (pk, created_at, previous value),
+    or None when it already had `value`.
+    """
+    table, column = _table(connection)
+    sql = (
+        f"INSERT INTO {table} ({column['article']}, {column['user']}, {column['value']}, {column['created_at']}) "
+        f"VALUES (%s, %s, %s, %s) "
+        f"ON CONFLICT ({column['article']}, {column['user']}) "
+        f"DO UPDATE SET {column['value']} = EXCLUDED.{column['value']} "
+        f"WHERE {table}.{column['value']} <> EXCLUDED.{column['value']} "
+        f"RETURNING {column['id']}, {column['created_at']}, xmax = 0"
+    )
+    with transaction.atomic(using=connection.alias, savepoint=False):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [article_id, user.pk, value, timezone.now()])
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        pk, created_at, inserted = row
+        previous = None if inserted else -value
+        _applied(article_id, previous, value)
+    return pk, created_at, previous
+
+
+def _delete(connection, article_id, user, value=None):
+    """Delete the reaction (only if it has `value`, when given); returns its value."""
+    table, column = _table(connection)
+    sql = f"DELETE FROM {table} WHERE {column['article']} = %s AND {column['user']} = %s"
+    params = [article_id, user.pk]
+    if value is not None:
+        sql += f" AND {column['value']} = %s"
+        params.append(value)
+    with transaction.atomic(using=connection.alias, savepoint=False):
+        with connection.cursor() as cursor:
+            cursor.execute(sql + f" RETURNING {column['value']}", params)
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        _applied(article_id, row[0], None)
+    return row[0]
+
+
+def _locked_reaction(connection, article_id, user):
+    return (
+        Reaction.objects.using(connection.alias).select_for_update()
+        .filter(article_id=article_id, user=user).order_by().first()
+    )
+
+
+def _set_locked(connection, article_id, user, value, toggle=False):
+    """
+    Write through the model in a transaction; with `toggle` an existing
+    reaction with `value` is deleted (the returned reaction is then None).
+    """
+    with transaction.atomic(using=connection.alias):
+        reaction = _locked_reaction(connection, article_id, user)
+        if reaction is None:
+            try:
+                with transaction.atomic(using=connection.alias):
+                    reaction = Reaction.objects.using(connection.alias).create(
+                        article_id=article_id, user=user, value=value
+                    )
+                return reaction, None
+            except IntegrityError:
+                # Created concurrently
+                reaction = _locked_reaction(connection, article_id, user)
+        previous = reaction.value
+        if toggle and previous == value:
+            reaction.delete()
+            return None, previous
+        if previous != value:
+            reaction.value = value
+            reaction.save(update_fields=['value'])
+        return reaction, previous
+
+
+def set_reaction(article_id, user, value):
+    """
+    Set `user`'s reaction to the article to `value`; returns the reaction and
+    the previous value (None when there was none). Counters are updated.
+    """
+    _check_value(value)
+    connection = _connection()
+    if not _uses_upsert(connection):
+        return _set_locked(connection, article_id, user, value)
+    while True:
+        row = _upsert(connection, article_id, user, value)
+        if row is not None:
+            pk, created_at, previous = row
+            reaction = Reaction(pk=pk, article_id=article_id, user=user, value=value, created_at=created_at)
+            reaction._loaded_value = value
+            return reaction, previous
+        reaction = Reaction.objects.using(connection.alias).filter(article_id=article_id, user=user).first()
+        if reaction is not None:
+            return reaction, value
+        # Deleted in between, insert again
+
+
+def clear_reaction(article_id, user):
+    """Remove `user`'s reaction to the article; returns its value, or None."""
+    connection = _connection()
+    if _uses_upsert(connection):
+        return _delete(connection, article_id, user)
+    with transaction.atomic(using=connection.alias):
+        reaction = _locked_reaction(connection, article_id, user)
+        if reaction is None:
+            return None
+        reaction.delete()
+        return reaction.value
+
+
+def toggle_reaction(article_id, user, value):
+    """
+    Set the reaction to `value`, or remove it when it already is `value`
+    (clicking "like" twice); returns (new value or None, previous value).
+    """
+    _check_value(value)
+    connection = _connection()
+    if not _uses_upsert(connection):
+        reaction, previous = _set_locked(connection, article_id, user, value, toggle=True)
+        return (value if reaction is not None else None), previous
+    while True:
+        row = _upsert(connection, article_id, user, value)
+        if row is not None:
+            return value, row[2]
+        if _delete(connection, article_id, user, value) is not None:
+            return None, value
+        # Changed in between, try again
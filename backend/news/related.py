@@ -0,0 +1,184 @@
+"""
+Related articles ("read next").
+
+Published articles are represented as sparse feature vectors over their tags
+and category (the category weighs `CATEGORY_WEIGHT`), L2-normalized, so a
+sparse matrix product gives the cosine similarity of every article pair
+that shares a feature. The best `NEWS_RELATED_ARTICLES_COUNT` neighbours of
+each article are stored in `RelatedArticle`, so reads are one indexed
+lookup.
+
+* `build_related_articles` rebuilds the table (Celery beat), multiplying
+  `CHUNK_SIZE` rows at a time to bound memory.
+* `update_related_articles` refreshes it after the tags, category or status
+  of some articles changed: their own lists and the lists that contained
+  them are recomputed, and other articles sharing a feature with them merge
+  the new scores into their stored lists. Similarities between two
+  unchanged articles do not change, so this is exact.
+"""
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from scipy import sparse
+
+from .models import Article, RelatedArticle
+
+CATEGORY_WEIGHT = 0.5
+CHUNK_SIZE = 1000
+
+
+def _count():
+    return getattr(settings, 'NEWS_RELATED_ARTICLES_COUNT', 10)
+
+
+def _published():
+    return Article.objects.filter(status='published')
+
+
+def _vectors(queryset):
+    """Return sorted article ids and their normalized feature matrix (CSR)."""
+    ids = np.array(list(queryset.order_by('pk').values_list('pk', flat=True)), dtype=np.int64)
+    through = Article.tags.through
+    tags = np.array(
+        list(through.objects.filter(article__in=queryset.values('pk')).values_list('article_id', 'tag_id')),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    categories = np.array(
+        list(queryset.filter(category__isnull=False).values_list('pk', 'category_id')), dtype=np.int64,
+    ).reshape(-1, 2)
+
+    # Tags and categories share the column space: tag t -> 2t, category c -> 2c + 1
+    rows = np.searchsorted(ids, np.concatenate([tags[:, 0], categories[:, 0]]))
+    columns = np.concatenate([tags[:, 1] * 2, categories[:, 1] * 2 + 1])
+    values = np.concatenate([np.ones(len(tags)), np.full(len(categories), CATEGORY_WEIGHT)])
+    width = int(columns.max()) + 1 if len(columns) else 0
+    matrix = sparse.csr_matrix((values, (rows, columns)), shape=(len(ids), width))
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return ids, sparse.diags(1.0 / norms) @ matrix
+
+
+def _sharing_features(article_ids):
+    """Published articles sharing a tag or the category with `article_ids`."""
+    through = Article.tags.through
+    tag_ids = through.objects.filter(article_id__in=article_ids).values('tag_id')
+    category_ids = Article.objects.filter(pk__in=article_ids, category__isnull=False).values('category_id')
+    return _published().filter(
+        Q(pk__in=through.objects.filter(tag_id__in=tag_ids).values('article_id'))
+        | Q(category_id__in=category_ids)
+    )
+
+
+def _top(related, scores, count):
+    """Best `count` (related id, score) pairs, highest score first."""
+    if len(scores) > count:
+        keep = np.argpartition(-scores, count - 1)[:count]
+        related, scores = related[keep], scores[keep]
+    order = np.lexsort((related, -scores))
+    return list(zip(related[order].tolist(), scores[order].tolist()))
+
+
+def similarities(row_ids, rows, column_ids, columns):
+    """
+    Yield (article id, related ids, scores) for every row, from
+    ``rows @ columns.T`` computed `CHUNK_SIZE` rows at a time. Self pairs
+    and zero scores are dropped.
+    """
+    width = max(rows.shape[1], columns.shape[1])
+    rows = sparse.csr_matrix(rows, shape=(rows.shape[0], width))
+    transposed = sparse.csr_matrix(columns, shape=(columns.shape[0], width)).T.tocsc()
+    for start in range(0, rows.shape[0], CHUNK_SIZE):
+        product = (rows[start:start + CHUNK_SIZE] @ transposed).tocsr()
+        for offset in range(product.shape[0]):
+            article_id = row_ids[start + offset]
+            lo, hi = product.indptr[offset], product.indptr[offset + 1]
+            related = column_ids[product.indices[lo:hi]]
+            scores = product.data[lo:hi]
+            keep = (related != article_id) & (scores > 0)
+            yield int(article_id), related[keep], scores[keep]
+
+
+def _store(neighbours):
+    """Insert (article id, [(related id, score), ...]) rows; returns the count."""
+    batch = []
+    total = 0
+    for article_id, pairs in neighbours:
+        batch.extend(
+            RelatedArticle(article_id=article_id, related_id=related_id, score=score)
+            for related_id, score in pairs
+        )
+        if len(batch) >= CHUNK_SIZE:
+            RelatedArticle.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    RelatedArticle.objects.bulk_create(batch)
+    return total + len(batch)
+
+
+@transaction.atomic
+def build_related_articles():
+    """Rebuild the whole neighbour table; returns the number of rows."""
+    count = _count()
+    ids, matrix = _vectors(_published())
+    RelatedArticle.objects.all().delete()
+    return _store(
+        (article_id, _top(related, scores, count))
+        for article_id, related, scores in similarities(ids, matrix, ids, matrix)
+    )
+
+
+@transaction.atomic
+def update_related_articles(article_ids):
+    """Refresh the neighbour lists affected by changes to `article_ids`."""
+    count = _count()
+    changed = set(article_ids)
+    # Lists that contained a changed article may lose it to a lower-ranked one
+    recompute = changed | set(
+        RelatedArticle.objects.filter(related_id__in=changed).values_list('article_id', flat=True)
+    )
+    RelatedArticle.objects.filter(article_id__in=recompute).delete()
+
+    ids, matrix = _vectors(_published().filter(pk__in=recompute))
+    if len(ids):
+        candidate_ids, candidates = _vectors(_sharing_features(ids.tolist()))
+        _store(
+            (article_id, _top(related, scores, count))
+            for article_id, related, scores in similarities(ids, matrix, candidate_ids, candidates)
+        )
+
+    changed_ids, changed_matrix = _vectors(_published().filter(pk__in=changed))
+    if not len(changed_ids):
+        return
+    other_ids, others = _vectors(_sharing_features(changed_ids.tolist()).exclude(pk__in=recompute))
+    new_scores = {
+        article_id: (related, scores)
+        for article_id, related, scores in similarities(other_ids, others, changed_ids, changed_matrix)
+        if len(scores)
+    }
+    stored = {}
+    for article_id, related_id, score in RelatedArticle.objects.filter(
+        article_id__in=list(new_scores)
+    ).values_list('article_id', 'related_id', 'score'):
+        stored.setdefault(article_id, []).append((related_id, score))
+
+    merged = []
+    for article_id, (related, scores) in new_scores.items():
+        previous = stored.get(article_id, [])
+        merged.append((article_id, _top(
+            np.concatenate([related, np.array([pk for pk, _ in previous], dtype=np.int64)]),
+            np.concatenate([scores, np.array([score for _, score in previous])]),
+            count,
+        )))
+    RelatedArticle.objects.filter(article_id__in=list(new_scores)).delete()
+    _store(merged)
+
+
+def related_article_ids(article_id, limit=None):
+    """Ids of the stored neighbours of `article_id`, best first."""
+    limit = limit or _count()
+    return list(
+        RelatedArticle.objects.filter(article_id=article_id)
+        .order_by('-score', 'related_id').values_list('related_id', flat=True)[:limit]
+    )
@@ -0,0 +1,43 @@
+"""
+orjson-based JSON renderer.
+
+Produces the same bytes as DRF's `JSONRenderer` with the default settings
+(compact separators, unescaped unicode, U+2028/U+2029 escaped, datetimes
+formatted by DRF's encoder) at a fraction of the cost. Anything orjson
+cannot reproduce exactly (indented output, non-default JSON settings,
+integers wider than 64 bits, floats in exponent notation) falls back to
+`JSONRenderer`.
+"""
+import re
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+# orjson writes 1e16 where json writes 1e+16; also matches inside strings,
+# which only costs a fallback
+EXPONENT_RE = re.compile(rb'\de[-\d]')
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Drop-in, byte-compatible replacement for `JSONRenderer`."""
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            self.get_indent(accepted_media_type, renderer_context or {}) is not None
+            or not (self.compact and self.ensure_ascii is False and api_settings.STRICT_JSON)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self._encoder.default, option=ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        if EXPONENT_RE.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, for embedding in <script> tags
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
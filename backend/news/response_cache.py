@@ -0,0 +1,217 @@
+"""
+Versioned response cache for anonymous article reads.
+
+Anonymous readers all see the same published-only data, so their list and
+detail responses are cached under a key built from the request path, host,
+normalized query params and the current *generations* of the data involved:
+
+* ``global`` - bumped by Tag and Category changes (embedded in every article);
+* ``articles`` - bumped by any Article, Comment or Reaction change (lists
+  include counters);
+* ``article:<id>`` - bumped by changes to that article, its comments or
+  reactions;
+* ``table:<db_table>`` - bumped by any change to a small table (tags,
+  categories), also used as its version by `news.conditional`.
+
+Invalidation is a `cache.set` of a new generation (see `signals`);
+stale entries are never looked up again and expire after
+`NEWS_RESPONSE_CACHE_TIMEOUT` seconds. Authenticated requests bypass the cache
+so authors and staff always see fresh drafts.
+
+View counts are not part of the invalidation scheme: a cached entry remembers
+how many views each article had recorded when it was stored and adds the
+views recorded since on every hit.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from pulse_news import metrics
+
+from . import view_counter
+
+GENERATION_KEY = 'news:cache:gen:{}'
+RESPONSE_KEY = 'news:cache:response:{}'
+STATS_KEY = 'news:cache:stats:{}'
+
+GLOBAL_SCOPE = 'global'
+ARTICLES_SCOPE = 'articles'
+ARTICLE_SCOPE = 'article:{}'
+TABLE_SCOPE = 'table:{}'
+
+
+def _new_generation():
+    return time.time_ns()
+
+
+def get_generations(scopes):
+    """Return the current generation of each scope."""
+    keys = [GENERATION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    generations = []
+    for key in keys:
+        generation = found.get(key)
+        if generation is None:
+            # Start evicted or new scopes at a fresh value, never a default
+            # that older entries could have been stored under
+            cache.add(key, _new_generation(), timeout=None)
+            generation = cache.get(key)
+        generations.append(generation)
+    return generations
+
+
+def bump(*scopes):
+    """Invalidate every cached response that depends on `scopes`."""
+    generation = _new_generation()
+    cache.set_many({GENERATION_KEY.format(scope): generation for scope in scopes}, timeout=None)
+
+
+def bump_on_commit(*scopes):
+    # Bump now so the writing request itself never reads a stale entry, and
+    # again after commit in case a reader cached pre-commit data meanwhile
+    bump(*scopes)
+    transaction.on_commit(lambda: bump(*scopes))
+
+
+def invalidate_articles(*article_ids):
+    bump_on_commit(ARTICLES_SCOPE, *[ARTICLE_SCOPE.format(pk) for pk in article_ids])
+
+
+def invalidate_all(*scopes):
+    bump_on_commit(GLOBAL_SCOPE, *scopes)
+
+
+def table_scope(model):
+    return TABLE_SCOPE.format(model._meta.db_table)
+
+
+def get_table_generation(model):
+    """Version of a whole table; changes on every write to it."""
+    return get_generations([table_scope(model)])[0]
+
+
+def _record(outcome):
+    metrics.RESPONSE_CACHE.inc(result='hit' if outcome == 'hits' else 'miss')
+    key = STATS_KEY.format(outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_stats():
+    hits = cache.get(STATS_KEY.format('hits'), 0)
+    misses = cache.get(STATS_KEY.format('misses'), 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
+
+
+def reset_stats():
+    cache.delete_many([STATS_KEY.format('hits'), STATS_KEY.format('misses')])
+
+
+def normalize_params(query_params):
+    """Query string with keys and repeated values in a stable order."""
+    return urlencode(sorted(
+        (key, value)
+        for key in query_params
+        for value in query_params.getlist(key)
+    ))
+
+
+def _articles(data):
+    items = data.get('results', [data]) if isinstance(data, dict) else data
+    return [item for item in items if isinstance(item, dict) and 'views' in item and 'id' in item]
+
+
+def _snapshot_views(data):
+    return view_counter.recorded_views([item['id'] for item in _articles(data)])
+
+
+def _refresh_views(data, snapshot):
+    current = view_counter.recorded_views(snapshot)
+    for item in _articles(data):
+        recorded_then = snapshot.get(item['id'])
+        if recorded_then is not None:
+            recorded_now = current[item['id']]
+            if recorded_now < recorded_then:
+                # The total expired and restarted since the snapshot
+                recorded_then = 0
+            item['views'] += recorded_now - recorded_then
+
+
+def build_key(request, scopes):
+    raw = '|'.join([
+        request.get_host(),
+        request.path,
+        normalize_params(request.query_params),
+        *map(str, get_generations(scopes)),
+    ])
+    return RESPONSE_KEY.format(hashlib.sha1(raw.encode()).hexdigest())
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Caches `list` and `retrieve` responses for anonymous users.
+
+    Responses carry `X-Cache: HIT`, `MISS` or `BYPASS`.
+    """
+
+    def is_response_cacheable(self, request):
+        return (
+            getattr(settings, 'NEWS_RESPONSE_CACHE_TIMEOUT', 0) > 0
+            and not request.user.is_authenticated
+        )
+
+    def cached_response(self, request, scopes, handler, *args, **kwargs):
+        if not self.is_response_cacheable(request):
+            response = handler(request, *args, **kwargs)
+            response['X-Cache'] = 'BYPASS'
+            return response
+
+        key = build_key(request, scopes)
+        entry = cache.get(key)
+        if entry is not None:
+            _record('hits')
+            data, snapshot = entry
+            self.on_cache_hit(request, data)
+            _refresh_views(data, snapshot)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _record('misses')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            entry = (response.data, _snapshot_views(response.data))
+            cache.set(key, entry, timeout=settings.NEWS_RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def on_cache_hit(self, request, data):
+        """Side effects of the skipped handler that must still happen."""
+        if self.action == 'retrieve':
+            # The serializer records views on a miss; cached hits still count
+            view_counter.record_view(data['id'])
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, [GLOBAL_SCOPE, ARTICLES_SCOPE], super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return self.cached_response(
+            request, [GLOBAL_SCOPE, ARTICLE_SCOPE.format(pk)], super().retrieve, *args, **kwargs
+        )
@@ -0,0 +1,116 @@
+"""
+Article search backends.
+
+`ArticleSearchFilter` is the single place where `?search=` is applied. It
+delegates to the backend configured by `NEWS_SEARCH_BACKEND`:
+
+* ``'auto'`` (default) - PostgreSQL full-text search when running on
+  PostgreSQL, substring matching otherwise;
+* ``'postgres'`` / ``'simple'`` - force one of the built-in backends;
+* ``'segment'`` - the on-disk inverted index in `news.search_index`;
+* a dotted path to a `BaseSearchBackend` subclass.
+
+Ranked backends annotate `search_rank`, which is used for ordering unless the
+client asked for an explicit `?ordering=`.
+"""
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Func, IntegerField, Q
+from django.db.models.functions import Cast
+from django.db.models.lookups import Exact
+from django.utils.module_loading import import_string
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+
+class BaseSearchBackend:
+    """Interface for article search backends."""
+    ranked = False
+
+    def search(self, queryset, query):
+        """Return `queryset` restricted to articles matching `query`."""
+        raise NotImplementedError
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Case-insensitive substring search, used where full-text search is unavailable."""
+
+    def search(self, queryset, query):
+        return queryset.filter(self.condition(query))
+
+    @staticmethod
+    def condition(query):
+        return Q(title__icontains=query) | Q(content__icontains=query) | Q(excerpt__icontains=query)
+
+
+class NumNode(Func):
+    """Number of operators and lexemes in a tsquery (0 if only stop words)."""
+    function = 'numnode'
+    output_field = IntegerField()
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    PostgreSQL full-text search over the trigger-maintained `search_vector`.
+
+    Queries use websearch syntax ("quoted phrases", OR, -exclusions) and are
+    matched through the GIN index; results are ranked with ts_rank using the
+    title/excerpt/content weights stored in the vector. A query made only of
+    stop words ("about") has no lexemes and falls back to substring matching.
+    """
+    ranked = True
+    config = 'russian'
+
+    def search(self, queryset, query):
+        search_query = SearchQuery(query, config=self.config, search_type='websearch')
+        # ts_rank returns real; cast so the value survives a round trip
+        # through cursor pagination without losing precision
+        # The query is a constant, so PostgreSQL folds the fallback branch
+        # away for ordinary queries and still uses the GIN index
+        return queryset.filter(
+            Q(search_vector=search_query)
+            | Q(Exact(NumNode(search_query), 0), SimpleSearchBackend.condition(query))
+        ).annotate(
+            search_rank=Cast(SearchRank(F('search_vector'), search_query), FloatField())
+        )
+
+
+BACKENDS = {
+    'simple': SimpleSearchBackend,
+    'postgres': PostgresSearchBackend,
+    'segment': 'news.search_index.SegmentIndexSearchBackend',
+}
+
+
+def get_search_backend():
+    """Instantiate the backend selected by `NEWS_SEARCH_BACKEND`."""
+    name = getattr(settings, 'NEWS_SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        name = 'postgres' if connection.vendor == 'postgresql' else 'simple'
+    backend_class = BACKENDS.get(name, name)
+    if isinstance(backend_class, str):
+        backend_class = import_string(backend_class)
+    return backend_class()
+
+
+class ArticleSearchFilter(filters.BaseFilterBackend):
+    """
+    Applies `?search=` through the configured search backend.
+
+    Must run after `OrderingFilter` so that relevance ordering can replace the
+    default ordering.
+    """
+    search_param = api_settings.SEARCH_PARAM
+    ordering_param = api_settings.ORDERING_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+
+        backend = get_search_backend()
+        queryset = backend.search(queryset, query)
+        if backend.ranked and not request.query_params.get(self.ordering_param):
+            queryset = queryset.order_by('-search_rank', *queryset.query.order_by)
+        return queryset
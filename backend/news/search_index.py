@@ -0,0 +1,648 @@
+"""
+Segment-based inverted index for article search.
+
+A pure-Python alternative to PostgreSQL full-text search for deployments
+that cannot use it (SQLite, read-only search replicas). The index lives in
+`NEWS_SEARCH_INDEX_DIR` as a set of immutable segment files listed in
+`manifest.json`:
+
+* each segment holds a document table (article id, BM25 length norm), a
+  sorted term dictionary with a fixed-width offset table for binary search,
+  and delta + varint encoded postings of (document ordinal, term frequency);
+* deletions never touch a segment; they are recorded in a per-segment
+  ``.del`` file whose name is bumped on every commit;
+* the manifest is replaced atomically, so readers always see a consistent
+  set of files.
+
+Readers mmap the segment files, so gunicorn workers share them through the
+page cache. Writers (Celery tasks, the `rebuild_search_index` command) are
+serialized with a lock file; updates append a new segment and small segments
+are merged in the background.
+"""
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+from collections import defaultdict
+from contextlib import contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Case, FloatField, Value, When
+
+from .search import BaseSearchBackend, get_search_backend
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows development machines
+    fcntl = None
+
+MAGIC = b'PNIDX001'
+# magic, doc count, term count, total length, docs/postings/term index/terms offsets
+HEADER = struct.Struct('<8sIIQQQQQ')
+DOC = struct.Struct('<QI')
+OFFSET = struct.Struct('<Q')
+
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = 'write.lock'
+# Segment and deletion files written by IndexWriter; commits only ever
+# remove files named like these
+INDEX_FILE_RE = re.compile(r'seg_\d+(?:\.seg|_\d+\.del)')
+
+# Term frequencies are weighted per field (a simplified BM25F)
+FIELD_WEIGHTS = (('title', 3), ('excerpt', 2), ('content', 1))
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_TOKEN_LENGTH = 64
+STOP_WORDS = frozenset('''
+    а без более бы был была были было быть в вам вас весь во вот все всего всех вы
+    где да даже для до его ее ей ему если есть еще же за здесь и из или им их к как
+    ко когда кто ли либо мне может мы на над надо наш не него нее нет ни них но ну о
+    об однако он она они оно от очень по под при с со так также такой там те тем то
+    того тоже той только том ты у уже хотя чего чей чем что чтобы чье чья эта эти это
+    я a an and are as at be by for from in is it of on or that the this to was were with
+'''.split())
+# Light Russian stemming: strip the longest inflectional ending
+RUSSIAN_ENDINGS = sorted('''
+    иями ями ами ией иям ием иях ого его ому ему ыми ими ешь ишь ете ите ует уют ают
+    ах ях ов ев ей ой ий ый ая яя ое ее ую юю ом ем ам ям ых их ия ие ии ию ью ет
+    ют ут ат ят ит ем им ые ие ой а я о е ы и у ю ь й
+'''.split(), key=len, reverse=True)
+
+
+def stem(token):
+    if token.isascii():
+        return token
+    for ending in RUSSIAN_ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= 3:
+            return token[:-len(ending)]
+    return token
+
+
+def tokenize(text):
+    """Yield normalized index terms for `text`."""
+    for match in TOKEN_RE.finditer(text.lower().replace('ё', 'е')):
+        token = match.group()
+        if len(token) < 2 or len(token) > MAX_TOKEN_LENGTH or token in STOP_WORDS:
+            continue
+        yield stem(token)
+
+
+def analyze(fields):
+    """Return ({term: weighted frequency}, weighted length) for a document."""
+    frequencies = defaultdict(int)
+    length = 0
+    for field, weight in FIELD_WEIGHTS:
+        for term in tokenize(fields.get(field) or ''):
+            frequencies[term] += weight
+            length += weight
+    return frequencies, length
+
+
+def encode_varint(value, out):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_sorted_ints(values):
+    out = bytearray()
+    previous = 0
+    for value in values:
+        encode_varint(value - previous, out)
+        previous = value
+    return bytes(out)
+
+
+def decode_sorted_ints(buf):
+    values = []
+    pos = 0
+    current = 0
+    while pos < len(buf):
+        delta, pos = decode_varint(buf, pos)
+        current += delta
+        values.append(current)
+    return values
+
+
+def write_segment(path, docs, postings):
+    """
+    Write an immutable segment file.
+
+    `docs` is a list of (article_id, length) sorted by article id; a
+    document's ordinal is its position in that list. `postings` yields
+    (term, [(ordinal, frequency), ...]) in term order with ordinals ascending.
+    """
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as fh:
+        fh.write(b'\0' * HEADER.size)
+
+        docs_offset = fh.tell()
+        total_length = 0
+        for article_id, length in docs:
+            fh.write(DOC.pack(article_id, length))
+            total_length += length
+
+        postings_offset = fh.tell()
+        entries = []
+        position = 0
+        for term, term_postings in postings:
+            buf = bytearray()
+            previous = 0
+            for ordinal, frequency in term_postings:
+                encode_varint(ordinal - previous, buf)
+                encode_varint(frequency, buf)
+                previous = ordinal
+            fh.write(buf)
+            entries.append((term.encode(), len(term_postings), position, len(buf)))
+            position += len(buf)
+
+        term_index = bytearray()
+        terms = bytearray()
+        for term_bytes, doc_freq, offset, size in entries:
+            term_index += OFFSET.pack(len(terms))
+            encode_varint(len(term_bytes), terms)
+            terms += term_bytes
+            encode_varint(doc_freq, terms)
+            encode_varint(offset, terms)
+            encode_varint(size, terms)
+        term_index_offset = fh.tell()
+        fh.write(term_index)
+        terms_offset = fh.tell()
+        fh.write(terms)
+
+        fh.seek(0)
+        fh.write(HEADER.pack(
+            MAGIC, len(docs), len(entries), total_length,
+            docs_offset, postings_offset, term_index_offset, terms_offset
+        ))
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+
+
+class SegmentReader:
+    """Read-only, memory-mapped view of one segment."""
+
+    def __init__(self, path, deleted=frozenset()):
+        with open(path, 'rb') as fh:
+            self._buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic, self.doc_count, self.term_count, self.total_length,
+            self._docs_offset, self._postings_offset,
+            self._term_index_offset, self._terms_offset,
+        ) = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a search index segment')
+        self.deleted = frozenset(deleted)
+
+    @property
+    def live_count(self):
+        return self.doc_count - len(self.deleted)
+
+    def document(self, ordinal):
+        """Return (article_id, length) of a document."""
+        return DOC.unpack_from(self._buf, self._docs_offset + ordinal * DOC.size)
+
+    def find_ordinal(self, article_id):
+        low, high = 0, self.doc_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.document(middle)[0] < article_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.doc_count and self.document(low)[0] == article_id:
+            return low
+        return None
+
+    def _entry(self, index):
+        (offset,) = OFFSET.unpack_from(self._buf, self._term_index_offset + index * OFFSET.size)
+        pos = self._terms_offset + offset
+        length, pos = decode_varint(self._buf, pos)
+        term = self._buf[pos:pos + length]
+        pos += length
+        doc_freq, pos = decode_varint(self._buf, pos)
+        postings_offset, pos = decode_varint(self._buf, pos)
+        size, pos = decode_varint(self._buf, pos)
+        return term, doc_freq, postings_offset, size
+
+    def lookup(self, term):
+        """Return (doc_freq, offset, size) of a term, or None."""
+        term = term.encode()
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < term:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.term_count:
+            entry = self._entry(low)
+            if entry[0] == term:
+                return entry[1:]
+        return None
+
+    def entries(self):
+        """Yield (term, doc_freq, offset, size) in term order."""
+        for index in range(self.term_count):
+            term, doc_freq, offset, size = self._entry(index)
+            yield term.decode(), doc_freq, offset, size
+
+    def postings(self, offset, size):
+        """Yield (ordinal, frequency) pairs of a postings list."""
+        pos = self._postings_offset + offset
+        end = pos + size
+        ordinal = 0
+        while pos < end:
+            delta, pos = decode_varint(self._buf, pos)
+            frequency, pos = decode_varint(self._buf, pos)
+            ordinal += delta
+            yield ordinal, frequency
+
+    def close(self):
+        self._buf.close()
+
+
+class SearchIndex:
+    """A directory of segments described by a manifest."""
+
+    def __init__(self, path):
+        self.path = str(path)
+
+    def file_path(self, name):
+        return os.path.join(self.path, name)
+
+    def read_manifest(self):
+        try:
+            with open(self.file_path(MANIFEST_NAME)) as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {'generation': 0, 'next_segment': 1, 'segments': []}
+
+    def write_manifest(self, manifest):
+        path = self.file_path(MANIFEST_NAME)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(manifest, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+
+    def open_segment(self, segment):
+        deleted = ()
+        if segment.get('deletes'):
+            with open(self.file_path(segment['deletes']), 'rb') as fh:
+                deleted = decode_sorted_ints(fh.read())
+        return SegmentReader(self.file_path(segment['name'] + '.seg'), deleted)
+
+    @contextmanager
+    def writer(self):
+        """Exclusive writer; changes become visible on `commit()`."""
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.file_path(LOCK_NAME), 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            writer = IndexWriter(self)
+            try:
+                yield writer
+            finally:
+                writer.close()
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class IndexWriter:
+    """Adds, deletes and merges segments of a `SearchIndex`."""
+
+    def __init__(self, index):
+        self.index = index
+        self.manifest = index.read_manifest()
+        self._readers = {}
+
+    def _reader(self, segment):
+        reader = self._readers.get(segment['name'])
+        if reader is None:
+            reader = self._readers[segment['name']] = self.index.open_segment(segment)
+        return reader
+
+    def _new_segment_name(self):
+        number = self.manifest['next_segment']
+        self.manifest['next_segment'] = number + 1
+        return f'seg_{number:08d}'
+
+    def add_documents(self, documents):
+        """
+        Index `documents`, an iterable of (article_id, {field: text}).
+
+        Earlier versions of the same articles are deleted, so this is also
+        the update operation.
+        """
+        latest = {}
+        for article_id, fields in documents:
+            latest[article_id] = fields
+        if not latest:
+            return
+        self.delete_documents(latest)
+
+        docs = []
+        postings = defaultdict(list)
+        for ordinal, article_id in enumerate(sorted(latest)):
+            frequencies, length = analyze(latest[article_id])
+            docs.append((article_id, length))
+            for term, frequency in frequencies.items():
+                postings[term].append((ordinal, frequency))
+
+        name = self._new_segment_name()
+        write_segment(self.index.file_path(name + '.seg'), docs, sorted(postings.items()))
+        self.manifest['segments'].append({'name': name, 'doc_count': len(docs), 'deletes': None, 'deleted_count': 0})
+
+    def clear(self):
+        """Drop every segment; files are removed on commit."""
+        self.manifest['segments'] = []
+
+    def delete_documents(self, article_ids):
+        """Mark articles as deleted in every segment that contains them."""
+        article_ids = set(article_ids)
+        for segment in self.manifest['segments']:
+            reader = self._reader(segment)
+            ordinals = {reader.find_ordinal(article_id) for article_id in article_ids}
+            ordinals.discard(None)
+            ordinals -= reader.deleted
+            if not ordinals:
+                continue
+            deleted = sorted(reader.deleted | ordinals)
+            deletes_name = f"{segment['name']}_{self.manifest['generation'] + 1}.del"
+            with open(self.index.file_path(deletes_name), 'wb') as fh:
+                fh.write(encode_sorted_ints(deleted))
+                fh.flush()
+                os.fsync(fh.fileno())
+            segment['deletes'] = deletes_name
+            segment['deleted_count'] = len(deleted)
+            reader.deleted = frozenset(deleted)
+
+    def merge(self, segments):
+        """
+        Replace `segments` with a single segment without deleted documents.
+
+        A single segment is rewritten only if it has deletions to expunge.
+        """
+        if not segments or (len(segments) == 1 and not segments[0]['deleted_count']):
+            return
+        readers = [self._reader(segment) for segment in segments]
+
+        # New ordinals follow article id order across all live documents
+        live = []
+        for position, reader in enumerate(readers):
+            for ordinal in range(reader.doc_count):
+                if ordinal not in reader.deleted:
+                    article_id, length = reader.document(ordinal)
+                    live.append((article_id, length, position, ordinal))
+        live.sort()
+        remap = {(position, ordinal): new for new, (_, _, position, ordinal) in enumerate(live)}
+        docs = [(article_id, length) for article_id, length, _, _ in live]
+
+        def entries(position):
+            for term, _, offset, size in readers[position].entries():
+                yield term, position, offset, size
+
+        def merged_postings():
+            streams = [entries(position) for position in range(len(readers))]
+            current_term = None
+            current = []
+            for term, position, offset, size in heapq.merge(*streams):
+                if term != current_term:
+                    if current:
+                        yield current_term, sorted(current)
+                    current_term, current = term, []
+                for ordinal, frequency in readers[position].postings(offset, size):
+                    new_ordinal = remap.get((position, ordinal))
+                    if new_ordinal is not None:
+                        current.append((new_ordinal, frequency))
+            if current:
+                yield current_term, sorted(current)
+
+        merged = {segment['name'] for segment in segments}
+        replacement = []
+        if docs:
+            name = self._new_segment_name()
+            write_segment(self.index.file_path(name + '.seg'), docs, merged_postings())
+            replacement.append({'name': name, 'doc_count': len(docs), 'deletes': None, 'deleted_count': 0})
+        self.manifest['segments'] = [
+            segment for segment in self.manifest['segments'] if segment['name'] not in merged
+        ] + replacement
+
+    def maybe_merge(self, merge_factor=10, max_deleted_ratio=0.3):
+        """
+        Background merge policy.
+
+        Merges the `merge_factor` smallest segments once there are that many,
+        and rewrites segments in which too many documents are deleted.
+        """
+        segments = self.manifest['segments']
+        if len(segments) >= merge_factor:
+            by_size = sorted(segments, key=lambda s: s['doc_count'] - s['deleted_count'])
+            self.merge(by_size[:merge_factor])
+        for segment in list(self.manifest['segments']):
+            if segment['deleted_count'] > segment['doc_count'] * max_deleted_ratio:
+                self.merge([segment])
+
+    def merge_all(self):
+        """Merge every segment into one, expunging all deletes."""
+        self.merge(list(self.manifest['segments']))
+
+    def commit(self):
+        """Publish the new manifest and remove files no longer referenced."""
+        self.manifest['segments'] = [
+            segment for segment in self.manifest['segments']
+            if segment['deleted_count'] < segment['doc_count']
+        ]
+        self.manifest['generation'] += 1
+        self.index.write_manifest(self.manifest)
+
+        referenced = set()
+        for segment in self.manifest['segments']:
+            referenced.add(segment['name'] + '.seg')
+            if segment['deletes']:
+                referenced.add(segment['deletes'])
+        # Readers that still map removed files keep working until they reopen
+        for name in os.listdir(self.index.path):
+            if name not in referenced and INDEX_FILE_RE.fullmatch(name):
+                os.remove(self.index.file_path(name))
+
+    def close(self):
+        for reader in self._readers.values():
+            reader.close()
+        self._readers.clear()
+
+
+class IndexSearcher:
+    """Point-in-time view of an index, answering BM25-ranked queries."""
+
+    def __init__(self, index):
+        while True:
+            manifest = index.read_manifest()
+            try:
+                self.readers = [index.open_segment(segment) for segment in manifest['segments']]
+                break
+            except FileNotFoundError:
+                # A writer committed and removed files meanwhile; reload
+                continue
+        self.generation = manifest['generation']
+        self.doc_count = sum(reader.doc_count for reader in self.readers)
+        total_length = sum(reader.total_length for reader in self.readers)
+        self.average_length = total_length / self.doc_count if self.doc_count else 0
+
+    def search(self, query, limit=100):
+        """
+        Return up to `limit` (article_id, score) pairs, best first.
+
+        All query terms must match; scores are BM25 over weighted field
+        frequencies.
+        """
+        return [(article_id, score) for score, article_id in heapq.nlargest(limit, self._hits(query))]
+
+    def iter_search(self, query):
+        """
+        Yield (article_id, score) pairs best first, like `search` without a
+        limit; hits are ranked as they are consumed.
+        """
+        heap = [(-score, -article_id) for score, article_id in self._hits(query)]
+        heapq.heapify(heap)
+        while heap:
+            score, article_id = heapq.heappop(heap)
+            yield -article_id, -score
+
+    def _hits(self, query):
+        """Unordered (score, article_id) pairs of every matching document."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.doc_count:
+            return []
+
+        doc_freqs = {}
+        for term in terms:
+            doc_freqs[term] = sum(
+                entry[0] for entry in (reader.lookup(term) for reader in self.readers) if entry
+            )
+            if not doc_freqs[term]:
+                return []
+        idf = {
+            term: math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            for term, df in doc_freqs.items()
+        }
+        # Rarest terms first keep the candidate sets small
+        terms.sort(key=doc_freqs.get)
+
+        hits = []
+        for reader in self.readers:
+            scores = None
+            for term in terms:
+                entry = reader.lookup(term)
+                if entry is None:
+                    scores = {}
+                    break
+                _, offset, size = entry
+                term_scores = {}
+                for ordinal, frequency in reader.postings(offset, size):
+                    if ordinal in reader.deleted or (scores is not None and ordinal not in scores):
+                        continue
+                    length = reader.document(ordinal)[1]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self.average_length)
+                    score = idf[term] * frequency * (BM25_K1 + 1) / (frequency + norm)
+                    term_scores[ordinal] = (scores[ordinal] if scores is not None else 0) + score
+                scores = term_scores
+                if not scores:
+                    break
+            for ordinal, score in (scores or {}).items():
+                hits.append((score, reader.document(ordinal)[0]))
+
+        return hits
+
+
+_searchers = {}
+
+
+def get_index():
+    return SearchIndex(settings.NEWS_SEARCH_INDEX_DIR)
+
+
+def get_searcher(index=None):
+    """
+    Return a cached searcher, reopened when the manifest changes.
+
+    Segment files are mmapped, so all processes share the same pages.
+    """
+    index = index or get_index()
+    try:
+        stat = os.stat(index.file_path(MANIFEST_NAME))
+        version = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    except FileNotFoundError:
+        version = None
+    cached = _searchers.get(index.path)
+    if cached is None or cached[0] != version:
+        cached = _searchers[index.path] = (version, IndexSearcher(index))
+    return cached[1]
+
+
+def uses_segment_index():
+    """Whether the configured search backend reads the segment index."""
+    return isinstance(get_search_backend(), SegmentIndexSearchBackend)
+
+
+def article_documents(queryset):
+    """Yield (article_id, fields) for indexing."""
+    rows = queryset.values_list('pk', 'title', 'excerpt', 'content')
+    for pk, title, excerpt, content in rows.iterator(chunk_size=2000):
+        yield pk, {'title': title, 'excerpt': excerpt, 'content': content}
+
+
+class SegmentIndexSearchBackend(BaseSearchBackend):
+    """
+    Search backend answering queries from the segment index.
+
+    Results are the best NEWS_SEARCH_INDEX_MAX_HITS matches that pass the
+    queryset filters (status, category, tags): hits are taken best first, in
+    batches of that size, until enough of them pass, so a narrow filter is
+    not left with whatever survived of the overall top hits.
+    """
+    ranked = True
+
+    def search(self, queryset, query):
+        limit = getattr(settings, 'NEWS_SEARCH_INDEX_MAX_HITS', 1000)
+        ranked = get_searcher().iter_search(query)
+        hits = []
+        while len(hits) < limit:
+            batch = list(islice(ranked, limit))
+            if not batch:
+                break
+            matching = set(
+                queryset.order_by().filter(pk__in=[article_id for article_id, _ in batch])
+                .values_list('pk', flat=True)
+            )
+            hits.extend(hit for hit in batch if hit[0] in matching)
+        hits = hits[:limit]
+        if not hits:
+            return queryset.none()
+        rank = Case(
+            *[When(pk=article_id, then=Value(score)) for article_id, score in hits],
+            output_field=FloatField()
+        )
+        return queryset.filter(pk__in=[article_id for article_id, _ in hits]).annotate(search_rank=rank)
@@ -1,21 +1,30 @@
 from rest_framework import serializers
+from rest_framework.utils.urls import replace_query_param
+from django.db import models
+from django.urls import reverse
 from django.contrib.auth import get_user_model
-from .models import Article, Category, Tag, Comment, Reaction, Bookmark
+from .models import Article, Category, Tag, Comment, Reaction, Bookmark, COMMENT_MAX_DEPTH
+from . import view_counter
+from .comment_tree import attach_replies, attach_thread_previews
+from .pagination import CommentThreadPagination
+from .reactions import set_reaction
+from .fieldsets import SparseFieldsetMixin
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     can_manage_articles = serializers.SerializerMethodField()
     
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'can_manage_articles']
         read_only_fields = ['id', 'can_manage_articles']
+        field_dependencies = {'can_manage_articles': ['role.name', 'is_staff', 'is_superuser']}
     
     def get_can_manage_articles(self, obj):
         return obj.can_manage_articles()
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'slug', 'description', 'created_at']
@@ -27,13 +36,22 @@ class CategorySerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({"detail": "You don't have permission to create categories."})
         return super().create(validated_data)
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name', 'slug']
         read_only_fields = ['slug']
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentListSerializer(serializers.ListSerializer):
+    """Loads the reply trees of all comments at once"""
+
+    def to_representation(self, data):
+        comments = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if 'replies' in self.child.fields:
+            attach_replies(comments)
+        return super().to_representation(comments)
+
+class CommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     replies = serializers.SerializerMethodField()
     article = serializers.PrimaryKeyRelatedField(queryset=Article.objects.all(), required=False)
@@ -43,49 +61,143 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'article', 'author', 'content', 'parent', 'replies', 
                  'created_at', 'updated_at', 'is_active']
         read_only_fields = ['author', 'created_at', 'updated_at', 'is_active', 'replies']
+        list_serializer_class = CommentListSerializer
+        # Replies are loaded by article (see news.comment_tree)
+        field_dependencies = {'replies': ['article']}
+    
+    def validate_parent(self, parent):
+        # Keeps materialized paths (and rendered threads) bounded
+        if parent is not None and parent.depth >= COMMENT_MAX_DEPTH:
+            raise serializers.ValidationError(f'Replies can be nested at most {COMMENT_MAX_DEPTH} levels deep.')
+        return parent
     
     def get_replies(self, obj):
-        # Recursively get all replies
-        if obj.replies.exists():
-            return CommentSerializer(obj.replies.filter(is_active=True), many=True).data
-        return []
+        # Recursively serialize the active replies (with the same fieldset as the parent)
+        attach_replies([obj])
+        return CommentSerializer(obj._active_replies, many=True, context=self.context).data
     
     def create(self, validated_data):
         # Set the author to the current user
         validated_data['author'] = self.context['request'].user
         return super().create(validated_data)
 
-class ArticleListSerializer(serializers.ModelSerializer):
+class FlatCommentSerializer(CommentSerializer):
+    """A comment without its replies, for flat thread listings"""
+    
+    class Meta(CommentSerializer.Meta):
+        fields = ['id', 'article', 'author', 'content', 'parent', 'depth',
+                  'created_at', 'updated_at', 'is_active']
+        read_only_fields = fields
+
+def nest_comment_data(items):
+    """
+    Nest serialized comments (parents before their replies) into trees
+    shaped like `CommentSerializer` output; returns the top-level ones.
+    """
+    nodes = {}
+    roots = []
+    for item in items:
+        node = {name: [] if name == 'replies' else item[name] for name in CommentSerializer.Meta.fields}
+        nodes[node['id']] = node
+        parent = nodes.get(node['parent'])
+        (parent['replies'] if parent else roots).append(node)
+    return roots
+
+class CommentThreadListSerializer(serializers.ListSerializer):
+    """Loads reply previews and reply counts of a whole thread level at once"""
+
+    def to_representation(self, data):
+        comments = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        attach_thread_previews(comments, self.context.get('reply_preview', 0))
+        return super().to_representation(comments)
+
+class CommentThreadSerializer(CommentSerializer):
+    """
+    A comment of the threaded comment API: its number of active replies,
+    the first few of them and a link to load the rest.
+    """
+    reply_count = serializers.IntegerField(read_only=True)
+    replies_next = serializers.SerializerMethodField()
+    
+    class Meta(CommentSerializer.Meta):
+        fields = ['id', 'article', 'author', 'content', 'parent', 'depth', 'reply_count', 'replies',
+                  'replies_next', 'created_at', 'updated_at', 'is_active']
+        read_only_fields = fields
+        list_serializer_class = CommentThreadListSerializer
+    
+    def get_replies(self, obj):
+        attach_thread_previews([obj], self.context.get('reply_preview', 0))
+        return CommentThreadSerializer(obj._reply_preview, many=True, context=self.context).data
+    
+    def get_replies_next(self, obj):
+        preview = obj._reply_preview
+        if obj.reply_count <= len(preview):
+            return None
+        url = reverse('comment-replies', args=[obj.pk])
+        if preview:
+            url = replace_query_param(url, 'cursor', CommentThreadPagination().cursor_after(preview[-1]))
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+class ArticleListSerializerList(serializers.ListSerializer):
+    """Looks up buffered view counts for the whole page at once"""
+    
+    def to_representation(self, data):
+        articles = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        pending = view_counter.pending_views([article.pk for article in articles])
+        for article in articles:
+            article.pending_views = pending.get(article.pk, 0)
+        return super().to_representation(articles)
+
+class ArticleListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Lightweight serializer for article lists"""
     author = UserSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
-    comment_count = serializers.SerializerMethodField()
+    views = serializers.SerializerMethodField()
+    comment_count = serializers.IntegerField(source='active_comment_count', read_only=True)
     reaction_summary = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
-    dislikes_count = serializers.SerializerMethodField()
+    likes_count = serializers.IntegerField(read_only=True)
+    dislikes_count = serializers.IntegerField(read_only=True)
+    # Only rendered with `with_viewer_state` in the context, for querysets
+    # annotated by `ArticleQuerySet.with_viewer_state`
+    my_reaction = serializers.IntegerField(read_only=True, allow_null=True)
+    is_bookmarked = serializers.BooleanField(read_only=True)
     
     class Meta:
         model = Article
         fields = ['id', 'title', 'slug', 'excerpt', 'cover_image', 'author', 
                  'category', 'tags', 'status', 'created_at', 'published_at', 'views', 'comment_count',
-                 'reaction_summary', 'likes_count', 'dislikes_count']
+                 'reaction_summary', 'likes_count', 'dislikes_count', 'my_reaction', 'is_bookmarked']
         read_only_fields = ['slug', 'views']
+        list_serializer_class = ArticleListSerializerList
+        field_dependencies = {
+            'views': ['views'],
+            'reaction_summary': ['likes_count', 'dislikes_count'],
+            # Annotations, no columns
+            'my_reaction': [],
+            'is_bookmarked': [],
+        }
     
-    def get_comment_count(self, obj):
-        return obj.comments.filter(is_active=True).count()
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get('with_viewer_state'):
+            fields.pop('my_reaction', None)
+            fields.pop('is_bookmarked', None)
+        return fields
+    
+    def get_views(self, obj):
+        # Stored views plus increments that haven't been flushed yet
+        pending = getattr(obj, 'pending_views', None)
+        if pending is None:
+            pending = view_counter.pending_views([obj.pk]).get(obj.pk, 0)
+        return obj.views + pending
     
     def get_reaction_summary(self, obj):
         return {
-            'likes': obj.reactions.filter(value=1).count(),
-            'dislikes': obj.reactions.filter(value=-1).count()
+            'likes': obj.likes_count,
+            'dislikes': obj.dislikes_count
         }
-    
-    def get_likes_count(self, obj):
-        return obj.reactions.filter(value=1).count()
-    
-    def get_dislikes_count(self, obj):
-        return obj.reactions.filter(value=-1).count()
 
 class ArticleDetailSerializer(ArticleListSerializer):
     """Detailed serializer for single article view"""
@@ -94,6 +206,7 @@ class ArticleDetailSerializer(ArticleListSerializer):
     class Meta(ArticleListSerializer.Meta):
         fields = ArticleListSerializer.Meta.fields + ['content', 'status', 'source_url']
         read_only_fields = ArticleListSerializer.Meta.read_only_fields + ['status']
+        field_dependencies = {**ArticleListSerializer.Meta.field_dependencies, 'content': ['content']}
     
     def get_content(self, obj):
         # In a real app, you might want to process the content here
@@ -101,10 +214,10 @@ class ArticleDetailSerializer(ArticleListSerializer):
         return obj.content
     
     def to_representation(self, instance):
-        # Increment view count when article is retrieved
+        # Count the view when article is retrieved; it is written to the
+        # database later by the flush_article_views task
         if self.context.get('request').method == 'GET':
-            instance.views += 1
-            instance.save(update_fields=['views'])
+            view_counter.record_view(instance.pk)
         return super().to_representation(instance)
 
 class ArticleCreateUpdateSerializer(serializers.ModelSerializer):
@@ -181,22 +294,20 @@ class ReactionSerializer(serializers.ModelSerializer):
         return data
     
     def create(self, validated_data):
-        # Ensure one reaction per user per article
+        # Ensure one reaction per user per article; the nested route passes
+        # the article as `article_id`
         user = self.context['request'].user
         article = validated_data.get('article')
+        article_id = article.pk if article else validated_data.get('article_id')
         value = validated_data.get('value')
         
-        if not article:
+        if not article_id:
             raise serializers.ValidationError({"article": "Article is required."})
         
-        reaction, created = Reaction.objects.update_or_create(
-            user=user,
-            article=article,
-            defaults={'value': value}
-        )
+        reaction, previous = set_reaction(article_id, user, value)
         return reaction
 
-class BookmarkSerializer(serializers.ModelSerializer):
+class BookmarkSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for user bookmarks"""
     article = ArticleListSerializer(read_only=True)
     article_id = serializers.IntegerField(write_only=True)
@@ -0,0 +1,145 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from . import counters, response_cache
+from .models import Article, Category, Comment, Reaction, RelatedArticle, Tag
+from .search_index import uses_segment_index
+
+
+def _deleted_with_article(origin):
+    # Counters of an article that is being deleted don't need maintenance
+    return isinstance(origin, Article)
+
+
+@receiver(post_save, sender=Reaction)
+def reaction_saved(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_loaded_value', None)
+    if not created and previous is None:
+        # Instance was not loaded from the database, the old value is unknown
+        return
+    counters.apply_reaction_change(instance.article_id, previous, instance.value)
+    instance._loaded_value = instance.value
+
+
+@receiver(post_delete, sender=Reaction)
+def reaction_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_with_article(origin):
+        return
+    counters.apply_reaction_change(instance.article_id, instance.value, None)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        delta = 1 if instance.is_active else 0
+    else:
+        previous = getattr(instance, '_loaded_is_active', None)
+        if previous is None:
+            return
+        delta = int(instance.is_active) - int(previous)
+    counters.apply_comment_change(instance.article_id, delta)
+    instance._loaded_is_active = instance.is_active
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, origin=None, **kwargs):
+    was_active = getattr(instance, '_loaded_is_active', instance.is_active)
+    if _deleted_with_article(origin) or not was_active:
+        return
+    counters.apply_comment_change(instance.article_id, -1)
+
+
+@receiver(post_save, sender=Article)
+def article_saved(sender, instance, **kwargs):
+    if not uses_segment_index():
+        return
+    from .tasks import index_articles
+    article_ids = [instance.pk]
+    # Broker errors are logged, not raised; `rebuild_search_index` catches up
+    transaction.on_commit(lambda: index_articles.delay(article_ids), robust=True)
+
+
+@receiver(post_delete, sender=Article)
+def article_deleted(sender, instance, **kwargs):
+    if not uses_segment_index():
+        return
+    from .tasks import remove_articles_from_index
+    article_ids = [instance.pk]
+    transaction.on_commit(lambda: remove_articles_from_index.delay(article_ids), robust=True)
+
+
+def _refresh_related(article_ids):
+    from .tasks import refresh_related_articles
+    article_ids = list(article_ids)
+    if not article_ids:
+        return
+    # The write is committed either way; if the broker is unreachable the
+    # error is logged and the periodic rebuild repairs the lists
+    transaction.on_commit(lambda: refresh_related_articles.delay(article_ids), robust=True)
+
+
+RELATED_FIELDS = {'category', 'category_id', 'status'}
+
+
+@receiver(post_save, sender=Article)
+def article_saved_for_related(sender, instance, created, update_fields=None, **kwargs):
+    # Neighbours only depend on the category, the status and the tags (see
+    # the m2m handler below)
+    if update_fields is not None and not RELATED_FIELDS & set(update_fields):
+        return
+    state = (instance.category_id, instance.status)
+    if not created and getattr(instance, '_loaded_related_state', None) == state:
+        return
+    instance._loaded_related_state = state
+    _refresh_related([instance.pk])
+
+
+@receiver(pre_delete, sender=Article)
+def article_deleted_for_related(sender, instance, **kwargs):
+    # The cascade drops the article from these lists; refill them
+    article_ids = RelatedArticle.objects.filter(related=instance).values_list('article_id', flat=True)
+    _refresh_related(article_ids)
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def article_tags_changed_for_related(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        _refresh_related([instance.pk])
+    elif pk_set:
+        _refresh_related(pk_set)
+    # tag.articles.clear() is picked up by the periodic rebuild
+
+
+@receiver([post_save, post_delete], sender=Article)
+def article_changed_for_cache(sender, instance, **kwargs):
+    response_cache.invalidate_articles(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Comment)
+@receiver([post_save, post_delete], sender=Reaction)
+def engagement_changed_for_cache(sender, instance, origin=None, **kwargs):
+    if _deleted_with_article(origin):
+        return
+    response_cache.invalidate_articles(instance.article_id)
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def article_tags_changed_for_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        response_cache.invalidate_articles(instance.pk)
+    elif pk_set:
+        response_cache.invalidate_articles(*pk_set)
+    else:
+        # tag.articles.clear() does not report the affected articles
+        response_cache.invalidate_all()
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Tag)
+def taxonomy_changed_for_cache(sender, **kwargs):
+    response_cache.invalidate_all(response_cache.table_scope(sender))
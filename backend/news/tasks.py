@@ -1,6 +1,11 @@
 from celery import shared_task
 from newspaper import Article as NPArticle
+from . import counters, response_cache
 from .models import Article
+from .related import build_related_articles, update_related_articles
+from .trending import compute_trending
+from .search_index import article_documents, get_index, uses_segment_index
+from .view_counter import flush_views
 
 @shared_task
 def parse_and_create_article(url):
@@ -18,3 +23,63 @@ def parse_and_create_article(url):
         return f"created: {created}"
     except Exception as e:
         return str(e)
+
+
+@shared_task
+def flush_article_views():
+    """Write buffered article views to the database."""
+    return flush_views()
+
+
+@shared_task
+def compact_counter_shards():
+    """Fold sharded counter increments into the article columns."""
+    return counters.compact_shards()
+
+
+@shared_task
+def index_articles(article_ids):
+    """Add or replace articles in the segment search index."""
+    with get_index().writer() as writer:
+        writer.delete_documents(article_ids)
+        writer.add_documents(article_documents(Article.objects.filter(pk__in=article_ids)))
+        writer.commit()
+    # Search results changed without a model signal
+    response_cache.bump(response_cache.ARTICLES_SCOPE)
+
+
+@shared_task
+def remove_articles_from_index(article_ids):
+    """Delete articles from the segment search index."""
+    with get_index().writer() as writer:
+        writer.delete_documents(article_ids)
+        writer.commit()
+    response_cache.bump(response_cache.ARTICLES_SCOPE)
+
+
+@shared_task
+def merge_search_index():
+    """Merge small segments of the search index."""
+    if not uses_segment_index():
+        return
+    with get_index().writer() as writer:
+        writer.maybe_merge()
+        writer.commit()
+
+
+@shared_task
+def compute_trending_scores():
+    """Recompute the trending article ranking."""
+    return compute_trending()
+
+
+@shared_task
+def rebuild_related_articles():
+    """Rebuild the related articles table."""
+    return build_related_articles()
+
+
+@shared_task
+def refresh_related_articles(article_ids):
+    """Update related article lists after `article_ids` changed."""
+    update_related_articles(article_ids)
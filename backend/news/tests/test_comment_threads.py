@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from news.models import Article, Comment
+
+User = get_user_model()
+
+
+@override_settings(NEWS_COMMENT_REPLY_PREVIEW=2)
+class CommentThreadTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='u', email='u@example.com', password='pass')
+        self.article = Article.objects.create(title='A', content='C', author=self.user, status='published')
+        self.roots = [self._comment(f'root{i}') for i in range(3)]
+        self.replies = [self._comment(f'reply{i}', self.roots[0]) for i in range(5)]
+        self._comment('hidden', self.roots[0], is_active=False)
+        self.nested = [self._comment(f'nested{i}', self.replies[0]) for i in range(3)]
+
+    def _comment(self, content, parent=None, is_active=True):
+        return Comment.objects.create(
+            article=self.article, author=self.user, content=content, parent=parent, is_active=is_active
+        )
+
+    def _contents(self, items):
+        return [item['content'] for item in items]
+
+    def test_threads_are_cursor_paginated_with_previews(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/v1/articles/{self.article.pk}/comments/threads/', {'page_size': 2})
+        # Top-level page, reply previews, reply counts
+        self.assertEqual(len(ctx.captured_queries), 3)
+        first = response.json()
+        self.assertEqual(self._contents(first['results']), ['root0', 'root1'])
+        root = first['results'][0]
+        self.assertEqual(root['reply_count'], 5)
+        self.assertEqual(self._contents(root['replies']), ['reply0', 'reply1'])
+        self.assertEqual(root['replies'][0]['reply_count'], 3)
+        self.assertEqual(root['replies'][0]['replies'], [])
+        self.assertEqual((first['results'][1]['reply_count'], first['results'][1]['replies_next']), (0, None))
+
+        second = self.client.get(first['next']).json()
+        self.assertEqual(self._contents(second['results']), ['root2'])
+        self.assertIsNone(second['next'])
+
+    def test_replies_are_loaded_on_demand(self):
+        root = self.client.get(f'/api/v1/articles/{self.article.pk}/comments/threads/').json()['results'][0]
+        with CaptureQueriesContext(connection) as ctx:
+            rest = self.client.get(root['replies_next']).json()
+        # Parent, replies page, reply previews, reply counts
+        self.assertEqual(len(ctx.captured_queries), 4)
+        self.assertEqual(self._contents(rest['results']), ['reply2', 'reply3', 'reply4'])
+
+        nested = self.client.get(f'/api/v1/comments/{self.replies[0].pk}/replies/', {'replies': 0}).json()
+        self.assertEqual(self._contents(nested['results']), ['nested0', 'nested1', 'nested2'])
+        self.assertEqual(nested['results'][0]['depth'], 2)
+
+    def test_inactive_comments_stay_hidden(self):
+        hidden = Comment.objects.get(content='hidden')
+        self.assertEqual(self.client.get(f'/api/v1/comments/{hidden.pk}/replies/').status_code, 404)
+        replies = self.client.get(f'/api/v1/comments/{self.roots[0].pk}/replies/', {'page_size': 100}).json()
+        self.assertNotIn('hidden', self._contents(replies['results']))
+
+
+@override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=0)
+class CommentListModeTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='u', email='u@example.com', password='pass')
+        self.article = Article.objects.create(title='A', content='C', author=self.user, status='published')
+        parent = None
+        for depth in range(11):
+            parent = Comment.objects.create(article=self.article, author=self.user, content=f'd{depth}', parent=parent)
+        root = Comment.objects.get(depth=0)
+        hidden = Comment.objects.create(article=self.article, author=self.user, content='hidden', parent=root, is_active=False)
+        Comment.objects.create(article=self.article, author=self.user, content='under hidden', parent=hidden)
+        Comment.objects.create(article=self.article, author=self.user, content='second root')
+
+    def _get(self, mode):
+        return self.client.get('/api/v1/comments/', {'article': self.article.pk, 'mode': mode, 'page_size': 100})
+
+    def test_flat_mode_lists_each_comment_once(self):
+        results = self._get('flat').json()['results']
+        self.assertEqual([item['content'] for item in results], [f'd{depth}' for depth in range(11)] + ['second root'])
+        self.assertEqual([item['depth'] for item in results[:11]], list(range(11)))
+        self.assertNotIn('replies', results[0])
+        self.assertEqual(results[1]['parent'], results[0]['id'])
+
+    def test_nested_mode_builds_the_tree_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            results = self._get('nested').json()['results']
+        # Article filter lookup, validators, comments
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertEqual([item['content'] for item in results], ['d0', 'second root'])
+        node, depth = results[0], 0
+        while node['replies']:
+            self.assertEqual(len(node['replies']), 1)
+            node, depth = node['replies'][0], depth + 1
+        self.assertEqual((node['content'], depth), ('d10', 10))
+
+    def test_replies_of_a_filtered_out_parent_are_top_level(self):
+        root = Comment.objects.get(content='d0')
+        for mode in ('flat', 'nested'):
+            response = self.client.get(
+                '/api/v1/comments/', {'article': self.article.pk, 'mode': mode, 'parent': root.pk, 'page_size': 100}
+            )
+            self.assertEqual([item['content'] for item in response.json()['results']], ['d1'])
+        self.assertEqual(response.json()['results'][0]['replies'], [])
+
+    def test_unknown_mode_is_rejected(self):
+        self.assertEqual(self._get('tree').status_code, 400)
@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from news.models import Article, Category, Comment, Reaction, Tag
+from news.view_counter import pending_views
+
+User = get_user_model()
+
+
+@override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=0)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', email='a@example.com', password='pass')
+        self.category = Category.objects.create(name='Tech')
+        self.tag = Tag.objects.create(name='ai')
+        self.article = Article.objects.create(
+            title='One', content='Body', category=self.category, status='published', author=self.author
+        )
+        self.other = Article.objects.create(
+            title='Two', content='Body', category=self.category, status='published', author=self.author
+        )
+
+    def revalidate(self, url, response, **params):
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_list_not_modified_skips_serialization(self):
+        res = self.client.get('/api/v1/articles/')
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+        self.assertIn('Authorization', res['Vary'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            again = self.revalidate('/api/v1/articles/', res)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], res['ETag'])
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_list_etag_changes_with_data(self):
+        res = self.client.get('/api/v1/articles/')
+        Reaction.objects.create(article=self.other, user=self.author, value=Reaction.LIKE)
+        self.assertEqual(self.revalidate('/api/v1/articles/', res).status_code, 200)
+
+        res = self.client.get('/api/v1/articles/')
+        self.other.delete()
+        self.assertEqual(self.revalidate('/api/v1/articles/', res).status_code, 200)
+
+    def test_etag_depends_on_user_and_query(self):
+        res = self.client.get('/api/v1/articles/')
+        self.assertEqual(self.revalidate('/api/v1/articles/', res, ordering='views').status_code, 200)
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.revalidate('/api/v1/articles/', res).status_code, 200)
+
+    def test_if_modified_since(self):
+        res = self.client.get('/api/v1/articles/')
+        again = self.client.get('/api/v1/articles/', HTTP_IF_MODIFIED_SINCE=res['Last-Modified'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_detail_uses_counters_and_counts_revalidated_views(self):
+        url = f'/api/v1/articles/{self.article.id}/'
+        res = self.client.get(url)
+        self.assertEqual(self.revalidate(url, res).status_code, 304)
+        self.assertEqual(pending_views([self.article.id]), {self.article.id: 2})
+
+        Comment.objects.create(article=self.article, author=self.author, content='Hi')
+        self.assertEqual(self.revalidate(url, res).status_code, 200)
+
+    def assert_article_etags_change(self, change):
+        urls = ['/api/v1/articles/', f'/api/v1/articles/{self.article.id}/']
+        responses = [self.client.get(url) for url in urls]
+        change()
+        for url, response in zip(urls, responses):
+            self.assertEqual(self.revalidate(url, response).status_code, 200, url)
+
+    def test_taxonomy_changes_move_article_etags(self):
+        self.article.tags.add(self.tag)
+
+        def rename(obj):
+            obj.name += ' (renamed)'
+            obj.save()
+
+        self.assert_article_etags_change(lambda: rename(self.tag))
+        self.assert_article_etags_change(lambda: rename(self.category))
+        self.assert_article_etags_change(lambda: self.article.tags.remove(self.tag))
+        self.assert_article_etags_change(lambda: self.article.tags.add(self.tag))
+
+    def test_missing_detail_is_not_found(self):
+        self.assertEqual(self.client.get('/api/v1/articles/999999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/v1/articles/abc/').status_code, 404)
+
+    def test_taxonomy_uses_table_version(self):
+        res = self.client.get('/api/v1/tags/')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.revalidate('/api/v1/tags/', res).status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        detail = self.client.get(f'/api/v1/categories/{self.category.slug}/')
+        Tag.objects.create(name='ml')
+        self.assertEqual(self.revalidate('/api/v1/tags/', res).status_code, 200)
+        url = f'/api/v1/categories/{self.category.slug}/'
+        self.assertEqual(self.revalidate(url, detail).status_code, 304)
+
+    def test_comment_replies_change_article_comments_etag(self):
+        root = Comment.objects.create(article=self.article, author=self.author, content='Root')
+        url = f'/api/v1/articles/{self.article.id}/comments/'
+        res = self.client.get(url)
+        self.assertEqual(self.revalidate(url, res).status_code, 304)
+        Comment.objects.create(article=self.article, author=self.author, content='Reply', parent=root)
+        self.assertEqual(self.revalidate(url, res).status_code, 200)
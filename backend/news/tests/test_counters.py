@@ -0,0 +1,245 @@
+import threading
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient, APIRequestFactory
+from news.models import Article, ArticleCounterShard, Category, Comment, Reaction
+from news.serializers import ReactionSerializer
+from news import counters, view_counter
+
+User = get_user_model()
+
+
+class ArticleCountersTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(username='u', email='u@example.com', password='pass')
+        self.other = User.objects.create_user(username='o', email='o@example.com', password='pass')
+        self.category = Category.objects.create(name='Tech')
+        self.article = Article.objects.create(title='T', content='C', category=self.category, author=self.user, status='published')
+
+    def _counters(self):
+        self.article.refresh_from_db()
+        return self.article.likes_count, self.article.dislikes_count, self.article.active_comment_count
+
+    def _react(self, user, value):
+        req = self.factory.post('/')
+        req.user = user
+        ser = ReactionSerializer(data={'article': self.article.id, 'value': value}, context={'request': req})
+        self.assertTrue(ser.is_valid(), ser.errors)
+        return ser.save()
+
+    def test_reaction_create_flip_and_delete(self):
+        self._react(self.user, Reaction.LIKE)
+        self._react(self.other, Reaction.LIKE)
+        self.assertEqual(self._counters(), (2, 0, 0))
+        # like -> dislike flip moves one count between the columns
+        reaction = self._react(self.user, Reaction.DISLIKE)
+        self.assertEqual(self._counters(), (1, 1, 0))
+        # same value again is a no-op
+        self._react(self.user, Reaction.DISLIKE)
+        self.assertEqual(self._counters(), (1, 1, 0))
+        reaction.delete()
+        self.assertEqual(self._counters(), (1, 0, 0))
+
+    def test_comment_create_moderation_and_delete(self):
+        parent = Comment.objects.create(article=self.article, author=self.user, content='A')
+        reply = Comment.objects.create(article=self.article, author=self.other, content='B', parent=parent)
+        self.assertEqual(self._counters(), (0, 0, 2))
+        reply = Comment.objects.get(pk=reply.pk)
+        reply.is_active = False
+        reply.save()
+        self.assertEqual(self._counters(), (0, 0, 1))
+        reply.is_active = True
+        reply.save()
+        self.assertEqual(self._counters(), (0, 0, 2))
+        # deleting the parent cascades to the reply
+        parent.delete()
+        self.assertEqual(self._counters(), (0, 0, 0))
+
+    def test_reconcile_command_recomputes_counters(self):
+        Reaction.objects.create(article=self.article, user=self.user, value=Reaction.LIKE)
+        Reaction.objects.create(article=self.article, user=self.other, value=Reaction.DISLIKE)
+        Comment.objects.create(article=self.article, author=self.user, content='A')
+        Comment.objects.create(article=self.article, author=self.user, content='B', is_active=False)
+        Article.objects.filter(pk=self.article.pk).update(likes_count=10, dislikes_count=10, active_comment_count=10)
+        call_command('reconcile_article_counters', batch_size=1, stdout=StringIO())
+        self.assertEqual(self._counters(), (1, 1, 1))
+
+
+@override_settings(NEWS_COUNTER_SHARDS=4, NEWS_RESPONSE_CACHE_TIMEOUT=0)
+class ShardedCountersTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='u', email='u@example.com', password='pass')
+        self.others = [
+            User.objects.create_user(username=f'o{i}', email=f'o{i}@example.com', password='pass') for i in range(6)
+        ]
+        self.article = Article.objects.create(title='T', content='C', author=self.user, status='published')
+
+    def _columns(self):
+        return Article.objects.filter(pk=self.article.pk).values_list(
+            'likes_count', 'dislikes_count', 'active_comment_count', 'views'
+        ).get()
+
+    def _engage(self):
+        for i, user in enumerate(self.others):
+            Reaction.objects.create(article=self.article, user=user, value=Reaction.LIKE if i % 3 else Reaction.DISLIKE)
+        Reaction.objects.filter(user=self.others[1]).get().delete()
+        Comment.objects.create(article=self.article, author=self.user, content='A')
+        view_counter.record_view(self.article.pk)
+        view_counter.flush_views()
+
+    def test_increments_go_to_shards_until_compacted(self):
+        self._engage()
+        self.assertEqual(self._columns(), (0, 0, 0, 0))
+        shards = ArticleCounterShard.objects.filter(article=self.article)
+        self.assertTrue(1 <= shards.count() <= 4)
+        self.assertEqual(
+            counters.unsettled_counts([self.article.pk]),
+            {self.article.pk: {'views': 1, 'likes_count': 3, 'dislikes_count': 2, 'active_comment_count': 1}},
+        )
+
+        detail = APIClient().get(f'/api/v1/articles/{self.article.pk}/').json()
+        # Plus this request's view, still buffered
+        self.assertEqual(
+            (detail['likes_count'], detail['dislikes_count'], detail['comment_count'], detail['views']), (3, 2, 1, 2)
+        )
+        listed = APIClient().get('/api/v1/articles/').json()['results'][0]
+        # Compacted totals (plus buffered views)
+        self.assertEqual((listed['likes_count'], listed['views']), (0, 1))
+
+        rows = shards.count()
+        self.assertEqual(counters.compact_shards(batch_size=2), rows)
+        self.assertFalse(shards.exists())
+        self.assertEqual(self._columns(), (3, 2, 1, 1))
+        self.assertEqual(counters.unsettled_counts([self.article.pk]), {})
+
+    def test_detail_etag_covers_shards(self):
+        client = APIClient()
+        url = f'/api/v1/articles/{self.article.pk}/'
+        etag = client.get(url)['ETag']
+        Reaction.objects.create(article=self.article, user=self.others[0], value=Reaction.LIKE)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['likes_count'], 1)
+
+    def test_compaction_and_reconcile_move_list_etag(self):
+        self._engage()
+        client = APIClient()
+        etag = client.get('/api/v1/articles/')['ETag']
+        counters.compact_shards()
+        response = client.get('/api/v1/articles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['likes_count'], 3)
+
+        Article.objects.filter(pk=self.article.pk).update(likes_count=10)
+        etag = response['ETag']
+        call_command('reconcile_article_counters', stdout=StringIO())
+        response = client.get('/api/v1/articles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['likes_count'], 3)
+
+    def test_reconcile_folds_shards_first(self):
+        self._engage()
+        call_command('reconcile_article_counters', stdout=StringIO())
+        self.assertFalse(ArticleCounterShard.objects.exists())
+        self.assertEqual(self._columns(), (3, 2, 1, 1))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs row-level locking')
+@override_settings(NEWS_COUNTER_SHARDS=4, NEWS_RESPONSE_CACHE_TIMEOUT=0)
+class ShardedReconcileConcurrencyTests(TransactionTestCase):
+    def test_reaction_between_fold_and_recount_is_counted_once(self):
+        from news.reactions import set_reaction
+
+        author = User.objects.create_user(username='u', email='u@example.com', password='pass')
+        reader = User.objects.create_user(username='r', email='r@example.com', password='pass')
+        article = Article.objects.create(title='T', content='C', author=author, status='published')
+        Reaction.objects.create(article=article, user=author, value=Reaction.LIKE)
+        folded, reacted = threading.Event(), threading.Event()
+        recount_expressions = counters.recount_expressions
+
+        def recount_after_reaction():
+            folded.set()
+            # The reaction blocks on the reconcile locks; without them it
+            # commits right here
+            reacted.wait(timeout=1)
+            return recount_expressions()
+
+        def react():
+            try:
+                folded.wait(timeout=5)
+                set_reaction(article.pk, reader, Reaction.LIKE)
+                reacted.set()
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=react)
+        thread.start()
+        with patch('news.counters.recount_expressions', side_effect=recount_after_reaction):
+            counters.reconcile_articles([article.pk])
+        thread.join()
+        counters.compact_shards()
+        article.refresh_from_db()
+        self.assertEqual(article.likes_count, 2)
+
+
+class ViewCounterBufferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Tech')
+        self.a = Article.objects.create(title='A', content='C', category=self.category, status='published')
+        self.b = Article.objects.create(title='B', content='C', category=self.category, status='published')
+
+    def test_flush_batches_pending_views(self):
+        for _ in range(3):
+            view_counter.record_view(self.a.pk)
+        view_counter.record_view(self.b.pk)
+        self.assertEqual(view_counter.pending_views([self.a.pk, self.b.pk]), {self.a.pk: 3, self.b.pk: 1})
+        self.assertEqual(view_counter.flush_views(), 4)
+        self.a.refresh_from_db()
+        self.b.refresh_from_db()
+        self.assertEqual((self.a.views, self.b.views), (3, 1))
+        self.assertEqual(view_counter.pending_views([self.a.pk, self.b.pk]), {})
+        # nothing left to write
+        self.assertEqual(view_counter.flush_views(), 0)
+
+    def test_views_after_flush_are_registered_again(self):
+        view_counter.record_view(self.a.pk)
+        view_counter.flush_views()
+        view_counter.record_view(self.a.pk)
+        view_counter.record_view(self.a.pk)
+        self.assertEqual(view_counter.flush_views(), 2)
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.views, 3)
+
+    def test_failed_flush_keeps_articles_registered(self):
+        view_counter.record_view(self.a.pk)
+        view_counter.record_view(self.a.pk)
+        with patch('news.view_counter.counters.apply_view_deltas', side_effect=RuntimeError('database down')):
+            with self.assertRaises(RuntimeError):
+                view_counter.flush_views()
+        self.assertEqual(view_counter.pending_views([self.a.pk]), {self.a.pk: 2})
+        self.assertEqual(view_counter.flush_views(), 2)
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.views, 2)
+
+    def test_article_registered_during_flush_is_kept(self):
+        view_counter.record_view(self.a.pk)
+        apply_view_deltas = counters.apply_view_deltas
+
+        def apply_and_view(pending):
+            apply_view_deltas(pending)
+            view_counter.record_view(self.b.pk)
+
+        with patch('news.view_counter.counters.apply_view_deltas', side_effect=apply_and_view):
+            self.assertEqual(view_counter.flush_views(), 1)
+        self.assertEqual(view_counter.flush_views(), 1)
+        self.b.refresh_from_db()
+        self.assertEqual(self.b.views, 1)
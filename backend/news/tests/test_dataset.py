@@ -0,0 +1,81 @@
+from io import StringIO
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from accounts.models import UserActivity
+from news.counters import recount_expressions
+from news.models import COMMENT_PATH_STEP, Article, ArticleTag, Bookmark, Comment, Reaction, comment_path_segment
+
+User = get_user_model()
+
+SIZES = dict(users=30, articles=40, tags=10, comments=300, reactions=400, bookmarks=100, activities=50, batch_size=15)
+
+
+def generate(prefix='gen', seed=7, **sizes):
+    call_command('generate_dataset', prefix=prefix, seed=seed, stdout=StringIO(), **{**SIZES, **sizes})
+
+
+class GenerateDatasetTests(TestCase):
+    def _snapshot(self, prefix):
+        articles = Article.objects.filter(slug__startswith=f'{prefix}-article-')
+        strip = len(prefix)
+        return (
+            list(articles.order_by('pk').values_list(
+                'title', 'status', 'views', 'likes_count', 'dislikes_count', 'active_comment_count'
+            )),
+            [(name[strip:], value) for name, value in Reaction.objects.filter(article__in=articles)
+             .order_by('pk').values_list('user__username', 'value')],
+            list(Comment.objects.filter(article__in=articles).order_by('pk').values_list('content', 'is_active')),
+        )
+
+    def test_generates_requested_rows_with_consistent_counters(self):
+        generate()
+        self.assertEqual(User.objects.filter(username__startswith='gen_user').count(), 30)
+        self.assertEqual(Article.objects.count(), 40)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertEqual(UserActivity.objects.count(), 50)
+        self.assertTrue(0 < Reaction.objects.count() <= 400)
+        self.assertTrue(0 < Bookmark.objects.count() <= 100)
+        self.assertTrue(ArticleTag.objects.exists())
+
+        counters = list(recount_expressions())
+        rows = Article.objects.annotate(
+            **{f'expected_{name}': expression for name, expression in recount_expressions().items()}
+        ).values(*counters, *[f'expected_{name}' for name in counters])
+        for row in rows:
+            for name in counters:
+                self.assertEqual(row[name], row[f'expected_{name}'])
+
+        drafts = Article.objects.filter(status='draft')
+        self.assertFalse(drafts.filter(published_at__isnull=False).exists())
+        self.assertFalse(Reaction.objects.filter(article__in=drafts).exists())
+        # Threads are nested up to --max-depth (3) and stay within one article
+        self.assertTrue(Comment.objects.filter(parent__isnull=False).exists())
+        self.assertFalse(Comment.objects.filter(parent__parent__parent__parent__isnull=False).exists())
+        self.assertFalse(Comment.objects.filter(parent__isnull=False).exclude(parent__article=F('article')).exists())
+        self.assertFalse(Comment.objects.filter(parent__created_at__gt=F('created_at')).exists())
+        # Materialized paths extend the parent's
+        for comment in Comment.objects.select_related('parent'):
+            parent_path = comment.parent.path if comment.parent else ''
+            self.assertEqual(comment.path, parent_path + comment_path_segment(comment.pk))
+            self.assertEqual(comment.depth, len(comment.path) // COMMENT_PATH_STEP - 1)
+
+    def test_same_seed_generates_same_rows(self):
+        generate('one')
+        generate('two')
+        self.assertEqual(self._snapshot('one'), self._snapshot('two'))
+
+    def test_without_tags(self):
+        generate(tags=0)
+        articles = Article.objects.filter(slug__startswith='gen-article-')
+        self.assertEqual(articles.count(), SIZES['articles'])
+        self.assertFalse(ArticleTag.objects.filter(article__in=articles).exists())
+        with self.assertRaises(CommandError):
+            generate('negative', tags=-1)
+
+    def test_existing_prefix_is_rejected(self):
+        generate()
+        with self.assertRaises(CommandError):
+            generate()
@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from accounts.models import Role
+from news import view_counter
+from news.models import Article, Category, Comment, Reaction, Tag
+from news.renderers import ORJSONRenderer
+
+User = get_user_model()
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    def assertSameBytes(self, data):
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_matches_json_renderer(self):
+        self.assertSameBytes({
+            'text': 'Привет "мир"     </script>',
+            'when': timezone.now(),
+            'date': timezone.now().date(),
+            'nested': [1, 2.5, None, True, {'a': []}],
+            1: 'int key',
+        })
+
+    def test_falls_back_for_unsupported_values(self):
+        self.assertSameBytes({'big': 2 ** 70, 'small': 1e-7, 'large': 1e22})
+
+    def test_indent_uses_json_renderer(self):
+        context = {'indent': 2}
+        self.assertEqual(
+            ORJSONRenderer().render({'a': 1}, renderer_context=context),
+            JSONRenderer().render({'a': 1}, renderer_context=context),
+        )
+
+
+@override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=0)
+class FastArticleListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        editor_role, _ = Role.objects.get_or_create(name=Role.EDITOR)
+        self.author = User.objects.create_user(
+            username='author', email='a@example.com', password='pass', first_name='Анна', role=editor_role
+        )
+        self.staff = User.objects.create_user(username='staff', email='s@example.com', password='pass', is_staff=True)
+        self.category = Category.objects.create(name='Tech', description='Технологии')
+        tags = [Tag.objects.create(name='ai'), Tag.objects.create(name='ml')]
+        now = timezone.now()
+        for i in range(5):
+            article = Article.objects.create(
+                title=f'Новость {i}', content='Body', excerpt=f'Excerpt {i}',
+                category=self.category if i % 2 else None, author=self.author if i != 3 else None,
+                status='published', published_at=now - timedelta(hours=i),
+            )
+            article.tags.set(tags[:i % 3])
+        Article.objects.filter(title='Новость 1').update(cover_image='articles/covers/one.jpg')
+        self.draft = Article.objects.create(title='Draft', content='Body', author=self.author, status='draft')
+        Reaction.objects.create(article=article, user=self.staff, value=Reaction.LIKE)
+        Comment.objects.create(article=article, author=self.staff, content='Hi')
+        view_counter.record_view(article.id)
+
+    def assertSameContent(self, url, params=None):
+        with override_settings(NEWS_ARTICLE_LIST_FAST_PATH=False):
+            expected = self.client.get(url, params)
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, expected.content)
+        return res
+
+    def test_anonymous_list_matches_serializer(self):
+        res = self.assertSameContent('/api/v1/articles/')
+        self.assertEqual(res.json()['count'], 5)
+
+    def test_staff_list_with_drafts_matches_serializer(self):
+        self.client.force_authenticate(self.staff)
+        res = self.assertSameContent('/api/v1/articles/')
+        self.assertEqual(res.json()['count'], 6)
+
+    def test_filters_and_pagination_match_serializer(self):
+        for i in range(10):
+            Article.objects.create(title=f'Extra {i}', content='Body', author=self.author, status='published')
+        self.assertSameContent('/api/v1/articles/', {'page': 2})
+        self.assertSameContent('/api/v1/articles/', {'ordering': 'views', 'category': self.category.slug})
+        self.assertSameContent('/api/v1/articles/', {'search': 'Новость'})
+
+        first = self.assertSameContent('/api/v1/articles/', {'pagination': 'cursor', 'page_size': 2})
+        self.assertSameContent(first.json()['next'])
+
+    def test_list_query_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/v1/articles/')
+        # Count, articles, authors, tags
+        self.assertEqual(len(ctx.captured_queries), 4)
+
+    def test_fieldsets_use_serializer(self):
+        res = self.client.get('/api/v1/articles/', {'fields': 'id,title'})
+        self.assertEqual(set(res.json()['results'][0]), {'id', 'title'})
@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from news.fieldsets import Fieldset
+from news.models import Article, Bookmark, Category, Comment, Tag
+
+User = get_user_model()
+
+
+class FieldsetParsingTests(SimpleTestCase):
+    def test_parse(self):
+        fieldset = Fieldset.from_params(QueryDict('fields=id,author.username,tags&expand=category'))
+        self.assertEqual(fieldset.selected, {'id', 'author', 'tags'})
+        self.assertEqual(fieldset.expanded, {'author', 'category'})
+        self.assertEqual(fieldset.children['author'].selected, {'username'})
+        self.assertIsNone(Fieldset.from_params(QueryDict('page=2')))
+
+
+@override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=0)
+class SparseFieldsetViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', email='a@example.com', password='pass')
+        self.category = Category.objects.create(name='Tech')
+        self.tags = [Tag.objects.create(name='ai'), Tag.objects.create(name='ml')]
+        for i in range(3):
+            article = Article.objects.create(
+                title=f'Article {i}', content='Long body ' * 100, category=self.category,
+                status='published', author=self.author
+            )
+            article.tags.set(self.tags)
+        self.article = article
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, 200)
+        return res, [q['sql'] for q in ctx.captured_queries]
+
+    def test_default_output_unchanged(self):
+        res, _ = self.get('/api/v1/articles/')
+        item = res.data['results'][0]
+        self.assertEqual(item['author']['username'], 'author')
+        self.assertEqual(item['category']['name'], 'Tech')
+        self.assertEqual([t['name'] for t in item['tags']], ['ai', 'ml'])
+
+    def test_card_fields_skip_joins_and_prefetches(self):
+        res, queries = self.get('/api/v1/articles/', fields='id,title,views,likes_count')
+        self.assertEqual(set(res.data['results'][0]), {'id', 'title', 'views', 'likes_count'})
+        list_sql = [sql for sql in queries if sql.startswith('SELECT "news_article"."id"')]
+        self.assertEqual(len(list_sql), 1)
+        self.assertNotIn('accounts_user', list_sql[0])
+        self.assertNotIn('"content"', list_sql[0])
+        self.assertFalse(any('news_tag' in sql for sql in queries))
+
+    def test_relations_collapse_to_ids_unless_expanded(self):
+        res, queries = self.get('/api/v1/articles/', fields='id,author,category,tags')
+        item = res.data['results'][0]
+        self.assertEqual(item['author'], self.author.id)
+        self.assertEqual(item['category'], self.category.id)
+        self.assertEqual(sorted(item['tags']), sorted(t.id for t in self.tags))
+        self.assertFalse(any('JOIN "accounts_user"' in sql for sql in queries))
+
+        res, queries = self.get('/api/v1/articles/', fields='id,author,category', expand='category')
+        item = res.data['results'][0]
+        self.assertEqual(item['category']['name'], 'Tech')
+        self.assertEqual(item['author'], self.author.id)
+
+    def test_dotted_fields_embed_subset_without_extra_queries(self):
+        res, queries = self.get('/api/v1/articles/', fields='id,author.username,author.can_manage_articles')
+        item = res.data['results'][0]
+        self.assertEqual(item['author'], {'username': 'author', 'can_manage_articles': False})
+        # Count, then articles with author and role joined
+        self.assertEqual(len(queries), 2)
+
+    def test_detail_fields(self):
+        res, queries = self.get(f'/api/v1/articles/{self.article.id}/', fields='id,content')
+        self.assertEqual(set(res.data), {'id', 'content'})
+        # ETag validators and the article row
+        self.assertEqual(len(queries), 2)
+
+    def test_cursor_pagination_with_fields(self):
+        res, _ = self.get('/api/v1/articles/', pagination='cursor', page_size=2, fields='id')
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(res.data['next'])
+        queries = ctx.captured_queries
+        self.assertEqual(len(res.data['results']), 1)
+        # Only the page, no per-row queries for the sort key
+        self.assertEqual(len(queries), 1)
+
+    def test_article_comments_fields(self):
+        root = Comment.objects.create(article=self.article, author=self.author, content='Root')
+        reply = Comment.objects.create(article=self.article, author=self.author, content='Reply', parent=root)
+        res, _ = self.get(f'/api/v1/articles/{self.article.id}/comments/', fields='id,content,replies')
+        self.assertEqual(res.data[0]['content'], 'Root')
+        self.assertEqual(res.data[0]['replies'], [{'id': reply.id, 'content': 'Reply', 'replies': []}])
+
+    def test_bookmark_fields(self):
+        Bookmark.objects.create(user=self.author, article=self.article)
+        self.client.force_authenticate(self.author)
+        res, queries = self.get('/api/v1/bookmarks/', fields='id,article.id,article.title')
+        self.assertEqual(res.data['results'][0]['article'], {'id': self.article.id, 'title': self.article.title})
+        self.assertFalse(any('news_tag' in sql for sql in queries))
@@ -0,0 +1,85 @@
+import asyncio
+from django.test import LiveServerTestCase, SimpleTestCase
+from django.contrib.auth import get_user_model
+from news import loadtest
+from news.management.commands.loadtest import parse_weights
+from news.models import Article
+
+User = get_user_model()
+
+
+class SummaryTests(SimpleTestCase):
+    def test_percentile_uses_nearest_rank(self):
+        ordered = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(ordered, 50), 50)
+        self.assertEqual(loadtest.percentile(ordered, 95), 95)
+        self.assertEqual(loadtest.percentile(ordered, 99), 99)
+        self.assertEqual(loadtest.percentile([7], 99), 7)
+        self.assertIsNone(loadtest.percentile([], 50))
+
+    def test_summarize_reports_per_endpoint_and_total(self):
+        recorder = loadtest.Recorder()
+        for latency in range(1, 11):
+            recorder.record('articles:list', float(latency), 200, True)
+        recorder.record('reactions:create', 5.0, 500, False)
+        summary = loadtest.summarize(recorder, elapsed=2.0)
+
+        listing = summary['endpoints']['articles:list']
+        self.assertEqual(listing['requests'], 10)
+        self.assertEqual(listing['throughput'], 5.0)
+        self.assertEqual((listing['p50_ms'], listing['p95_ms'], listing['p99_ms']), (5.0, 10.0, 10.0))
+        self.assertEqual(summary['endpoints']['reactions:create']['error_rate'], 1.0)
+        self.assertEqual(summary['endpoints']['reactions:create']['statuses'], {'500': 1})
+        self.assertEqual(summary['total']['requests'], 11)
+        self.assertEqual(summary['total']['errors'], 1)
+
+    def test_compare_reports_relative_changes(self):
+        recorder = loadtest.Recorder()
+        recorder.record('articles:list', 10.0, 200, True)
+        baseline = loadtest.summarize(recorder, elapsed=1.0)
+        recorder.record('articles:list', 30.0, 200, True)
+        changes = loadtest.compare(loadtest.summarize(recorder, elapsed=1.0), baseline)
+        self.assertEqual(changes['articles:list']['throughput'], 1.0)
+        self.assertEqual(changes['articles:list']['p99_ms'], 2.0)
+        self.assertEqual(changes['total']['error_rate'], 0.0)
+
+    def test_parse_weights(self):
+        self.assertEqual(parse_weights('browse=5,read,auth=0'), {'browse': 5.0, 'read': 1.0})
+
+
+class LoadTestRunTests(LiveServerTestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='author', email='a@example.com', password='pass')
+        for i in range(3):
+            User.objects.create_user(username=f'load{i}', email=f'load{i}@example.com', password='secret')
+        for i in range(5):
+            Article.objects.create(title=f'A{i}', content='C', author=author, status='published')
+
+    def _run(self, **kwargs):
+        recorder, elapsed = asyncio.run(loadtest.run(
+            self.live_server_url, seed=1, username_template='load{}', user_count=3, password='secret', **kwargs
+        ))
+        return loadtest.summarize(recorder, elapsed)
+
+    def test_mixed_run_succeeds(self):
+        summary = self._run(duration=1, concurrency=3)
+        self.assertGreater(summary['total']['requests'], 0)
+        self.assertEqual(summary['total']['errors'], 0, summary['endpoints'])
+
+    def test_scenarios_hit_their_endpoints(self):
+        expected = {
+            'browse': {'articles:list', 'articles:trending', 'tags:list'},
+            'read': {'articles:detail', 'articles:comments', 'articles:related'},
+            'react': {'auth:login', 'articles:detail', 'reactions:create'},
+            'bookmark': {'auth:login', 'bookmarks:toggle', 'bookmarks:list'},
+            'auth': {'auth:login', 'auth:refresh'},
+        }
+        for scenario, endpoints in expected.items():
+            with self.subTest(scenario=scenario):
+                summary = self._run(duration=0.2, concurrency=1, weights={scenario: 1})
+                self.assertEqual(set(summary['endpoints']), endpoints)
+                self.assertEqual(summary['total']['errors'], 0, summary['endpoints'])
+
+    def test_unknown_scenario_is_rejected(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(loadtest.run(self.live_server_url, duration=0.1, weights={'nope': 1}))
@@ -0,0 +1,134 @@
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from pulse_news import metrics
+from news.models import Article
+from news.tasks import flush_article_views
+
+User = get_user_model()
+
+
+def _write_samples(directory, count):
+    with override_settings(METRICS_DIR=directory):
+        for _ in range(count):
+            metrics.REQUESTS.inc(view='article-list', method='GET', status='200')
+        metrics.REQUEST_DURATION.observe(0.2, view='article-list', method='GET')
+
+
+def sample(text, name, **labels):
+    """Value of the sample `name` with exactly `labels` in a scrape, or None."""
+    for line in text.splitlines():
+        match = re.fullmatch(r'(\w+)(?:\{(.*)\})? (\S+)', line)
+        if match and match.group(1) == name and dict(re.findall(r'(\w+)="([^"]*)"', match.group(2) or '')) == labels:
+            return float(match.group(3))
+    return None
+
+
+class MetricsDirMixin:
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        override = override_settings(METRICS_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class RegistryTests(MetricsDirMixin, SimpleTestCase):
+    def test_processes_are_aggregated(self):
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_write_samples, args=(self.directory, n)) for n in (1, 2, 3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        _write_samples(self.directory, 4)
+
+        text = metrics.render()
+        self.assertEqual(sample(text, 'http_requests_total', method='GET', status='200', view='article-list'), 10)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_count', method='GET', view='article-list'), 4)
+        self.assertAlmostEqual(
+            sample(text, 'http_request_duration_seconds_sum', method='GET', view='article-list'), 0.8
+        )
+
+    def test_files_of_exited_processes_are_merged(self):
+        context = multiprocessing.get_context('fork')
+        for n in (1, 2):
+            worker = context.Process(target=_write_samples, args=(self.directory, n))
+            worker.start()
+            worker.join()
+        _write_samples(self.directory, 4)
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+
+        for _ in range(2):
+            text = metrics.render()
+            self.assertEqual(sample(text, 'http_requests_total', method='GET', status='200', view='article-list'), 7)
+            self.assertEqual(sample(text, 'http_request_duration_seconds_count', method='GET', view='article-list'), 3)
+        self.assertEqual(
+            sorted(os.listdir(self.directory)), [f'{os.getpid()}.db', metrics.MERGE_LOCK_FILE, metrics.MERGED_FILE]
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        for value in (0.003, 0.2, 0.2, 100):
+            metrics.REQUEST_DURATION.observe(value, view='v', method='GET')
+        text = metrics.render()
+        bucket = 'http_request_duration_seconds_bucket'
+        self.assertEqual(sample(text, bucket, le='0.005', method='GET', view='v'), 1)
+        self.assertEqual(sample(text, bucket, le='0.1', method='GET', view='v'), 1)
+        self.assertEqual(sample(text, bucket, le='0.25', method='GET', view='v'), 3)
+        self.assertEqual(sample(text, bucket, le='60', method='GET', view='v'), 3)
+        self.assertEqual(sample(text, bucket, le='+Inf', method='GET', view='v'), 4)
+
+    def test_file_grows_and_reopens(self):
+        for i in range(3000):
+            metrics.REQUESTS.inc(view=f'view-{i}', method='GET', status='200')
+        values = metrics.read_file(metrics.registry.file.path)
+        self.assertEqual(len(values), 3000)
+        # A new process with the same pid picks up the existing values
+        reopened = metrics.MetricsFile(metrics.registry.file.path)
+        self.assertEqual(len(reopened.positions), 3000)
+        reopened.close()
+
+
+class MetricsEndpointTests(MetricsDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        author = User.objects.create_user(username='author', email='a@example.com', password='pass')
+        Article.objects.create(title='A', content='C', author=author, status='published')
+
+    def test_requests_queries_and_cache_are_recorded(self):
+        client = APIClient()
+        client.get('/api/v1/articles/')
+        client.get('/api/v1/articles/')
+        client.get('/api/v1/articles/999999/')
+
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        text = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertEqual(sample(text, 'http_requests_total', method='GET', status='200', view='article-list'), 2)
+        self.assertEqual(sample(text, 'http_requests_total', method='GET', status='404', view='article-detail'), 1)
+        self.assertGreater(sample(text, 'db_queries_total', view='article-list'), 0)
+        self.assertGreater(sample(text, 'db_query_duration_seconds_total', view='article-list'), 0)
+        self.assertEqual(sample(text, 'response_cache_requests_total', result='hit'), 1)
+        # The list misses then hits, the missing article misses
+        self.assertEqual(sample(text, 'response_cache_requests_total', result='miss'), 2)
+        self.assertAlmostEqual(sample(text, 'response_cache_hit_ratio'), 1 / 3)
+
+    def test_task_durations_are_recorded(self):
+        flush_article_views.delay()
+        text = APIClient().get('/metrics').content.decode()
+        self.assertEqual(sample(
+            text, 'celery_task_duration_seconds_count', state='SUCCESS', task='news.tasks.flush_article_views'
+        ), 1)
+
+    def test_only_local_scrapes_are_allowed(self):
+        self.assertEqual(APIClient(REMOTE_ADDR='10.0.0.5').get('/metrics').status_code, 403)
@@ -0,0 +1,39 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from news.models import COMMENT_MAX_DEPTH, COMMENT_PATH_STEP, comment_path_segment
+
+
+class CommentPathMigrationTests(TransactionTestCase):
+    migrate_from = [('news', '0006_article_tag_through')]
+    migrate_to = [('news', '0007_comment_path')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_backfill_keeps_threads_deeper_than_the_api_allows(self):
+        apps = self.migrate(self.migrate_from)
+        Article = apps.get_model('news', 'Article')
+        Comment = apps.get_model('news', 'Comment')
+        article = Article.objects.create(title='Legacy', slug='legacy', content='Body', status='published')
+        thread = [Comment.objects.create(article=article, content='0')]
+        for depth in range(1, COMMENT_MAX_DEPTH + 4):
+            thread.append(Comment.objects.create(article=article, content=str(depth), parent=thread[-1]))
+        sibling = Comment.objects.create(article=article, content='sibling', parent=thread[1])
+
+        Comment = self.migrate(self.migrate_to).get_model('news', 'Comment')
+        comments = {comment.pk: comment for comment in Comment.objects.all()}
+        for depth, legacy in enumerate(thread + [sibling]):
+            comment = comments[legacy.pk]
+            self.assertEqual(comment.parent_id, legacy.parent_id)
+            self.assertEqual(comment.depth, depth if legacy is not sibling else 2)
+            self.assertEqual(len(comment.path), (comment.depth + 1) * COMMENT_PATH_STEP)
+            self.assertTrue(comment.path.endswith(comment_path_segment(comment.pk)))
+            if comment.parent_id is not None:
+                self.assertEqual(comment.path[:-COMMENT_PATH_STEP], comments[comment.parent_id].path)
@@ -1,7 +1,8 @@
 from django.test import TestCase
 from django.db import IntegrityError
 from django.contrib.auth import get_user_model
-from news.models import Category, Tag, Article, Comment, Reaction, Bookmark
+from news.comment_tree import backfill_paths
+from news.models import Category, Tag, Article, Comment, Reaction, Bookmark, COMMENT_PATH_STEP, comment_path_segment
 
 User = get_user_model()
 
@@ -40,3 +41,48 @@ class NewsModelsTests(TestCase):
         art = Article.objects.create(title='B', content='x', category=self.category, author=self.user)
         c = Comment.objects.create(article=art, author=self.user, content='hi')
         self.assertIn(self.user.username, str(c))
+
+
+class CommentPathTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u', email='u@example.com', password='pass')
+        self.article = Article.objects.create(title='A', content='x', author=self.user)
+        other = Article.objects.create(title='B', content='x', author=self.user)
+        Comment.objects.create(article=other, author=self.user, content='elsewhere')
+        # root
+        #   a
+        #     a1
+        #   b
+        # second
+        self.root = self._comment('root')
+        self.a = self._comment('a', self.root)
+        self.a1 = self._comment('a1', self.a)
+        self.b = self._comment('b', self.root)
+        self.second = self._comment('second')
+
+    def _comment(self, content, parent=None):
+        return Comment.objects.create(article=self.article, author=self.user, content=content, parent=parent)
+
+    def _contents(self, queryset):
+        return [comment.content for comment in queryset]
+
+    def test_path_and_depth_are_set_on_insert(self):
+        self.assertEqual(self.root.path, comment_path_segment(self.root.pk))
+        self.assertEqual(self.a1.path, self.root.path + comment_path_segment(self.a.pk) + comment_path_segment(self.a1.pk))
+        self.assertEqual((self.root.depth, self.a.depth, self.a1.depth), (0, 1, 2))
+        self.a1.refresh_from_db()
+        self.assertEqual(len(self.a1.path), 3 * COMMENT_PATH_STEP)
+
+    def test_thread_subtree_and_depth_limits(self):
+        self.assertEqual(self._contents(Comment.objects.thread(self.article.pk)), ['root', 'a', 'a1', 'b', 'second'])
+        self.assertEqual(self._contents(Comment.objects.thread(self.article.pk, max_depth=1)), ['root', 'a', 'b', 'second'])
+        self.assertEqual(self._contents(Comment.objects.subtree(self.root)), ['root', 'a', 'a1', 'b'])
+        self.assertEqual(self._contents(Comment.objects.subtree(self.root, max_depth=1, include_self=False)), ['a', 'b'])
+        self.assertEqual(self._contents(Comment.objects.subtree(self.a)), ['a', 'a1'])
+
+    def test_backfill_fills_missing_paths(self):
+        Comment.objects.update(path='', depth=0)
+        self.assertEqual(backfill_paths(batch_size=2), 6)
+        self.assertEqual(self._contents(Comment.objects.subtree(Comment.objects.get(pk=self.root.pk))), ['root', 'a', 'a1', 'b'])
+        self.assertEqual(Comment.objects.get(pk=self.a1.pk).depth, 2)
+        self.assertEqual(backfill_paths(), 0)
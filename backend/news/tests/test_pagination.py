@@ -0,0 +1,77 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from news.models import Article, Category, Comment
+
+User = get_user_model()
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.staff = User.objects.create_user(username='staff', email='s@example.com', password='pass', is_staff=True)
+        self.category = Category.objects.create(name='Tech')
+        now = timezone.now()
+        self.articles = []
+        for i in range(7):
+            article = Article.objects.create(title=f'A{i}', content='C', category=self.category, author=self.staff, status='published')
+            self.articles.append(article)
+        # Two pairs share a publication date so the tie-breakers matter
+        dates = [now, now, now - timedelta(hours=1), now - timedelta(hours=2), now - timedelta(hours=2), now - timedelta(hours=3), now - timedelta(hours=4)]
+        for article, published_at in zip(self.articles, dates):
+            Article.objects.filter(pk=article.pk).update(published_at=published_at, views=article.pk % 3)
+        self.draft = Article.objects.create(title='Draft', content='C', category=self.category, author=self.staff, status='draft')
+
+    def _walk(self, url):
+        ids = []
+        pages = 0
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', res.data)
+            ids.extend(item['id'] for item in res.data['results'])
+            url = res.data['next']
+            pages += 1
+        return ids, pages
+
+    def _expected(self, queryset, *ordering):
+        return list(queryset.order_by(*ordering).values_list('id', flat=True))
+
+    def test_cursor_pages_follow_feed_order(self):
+        ids, pages = self._walk('/api/v1/articles/?pagination=cursor&page_size=2')
+        published = Article.objects.filter(status='published')
+        self.assertEqual(ids, self._expected(published, '-published_at', '-created_at', 'id'))
+        self.assertEqual(pages, 4)
+
+    def test_cursor_pages_include_drafts_without_publication_date(self):
+        self.client.force_authenticate(user=self.staff)
+        ids, _ = self._walk('/api/v1/articles/?pagination=cursor&page_size=3')
+        self.assertEqual(len(ids), 8)
+        self.assertEqual(len(set(ids)), 8)
+        self.assertEqual(ids[-1], self.draft.id)
+
+    def test_cursor_pages_honour_ordering_param(self):
+        ids, _ = self._walk('/api/v1/articles/?pagination=cursor&page_size=2&ordering=-views')
+        published = Article.objects.filter(status='published')
+        self.assertEqual(ids, self._expected(published, '-views', 'id'))
+
+    def test_page_number_mode_is_default(self):
+        res = self.client.get('/api/v1/articles/')
+        self.assertIn('count', res.data)
+
+    def test_invalid_cursor(self):
+        res = self.client.get('/api/v1/articles/?cursor=bogus')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_article_comments_cursor(self):
+        article = self.articles[0]
+        for i in range(5):
+            Comment.objects.create(article=article, author=self.staff, content=f'c{i}')
+        res = self.client.get(f'/api/v1/articles/{article.id}/comments/')
+        self.assertEqual(len(res.data), 5)
+        ids, pages = self._walk(f'/api/v1/articles/{article.id}/comments/?pagination=cursor&page_size=2')
+        self.assertEqual(ids, self._expected(Comment.objects.filter(article=article), 'created_at', 'id'))
+        self.assertEqual(pages, 3)
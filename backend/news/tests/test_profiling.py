@@ -0,0 +1,93 @@
+import json
+from unittest import mock
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from news.models import Article, Category
+
+User = get_user_model()
+
+
+class RequestProfilerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(username='staff', email='s@example.com', password='pass', is_staff=True)
+        self.reader = User.objects.create_user(username='reader', email='r@example.com', password='pass')
+        category = Category.objects.create(name='Tech', slug='tech')
+        for i in range(3):
+            Article.objects.create(title=f'A{i}', content='C', author=self.staff, category=category, status='published')
+
+    def _client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return client
+
+    def test_staff_request_is_profiled_and_stored(self):
+        client = self._client(self.staff)
+        response = client.get('/api/v1/articles/', HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('results', response.json())
+        self.assertEqual(response['X-Profile-Url'], f'/api/v1/profiles/{response["X-Profile-Id"]}/')
+
+        report = client.get(response['X-Profile-Url']).json()
+        self.assertEqual(report['request'], 'GET /api/v1/articles/')
+        self.assertEqual(report['status'], 200)
+        self.assertNotIn('speedscope', report)
+        self.assertTrue({'permissions', 'rendering'} <= set(report['phases_ms']), report['phases_ms'])
+        self.assertGreater(report['database']['count'], 0)
+        self.assertEqual(report['database']['count'], len(report['queries']))
+        query = report['queries'][0]
+        self.assertTrue({'sql', 'start_ms', 'duration_ms', 'call_site', 'stack'} <= set(query))
+        self.assertTrue(any(q['call_site'] and q['call_site'].startswith('news/') for q in report['queries']), report['queries'])
+
+        speedscope = client.get(report['speedscope_url'])
+        self.assertIn('attachment', speedscope['Content-Disposition'])
+        self._assert_valid_speedscope(json.loads(speedscope.content))
+
+    def test_speedscope_mode_returns_the_profile(self):
+        response = self._client(self.staff).get('/api/v1/articles/', {'_profile': 'speedscope'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('X-Profile-Id', response)
+        self._assert_valid_speedscope(json.loads(response.content))
+
+    @mock.patch('pulse_news.profiling.MAX_EVENTS', 500)
+    def test_timeline_is_capped(self):
+        client = self._client(self.staff)
+        report = client.get(client.get('/api/v1/articles/', HTTP_X_PROFILE='1')['X-Profile-Url']).json()
+        self.assertTrue(report['truncated'])
+        data = json.loads(client.get(report['speedscope_url']).content)
+        self.assertLessEqual(len(data['profiles'][0]['events']), 2 * 500)
+        self._assert_valid_speedscope(data)
+
+    def _assert_valid_speedscope(self, data):
+        self.assertEqual(data['$schema'], 'https://www.speedscope.app/file-format-schema.json')
+        profile = data['profiles'][0]
+        self.assertEqual(profile['type'], 'evented')
+        frames = data['shared']['frames']
+        names = {frame['name'] for frame in frames}
+        self.assertIn('FastArticleListMixin.list', names)
+        # Events are ordered and properly nested
+        stack, last = [], 0
+        for event in profile['events']:
+            self.assertGreaterEqual(event['at'], last)
+            last = event['at']
+            self.assertLess(event['frame'], len(frames))
+            if event['type'] == 'O':
+                stack.append(event['frame'])
+            else:
+                self.assertEqual(stack.pop(), event['frame'])
+        self.assertEqual(stack, [])
+        self.assertLessEqual(last, profile['endValue'])
+
+    def test_non_staff_and_anonymous_requests_are_not_profiled(self):
+        for client in (self._client(self.reader), APIClient()):
+            response = client.get('/api/v1/articles/', HTTP_X_PROFILE='1')
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('X-Profile-Id', response)
+
+    def test_profiles_are_staff_only(self):
+        profile_id = self._client(self.staff).get('/api/v1/articles/', HTTP_X_PROFILE='1')['X-Profile-Id']
+        self.assertEqual(self._client(self.reader).get(f'/api/v1/profiles/{profile_id}/').status_code, 403)
+        self.assertEqual(self._client(self.staff).get('/api/v1/profiles/missing/').status_code, 404)
@@ -0,0 +1,268 @@
+"""
+Query budgets for every route in news/urls.py.
+
+Each request runs against datasets of 1, 5 and 20 articles (each with its
+own author and category, tags, comments with replies, reactions and
+bookmarks, and as many comment threads on the first article); the number of
+queries must stay within a fixed budget at every size.
+"""
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from accounts.models import Role
+from news.models import Article, Bookmark, Category, Comment, Reaction, Tag
+from news.related import build_related_articles
+from news.trending import compute_trending
+from pulse_news.instrumentation import fingerprint, record_queries
+from pulse_news.testing import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_parameters_and_in_lists_are_normalized(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = \'x\'  LIMIT 21'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s) AND name = \'y\' LIMIT 5'),
+        )
+        self.assertNotEqual(fingerprint('SELECT a FROM t'), fingerprint('SELECT b FROM t'))
+
+
+@override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=0)
+class InstrumentationTests(TestCase):
+    def test_recorder_reports_duplicates(self):
+        tags = [Tag.objects.create(name=f'tag{i}') for i in range(3)]
+        with record_queries() as recorder:
+            for tag in tags:
+                Tag.objects.filter(pk=tag.pk).exists()
+            Category.objects.count()
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(recorder.duplicate_count, 2)
+        self.assertEqual(list(recorder.duplicates.values()), [3])
+
+    def test_middleware_headers(self):
+        Tag.objects.create(name='ai')
+        response = self.client.get('/api/v1/tags/')
+        self.assertEqual(response['X-DB-Query-Count'], '2')
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '0')
+        self.assertIn('X-DB-Time-Ms', response)
+
+
+@override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=0)
+class NewsQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.editor_role, _ = Role.objects.get_or_create(name=Role.EDITOR)
+        self.reader_role, _ = Role.objects.get_or_create(name=Role.READER)
+        self.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass', role=self.reader_role
+        )
+        self.editor = User.objects.create_user(
+            username='editor', email='editor@example.com', password='pass', role=self.editor_role
+        )
+        self.staff = User.objects.create_user(
+            username='staff', email='staff@example.com', password='pass', is_staff=True
+        )
+        self.tags = [Tag.objects.create(name=f'tag{i}') for i in range(3)]
+        self.articles = []
+        self.created = 0
+        self.article = self.grow(1)
+
+    def grow(self, size):
+        while len(self.articles) < size:
+            i = self.created
+            self.created += 1
+            author = User.objects.create_user(
+                username=f'author{i}', email=f'author{i}@example.com', password='pass', role=self.editor_role
+            )
+            category = Category.objects.create(name=f'Category {i}')
+            article = Article.objects.create(
+                title=f'Article {i}', content='Body', category=category, author=author, status='published'
+            )
+            article.tags.set(self.tags[:2])
+            for commenter in (author, self.user):
+                root = Comment.objects.create(article=article, author=commenter, content='Root')
+                Comment.objects.create(article=article, author=self.editor, content='Reply', parent=root)
+            Reaction.objects.create(article=article, user=author, value=Reaction.LIKE)
+            Reaction.objects.create(article=article, user=self.user, value=Reaction.LIKE)
+            Bookmark.objects.create(article=article, user=self.user)
+            self.articles.append(article)
+
+            first = self.articles[0]
+            root = Comment.objects.create(article=first, author=author, content='Thread')
+            Comment.objects.create(article=first, author=self.user, content='Reply', parent=root)
+        return self.articles[0]
+
+    def as_user(self, user):
+        self.client.force_authenticate(user)
+
+    # Articles
+
+    def test_article_list(self):
+        self.assertQueryBudget(4, lambda: self.client.get('/api/v1/articles/'))
+
+    def test_article_list_serializer_path(self):
+        self.as_user(self.staff)
+        self.assertQueryBudget(3, lambda: self.client.get('/api/v1/articles/', {'fields': 'id,author,tags'}))
+
+    def test_article_list_with_viewer_state(self):
+        self.as_user(self.user)
+        self.assertQueryBudget(5, lambda: self.client.get('/api/v1/articles/', {'with_viewer_state': '1'}))
+
+    def test_article_viewer_state(self):
+        self.as_user(self.user)
+        self.assertQueryBudget(2, lambda: self.client.get('/api/v1/articles/viewer_state/', {
+            'ids': ','.join(str(article.pk) for article in self.articles)
+        }))
+
+    def test_article_list_cursor(self):
+        self.assertQueryBudget(3, lambda: self.client.get('/api/v1/articles/', {'pagination': 'cursor'}))
+
+    @override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=60)
+    def test_article_list_cache_hit(self):
+        # Validators come from the cache generations, the payload from the cache
+        self.assertQueryBudget(0, lambda: self.client.get('/api/v1/articles/'), warm=True)
+        self.assertQueryBudget(
+            0, lambda: self.client.get('/api/v1/articles/', {'pagination': 'cursor'}), warm=True
+        )
+
+    def test_article_detail(self):
+        self.assertQueryBudget(3, lambda: self.client.get(f'/api/v1/articles/{self.article.pk}/'))
+
+    @override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=60)
+    def test_article_detail_cache_hit(self):
+        # The one-row validator aggregate
+        self.assertQueryBudget(1, lambda: self.client.get(f'/api/v1/articles/{self.article.pk}/'), warm=True)
+
+    def test_article_create(self):
+        self.as_user(self.editor)
+        self.assertQueryBudget(9, lambda: self.client.post('/api/v1/articles/', {
+            'title': 'New', 'content': 'Body', 'tags': [tag.pk for tag in self.tags]
+        }, format='json'))
+
+    def test_article_update(self):
+        self.as_user(self.staff)
+        self.assertQueryBudget(4, lambda: self.client.patch(
+            f'/api/v1/articles/{self.article.pk}/', {'title': 'Changed'}, format='json'
+        ))
+
+    def test_article_delete(self):
+        self.as_user(self.staff)
+        # One DELETE per dependent table (counter shards included), plus the
+        # related lists to refill
+        self.assertQueryBudget(
+            13, lambda: self.client.delete(f'/api/v1/articles/{self.articles.pop().pk}/'),
+            prepare=lambda: self.grow(len(self.articles) + 1),
+        )
+
+    def test_article_publish_and_unpublish(self):
+        self.as_user(self.staff)
+        url = f'/api/v1/articles/{self.article.pk}/'
+        self.assertQueryBudget(5, lambda: self.client.post(url + 'unpublish/'))
+        self.assertQueryBudget(5, lambda: self.client.post(url + 'publish/'))
+
+    def test_article_trending(self):
+        self.assertQueryBudget(
+            4, lambda: self.client.get('/api/v1/articles/trending/'), prepare=compute_trending
+        )
+
+    def test_article_related(self):
+        self.assertQueryBudget(
+            4, lambda: self.client.get(f'/api/v1/articles/{self.article.pk}/related/'),
+            prepare=build_related_articles,
+        )
+
+    # Taxonomy
+
+    def test_category_list_and_detail(self):
+        category = self.article.category
+        self.assertQueryBudget(2, lambda: self.client.get('/api/v1/categories/'))
+        self.assertQueryBudget(1, lambda: self.client.get(f'/api/v1/categories/{category.slug}/'))
+
+    def test_tag_list_and_detail(self):
+        self.assertQueryBudget(2, lambda: self.client.get('/api/v1/tags/'))
+        self.assertQueryBudget(1, lambda: self.client.get(f'/api/v1/tags/{self.tags[0].slug}/'))
+
+    def test_category_create(self):
+        self.as_user(self.staff)
+        names = iter(range(100))
+        self.assertQueryBudget(2, lambda: self.client.post(
+            '/api/v1/categories/', {'name': f'New {next(names)}'}, format='json'
+        ))
+
+    # Comments
+
+    def test_comment_list(self):
+        self.assertQueryBudget(4, lambda: self.client.get('/api/v1/comments/'))
+
+    def test_comment_list_for_article(self):
+        # The `article` filter looks its value up for the validators and the page
+        self.assertQueryBudget(6, lambda: self.client.get('/api/v1/comments/', {'article': self.article.pk}))
+
+    def test_article_comments(self):
+        self.assertQueryBudget(3, lambda: self.client.get(f'/api/v1/articles/{self.article.pk}/comments/'))
+
+    def test_article_comment_threads(self):
+        self.assertQueryBudget(3, lambda: self.client.get(f'/api/v1/articles/{self.article.pk}/comments/threads/'))
+
+    def test_comment_replies(self):
+        root = Comment.objects.filter(article=self.article, parent__isnull=True).first()
+        self.assertQueryBudget(4, lambda: self.client.get(f'/api/v1/comments/{root.pk}/replies/'))
+
+    def test_article_comment_create(self):
+        self.as_user(self.user)
+        # The materialized path is written once the id is known
+        self.assertQueryBudget(6, lambda: self.client.post(
+            f'/api/v1/articles/{self.article.pk}/comments/', {'content': 'New'}, format='json'
+        ))
+
+    # Reactions
+
+    def test_reaction_list(self):
+        self.as_user(self.user)
+        self.assertQueryBudget(2, lambda: self.client.get('/api/v1/reactions/'))
+
+    def test_reaction_create(self):
+        self.as_user(self.user)
+        self.assertQueryBudget(8, lambda: self.client.post(
+            '/api/v1/reactions/', {'article': self.article.pk, 'value': Reaction.DISLIKE}, format='json'
+        ))
+
+    def test_article_reactions(self):
+        self.as_user(self.articles[0].author)
+        url = f'/api/v1/articles/{self.article.pk}/reactions/'
+        self.assertQueryBudget(2, lambda: self.client.get(url))
+        self.assertQueryBudget(3, lambda: self.client.get(url + 'my_reaction/'))
+
+    def test_article_reaction_toggle_and_clear(self):
+        self.as_user(self.user)
+        url = f'/api/v1/articles/{self.article.pk}/reactions/'
+        # Budgets of the locking fallback; PostgreSQL upserts in one statement
+        self.assertQueryBudget(8, lambda: self.client.post(url + 'toggle/', {'value': Reaction.DISLIKE}, format='json'))
+        self.assertQueryBudget(6, lambda: self.client.post(url + 'clear/'))
+
+    # Bookmarks
+
+    def test_bookmark_list(self):
+        self.as_user(self.user)
+        self.assertQueryBudget(3, lambda: self.client.get('/api/v1/bookmarks/'))
+
+    def test_user_bookmark_list(self):
+        self.as_user(self.user)
+        self.assertQueryBudget(3, lambda: self.client.get(f'/api/v1/users/{self.user.pk}/bookmarks/'))
+
+    def test_bookmark_check_and_create(self):
+        self.as_user(self.editor)
+        self.assertQueryBudget(1, lambda: self.client.get(
+            '/api/v1/bookmarks/check/', {'article_id': self.article.pk}
+        ))
+        articles = iter(self.articles)
+        self.assertQueryBudget(9, lambda: self.client.post(
+            '/api/v1/bookmarks/', {'article_id': next(articles).pk}, format='json'
+        ))
+
+    # Misc
+
+    def test_response_cache_stats(self):
+        self.as_user(self.staff)
+        self.assertQueryBudget(0, lambda: self.client.get('/api/v1/cache/stats/'))
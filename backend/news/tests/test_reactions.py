@@ -0,0 +1,100 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+from news.models import Article, Reaction
+from news.reactions import clear_reaction, set_reaction, toggle_reaction
+
+User = get_user_model()
+
+
+class ReactionWriteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u', email='u@example.com', password='pass')
+        self.other = User.objects.create_user(username='o', email='o@example.com', password='pass')
+        self.article = Article.objects.create(title='T', content='C', author=self.user, status='published')
+
+    def _counters(self):
+        self.article.refresh_from_db()
+        return self.article.likes_count, self.article.dislikes_count
+
+    def _stored(self, user):
+        return Reaction.objects.filter(article=self.article, user=user).values_list('value', flat=True).first()
+
+    def test_set_returns_previous_value_and_applies_deltas(self):
+        reaction, previous = set_reaction(self.article.pk, self.user, Reaction.LIKE)
+        self.assertIsNone(previous)
+        self.assertEqual(reaction, Reaction.objects.get(article=self.article, user=self.user))
+        self.assertEqual(reaction.value, Reaction.LIKE)
+        set_reaction(self.article.pk, self.other, Reaction.LIKE)
+        self.assertEqual(self._counters(), (2, 0))
+
+        reaction, previous = set_reaction(self.article.pk, self.user, Reaction.DISLIKE)
+        self.assertEqual((previous, reaction.value), (Reaction.LIKE, Reaction.DISLIKE))
+        self.assertEqual(self._counters(), (1, 1))
+
+        reaction, previous = set_reaction(self.article.pk, self.user, Reaction.DISLIKE)
+        self.assertEqual(previous, Reaction.DISLIKE)
+        self.assertEqual(self._counters(), (1, 1))
+        self.assertEqual(Reaction.objects.filter(article=self.article).count(), 2)
+
+        with self.assertRaises(ValueError):
+            set_reaction(self.article.pk, self.user, 0)
+
+    def test_toggle_and_clear(self):
+        self.assertEqual(toggle_reaction(self.article.pk, self.user, Reaction.LIKE), (Reaction.LIKE, None))
+        self.assertEqual(
+            toggle_reaction(self.article.pk, self.user, Reaction.DISLIKE), (Reaction.DISLIKE, Reaction.LIKE)
+        )
+        self.assertEqual(self._counters(), (0, 1))
+        self.assertEqual(toggle_reaction(self.article.pk, self.user, Reaction.DISLIKE), (None, Reaction.DISLIKE))
+        self.assertIsNone(self._stored(self.user))
+        self.assertEqual(self._counters(), (0, 0))
+
+        set_reaction(self.article.pk, self.user, Reaction.LIKE)
+        self.assertEqual(clear_reaction(self.article.pk, self.user), Reaction.LIKE)
+        self.assertIsNone(clear_reaction(self.article.pk, self.user))
+        self.assertEqual(self._counters(), (0, 0))
+
+    @skipUnless(connection.vendor == 'postgresql', 'INSERT ... ON CONFLICT upsert')
+    def test_upsert_is_one_statement(self):
+        # The upsert plus the counter update
+        with self.assertNumQueries(2):
+            set_reaction(self.article.pk, self.user, Reaction.LIKE)
+        with self.assertNumQueries(2):
+            set_reaction(self.article.pk, self.user, Reaction.DISLIKE)
+        with self.assertNumQueries(2):
+            clear_reaction(self.article.pk, self.user)
+
+    def test_toggle_and_clear_actions(self):
+        client = APIClient()
+        url = f'/api/v1/articles/{self.article.pk}/reactions/'
+        self.assertEqual(client.post(url + 'toggle/', {'value': 1}, format='json').status_code, 401)
+        client.force_authenticate(self.user)
+
+        response = client.post(url + 'toggle/', {'value': 1}, format='json')
+        self.assertEqual(response.json(), {'value': 1, 'previous': None})
+        response = client.post(url + 'toggle/', {'value': '1'})
+        self.assertEqual(response.json(), {'value': None, 'previous': 1})
+        client.post(url + 'toggle/', {'value': -1}, format='json')
+        self.assertEqual(self._stored(self.user), Reaction.DISLIKE)
+
+        self.assertEqual(client.post(url + 'clear/').json(), {'value': None, 'previous': -1})
+        self.assertEqual(client.post(url + 'clear/').json(), {'value': None, 'previous': None})
+        self.assertEqual(self._counters(), (0, 0))
+
+        self.assertEqual(client.post(url + 'toggle/', {'value': 2}, format='json').status_code, 400)
+        self.assertEqual(
+            client.post('/api/v1/articles/999999/reactions/toggle/', {'value': 1}, format='json').status_code, 404
+        )
+
+    def test_missing_article_is_not_found(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = '/api/v1/articles/999999/reactions/'
+        self.assertEqual(client.post(url, {'value': 1}, format='json').status_code, 404)
+        self.assertEqual(client.post(url + 'clear/').status_code, 404)
+        self.assertEqual(client.post('/api/v1/articles/abc/reactions/clear/').status_code, 404)
+        self.assertFalse(Reaction.objects.exists())
@@ -0,0 +1,163 @@
+import math
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from news.models import Article, Category, RelatedArticle, Tag
+from news.related import CATEGORY_WEIGHT, build_related_articles, update_related_articles
+from news.tasks import rebuild_related_articles
+
+
+def cosine(a, b):
+    def features(article):
+        vector = {('tag', tag.pk): 1.0 for tag in article.tags.all()}
+        if article.category_id:
+            vector[('category', article.category_id)] = CATEGORY_WEIGHT
+        return vector
+
+    a, b = features(a), features(b)
+    dot = sum(value * b.get(key, 0) for key, value in a.items())
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
+
+
+@override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=0, NEWS_RELATED_ARTICLES_COUNT=2)
+class RelatedArticlesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.tech = Category.objects.create(name='Tech')
+        self.sport = Category.objects.create(name='Sport')
+        self.tags = {name: Tag.objects.create(name=name) for name in ('ai', 'ml', 'gpu', 'football')}
+        self.articles = {}
+        for title, category, tags in (
+            ('a', self.tech, ['ai', 'ml']),
+            ('b', self.tech, ['ai', 'ml', 'gpu']),
+            ('c', self.tech, ['gpu']),
+            ('d', self.sport, ['football']),
+            ('e', self.sport, ['football', 'ai']),
+            ('f', None, ['ml']),
+        ):
+            article = Article.objects.create(title=title, content='Body', category=category, status='published')
+            article.tags.set([self.tags[name] for name in tags])
+            self.articles[title] = article
+        Article.objects.create(title='draft', content='Body', category=self.tech).tags.set([self.tags['ai']])
+
+    def table(self):
+        return {
+            (row.article_id, row.related_id): round(row.score, 9)
+            for row in RelatedArticle.objects.all()
+        }
+
+    def test_build_stores_top_cosine_neighbours(self):
+        # 'd' only shares a feature with 'e'
+        self.assertEqual(rebuild_related_articles(), 11)
+        published = list(Article.objects.filter(status='published').prefetch_related('tags'))
+        for article in published:
+            expected = sorted(
+                ((cosine(article, other), other.pk) for other in published if other.pk != article.pk),
+                key=lambda pair: (-pair[0], pair[1]),
+            )[:2]
+            stored = list(
+                RelatedArticle.objects.filter(article=article).order_by('-score', 'related_id')
+                .values_list('score', 'related_id')
+            )
+            self.assertEqual([pk for _, pk in stored], [pk for score, pk in expected if score > 0])
+            for (score, _), (expected_score, _) in zip(stored, expected):
+                self.assertAlmostEqual(score, expected_score)
+
+    def assertIncrementalMatchesRebuild(self, *titles):
+        update_related_articles([self.articles[title].pk for title in titles])
+        incremental = self.table()
+        build_related_articles()
+        self.assertEqual(incremental, self.table())
+
+    def test_incremental_updates_match_rebuild(self):
+        build_related_articles()
+        self.articles['c'].tags.set([self.tags['ai'], self.tags['ml']])
+        self.assertIncrementalMatchesRebuild('c')
+
+        self.articles['f'].tags.add(self.tags['football'])
+        self.articles['f'].category = self.sport
+        self.articles['f'].save()
+        self.assertIncrementalMatchesRebuild('f')
+
+        self.articles['a'].status = 'draft'
+        self.articles['a'].save()
+        self.assertIncrementalMatchesRebuild('a')
+
+        new = Article.objects.create(title='g', content='Body', category=self.tech, status='published')
+        new.tags.set([self.tags['ai'], self.tags['ml'], self.tags['gpu']])
+        self.articles['g'] = new
+        self.assertIncrementalMatchesRebuild('g')
+
+    def test_tag_changes_queue_refresh(self):
+        article = self.articles['a']
+        with mock.patch('news.tasks.refresh_related_articles.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                article.tags.remove(self.tags['ml'])
+        delay.assert_called_once_with([article.pk])
+
+        with mock.patch('news.tasks.refresh_related_articles.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.tags['gpu'].articles.add(article)
+        delay.assert_called_once_with([article.pk])
+
+    def test_only_category_or_status_changes_queue_refresh(self):
+        article = Article.objects.get(pk=self.articles['a'].pk)
+        with mock.patch('news.tasks.refresh_related_articles.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                article.title = 'Renamed'
+                article.save()
+                article.views = 10
+                article.save(update_fields=['views'])
+                article.category = self.tech
+                article.save(update_fields=['category'])
+        delay.assert_not_called()
+
+        for change in (
+            lambda: setattr(article, 'category', self.sport),
+            lambda: setattr(article, 'status', 'draft'),
+        ):
+            with mock.patch('news.tasks.refresh_related_articles.delay') as delay:
+                with self.captureOnCommitCallbacks(execute=True):
+                    change()
+                    article.save()
+                    # Saved again unchanged
+                    article.save()
+            delay.assert_called_once_with([article.pk])
+
+    def test_delete_refills_lists_that_contained_the_article(self):
+        build_related_articles()
+        deleted = self.articles['b']
+        self.assertTrue(RelatedArticle.objects.filter(related=deleted).exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted.delete()
+        refreshed = self.table()
+        build_related_articles()
+        self.assertEqual(refreshed, self.table())
+
+    def test_broker_errors_do_not_fail_writes(self):
+        article = self.articles['a']
+        with mock.patch('news.tasks.refresh_related_articles.delay', side_effect=OSError('broker down')):
+            with self.assertLogs(level='ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    article.category = self.sport
+                    article.save()
+                    article.tags.add(self.tags['gpu'])
+
+    def test_endpoint_reads_stored_neighbours(self):
+        build_related_articles()
+        url = f"/api/v1/articles/{self.articles['a'].pk}/related/"
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([item['title'] for item in res.data], ['b', 'f'])
+        # Neighbours, articles and tags (the articles have no authors)
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+        self.assertEqual(len(self.client.get(url, {'limit': 1}).data), 1)
+        self.assertEqual(self.client.get('/api/v1/articles/abc/related/').data, [])
@@ -0,0 +1,134 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from news.models import Article, Category, Comment, Reaction, Tag
+from news.response_cache import get_stats, normalize_params
+from news.view_counter import RECORDED_KEY, flush_views
+
+User = get_user_model()
+
+
+@override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=60)
+class AnonymousResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', email='a@example.com', password='pass')
+        self.category = Category.objects.create(name='Tech')
+        self.tag = Tag.objects.create(name='ai')
+        self.article = Article.objects.create(
+            title='Cached', content='Body', category=self.category, status='published', author=self.author
+        )
+        self.article.tags.add(self.tag)
+        self.draft = Article.objects.create(
+            title='Draft', content='Body', category=self.category, status='draft', author=self.author
+        )
+
+    def get(self, url, **params):
+        return self.client.get(url, params)
+
+    def test_list_hit_skips_database(self):
+        first = self.get('/api/v1/articles/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.get('/api/v1/articles/')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        # The conditional GET validators are cache generations too
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(get_stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_key_uses_normalized_params(self):
+        self.get('/api/v1/articles/', page_size=5, ordering='-views')
+        res = self.client.get('/api/v1/articles/?ordering=-views&page_size=5')
+        self.assertEqual(res['X-Cache'], 'HIT')
+        res = self.get('/api/v1/articles/', ordering='views')
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.get('/api/v1/articles/')
+        self.client.force_authenticate(self.author)
+        res = self.get('/api/v1/articles/')
+        self.assertEqual(res['X-Cache'], 'BYPASS')
+        self.assertIn(self.draft.id, [x['id'] for x in res.data['results']])
+
+    def test_writes_invalidate_list_and_detail(self):
+        detail_url = f'/api/v1/articles/{self.article.id}/'
+        self.get('/api/v1/articles/')
+        self.get(detail_url)
+
+        Comment.objects.create(article=self.article, author=self.author, content='Hi')
+        res = self.get(detail_url)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['comment_count'], 1)
+        res = self.get('/api/v1/articles/')
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+        Reaction.objects.create(article=self.article, user=self.author, value=Reaction.LIKE)
+        res = self.get('/api/v1/articles/')
+        self.assertEqual(res.data['results'][0]['likes_count'], 1)
+
+        self.tag.name = 'ml'
+        self.tag.save()
+        res = self.get(detail_url)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['tags'][0]['name'], 'ml')
+
+        self.draft.status = 'published'
+        self.draft.save()
+        res = self.get('/api/v1/articles/')
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_other_article_changes_keep_detail_cached(self):
+        detail_url = f'/api/v1/articles/{self.article.id}/'
+        self.get(detail_url)
+        Comment.objects.create(article=self.draft, author=self.author, content='Hi')
+        self.assertEqual(self.get(detail_url)['X-Cache'], 'HIT')
+
+    def test_cached_detail_still_counts_views(self):
+        detail_url = f'/api/v1/articles/{self.article.id}/'
+        start = self.article.views
+        self.assertEqual(self.get(detail_url).data['views'], start + 1)
+        flush_views()
+        res = self.get(detail_url)
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(res.data['views'], start + 2)
+        self.assertEqual(flush_views(), 1)
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.views, start + 2)
+
+    def test_cached_list_survives_expired_totals(self):
+        detail_url = f'/api/v1/articles/{self.article.id}/'
+        self.get(detail_url)
+        self.get(detail_url)
+        flush_views()
+        self.assertEqual(self.get('/api/v1/articles/')['X-Cache'], 'MISS')
+        key = RECORDED_KEY.format(self.article.id)
+        self.assertTrue(cache.touch(key, 0))
+        self.get(detail_url)
+        res = self.get('/api/v1/articles/')
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(res.data['results'][0]['views'], 3)
+
+    @override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        self.assertEqual(self.get('/api/v1/articles/')['X-Cache'], 'BYPASS')
+
+    def test_stats_endpoint_is_staff_only(self):
+        res = self.get('/api/v1/cache/stats/')
+        self.assertEqual(res.status_code, 401)
+        staff = User.objects.create_user(username='staff', email='s@example.com', password='pass', is_staff=True)
+        self.client.force_authenticate(staff)
+        res = self.get('/api/v1/cache/stats/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(set(res.data), {'hits', 'misses', 'hit_ratio'})
+
+    def test_normalize_params(self):
+        self.assertEqual(
+            normalize_params(QueryDict('b=2&a=3&a=1')),
+            normalize_params(QueryDict('a=1&b=2&a=3')),
+        )
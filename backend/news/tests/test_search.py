@@ -0,0 +1,92 @@
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from news.models import Article, Category, Tag
+from news.search import PostgresSearchBackend, SimpleSearchBackend, get_search_backend
+
+User = get_user_model()
+
+
+def result_ids(res):
+    return [x['id'] for x in res.data['results']]
+
+
+class SearchBackendSelectionTests(TestCase):
+    @override_settings(NEWS_SEARCH_BACKEND='simple')
+    def test_explicit_backend(self):
+        self.assertIsInstance(get_search_backend(), SimpleSearchBackend)
+
+    @override_settings(NEWS_SEARCH_BACKEND='news.search.PostgresSearchBackend')
+    def test_dotted_path_backend(self):
+        self.assertIsInstance(get_search_backend(), PostgresSearchBackend)
+
+
+class SimpleSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Tech')
+        self.tag = Tag.objects.create(name='ai')
+        self.a = Article.objects.create(title='Python news', content='Body', category=self.category, status='published')
+        self.b = Article.objects.create(title='Other', content='All about python', category=self.category, status='published')
+        self.c = Article.objects.create(title='Unrelated', content='Nothing', category=self.category, status='published')
+        self.a.tags.add(self.tag)
+
+    @override_settings(NEWS_SEARCH_BACKEND='simple')
+    def test_search_combines_with_tag_filter(self):
+        res = self.client.get('/api/v1/articles/?search=python')
+        self.assertEqual(sorted(result_ids(res)), sorted([self.a.id, self.b.id]))
+        self.assertEqual(res.data['count'], 2)
+        res = self.client.get(f'/api/v1/articles/?search=python&tags={self.tag.slug}')
+        self.assertEqual(result_ids(res), [self.a.id])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'PostgreSQL full-text search')
+class PostgresSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Tech')
+        self.tag = Tag.objects.create(name='sport')
+        self.in_title = Article.objects.create(
+            title='Новости футбола', content='Итоги матча', category=self.category, status='published'
+        )
+        self.in_content = Article.objects.create(
+            title='Обзор недели', content='Коротко о главном: новость про футбол и хоккей', category=self.category, status='published'
+        )
+        self.other = Article.objects.create(
+            title='Погода', content='Дожди и ветер', category=self.category, status='published'
+        )
+        self.in_content.tags.add(self.tag)
+
+    def test_vector_is_maintained_and_ranked_by_weight(self):
+        res = self.client.get('/api/v1/articles/', {'search': 'новость'})
+        self.assertEqual(result_ids(res), [self.in_title.id, self.in_content.id])
+
+        self.other.title = 'Футбольные новости'
+        self.other.save()
+        res = self.client.get('/api/v1/articles/', {'search': 'новости'})
+        self.assertIn(self.other.id, result_ids(res))
+
+    def test_websearch_syntax(self):
+        res = self.client.get('/api/v1/articles/', {'search': 'футбол -хоккей'})
+        self.assertEqual(result_ids(res), [self.in_title.id])
+        res = self.client.get('/api/v1/articles/', {'search': 'дожди or матч'})
+        self.assertEqual(sorted(result_ids(res)), sorted([self.in_title.id, self.other.id]))
+
+    def test_stop_words_only_fall_back_to_substring(self):
+        english = Article.objects.create(title='Pub', content='About AI', category=self.category, status='published')
+        res = self.client.get('/api/v1/articles/', {'search': 'About'})
+        self.assertEqual(result_ids(res), [english.id])
+
+    def test_filters_ordering_and_cursor_pagination(self):
+        res = self.client.get('/api/v1/articles/', {'search': 'футбол', 'tags': self.tag.slug})
+        self.assertEqual(result_ids(res), [self.in_content.id])
+        res = self.client.get('/api/v1/articles/', {'search': 'футбол', 'ordering': 'created_at'})
+        self.assertEqual(result_ids(res), [self.in_title.id, self.in_content.id])
+        res = self.client.get('/api/v1/articles/', {'search': 'футбол', 'pagination': 'cursor', 'page_size': 1})
+        self.assertEqual(result_ids(res), [self.in_title.id])
+        res = self.client.get(res.data['next'])
+        self.assertEqual(result_ids(res), [self.in_content.id])
+        self.assertIsNone(res.data['next'])
@@ -0,0 +1,214 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from news.models import Article, Category
+from news.search import get_search_backend
+from news.search_index import (
+    IndexSearcher, SearchIndex, SegmentIndexSearchBackend, decode_sorted_ints,
+    decode_varint, encode_sorted_ints, encode_varint, get_searcher, tokenize,
+)
+from news.tasks import index_articles, merge_search_index, remove_articles_from_index
+
+
+def doc(title='', excerpt='', content=''):
+    return {'title': title, 'excerpt': excerpt, 'content': content}
+
+
+class EncodingTests(SimpleTestCase):
+    def test_varint_roundtrip(self):
+        for value in (0, 1, 127, 128, 300, 2 ** 32, 2 ** 63):
+            buf = bytearray()
+            encode_varint(value, buf)
+            self.assertEqual(decode_varint(buf, 0), (value, len(buf)))
+
+    def test_sorted_ints_roundtrip(self):
+        values = [0, 3, 4, 1000, 100000]
+        self.assertEqual(decode_sorted_ints(encode_sorted_ints(values)), values)
+
+    def test_tokenize_normalizes_russian_forms(self):
+        self.assertEqual(set(tokenize('Новость')), set(tokenize('новости')))
+        self.assertEqual(list(tokenize('Ёлка и the Python')), list(tokenize('елка python')))
+
+
+class SegmentIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.index = SearchIndex(self.path)
+
+    def add(self, documents):
+        with self.index.writer() as writer:
+            writer.add_documents(documents)
+            writer.commit()
+
+    def search(self, query):
+        return [article_id for article_id, _ in IndexSearcher(self.index).search(query)]
+
+    def test_ranks_title_matches_first(self):
+        self.add([
+            (1, doc('Обзор недели', content='новость про футбол')),
+            (2, doc('Новости футбола', content='Итоги матча')),
+            (3, doc('Погода', content='Дожди')),
+        ])
+        self.assertEqual(self.search('футбол'), [2, 1])
+        searcher = IndexSearcher(self.index)
+        self.assertEqual(list(searcher.iter_search('футбол')), searcher.search('футбол'))
+
+    def test_requires_all_terms(self):
+        self.add([(1, doc('python django')), (2, doc('python flask'))])
+        self.assertEqual(self.search('python django'), [1])
+        self.assertEqual(self.search('python rails'), [])
+        self.assertEqual(self.search('the'), [])
+
+    def test_update_and_delete(self):
+        self.add([(1, doc('python')), (2, doc('python'))])
+        self.add([(1, doc('django'))])
+        self.assertEqual(self.search('python'), [2])
+        self.assertEqual(self.search('django'), [1])
+
+        with self.index.writer() as writer:
+            writer.delete_documents([2])
+            writer.commit()
+        self.assertEqual(self.search('python'), [])
+
+    def test_merge_preserves_results_and_drops_deleted(self):
+        for article_id in range(1, 13):
+            self.add([(article_id, doc(f'python item{article_id}', content='django' if article_id % 2 else ''))])
+        with self.index.writer() as writer:
+            writer.delete_documents([5])
+            writer.commit()
+        before = sorted(self.search('python django'))
+
+        with self.index.writer() as writer:
+            writer.maybe_merge(merge_factor=10)
+            writer.commit()
+        manifest = self.index.read_manifest()
+        self.assertLess(len(manifest['segments']), 12)
+        self.assertEqual(sorted(self.search('python django')), before)
+
+        with self.index.writer() as writer:
+            writer.merge_all()
+            writer.commit()
+        manifest = self.index.read_manifest()
+        self.assertEqual(len(manifest['segments']), 1)
+        self.assertEqual(manifest['segments'][0]['doc_count'], 11)
+        self.assertEqual(sorted(self.search('python django')), before)
+        # Only files referenced by the manifest are left on disk
+        self.assertEqual(
+            sorted(os.listdir(self.path)),
+            sorted(['manifest.json', 'write.lock', manifest['segments'][0]['name'] + '.seg'])
+        )
+
+    def test_commit_only_removes_index_files(self):
+        unrelated = ['notes.txt', 'seg_backup.seg', 'seg_00000001.seg.bak', 'report.del']
+        for name in unrelated:
+            with open(os.path.join(self.path, name), 'w') as fh:
+                fh.write('keep')
+        self.add([(1, doc('python'))])
+        self.add([(2, doc('python'))])
+        with self.index.writer() as writer:
+            writer.merge_all()
+            writer.commit()
+        segment = self.index.read_manifest()['segments'][0]['name'] + '.seg'
+        self.assertEqual(
+            sorted(os.listdir(self.path)), sorted(['manifest.json', 'write.lock', segment, *unrelated])
+        )
+
+    def test_searcher_reopens_after_commit(self):
+        self.add([(1, doc('python'))])
+        first = get_searcher(self.index)
+        self.assertIs(get_searcher(self.index), first)
+        self.add([(2, doc('python'))])
+        self.assertEqual(sorted(a for a, _ in get_searcher(self.index).search('python')), [1, 2])
+
+    def test_empty_index(self):
+        self.assertEqual(self.search('python'), [])
+
+
+class SegmentSearchBackendTests(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        settings_override = override_settings(NEWS_SEARCH_BACKEND='segment', NEWS_SEARCH_INDEX_DIR=self.path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Tech')
+        with mock.patch('news.tasks.index_articles.delay'):
+            self.in_title = Article.objects.create(
+                title='Новости футбола', content='Итоги матча', category=self.category, status='published'
+            )
+            self.in_content = Article.objects.create(
+                title='Обзор недели', content='Новость про футбол', category=self.category, status='published'
+            )
+            self.draft = Article.objects.create(
+                title='Футбол', content='Черновик', category=self.category, status='draft'
+            )
+        index_articles([self.in_title.id, self.in_content.id, self.draft.id])
+
+    def test_backend_selected_by_name(self):
+        self.assertIsInstance(get_search_backend(), SegmentIndexSearchBackend)
+
+    def test_ranked_search_respects_queryset_filters(self):
+        res = self.client.get('/api/v1/articles/', {'search': 'футбол'})
+        self.assertEqual([x['id'] for x in res.data['results']], [self.in_title.id, self.in_content.id])
+
+        remove_articles_from_index([self.in_title.id])
+        res = self.client.get('/api/v1/articles/', {'search': 'футбол'})
+        self.assertEqual([x['id'] for x in res.data['results']], [self.in_content.id])
+
+    def test_hit_limit_applies_after_filters(self):
+        sport = Category.objects.create(name='Sport')
+        with mock.patch('news.tasks.index_articles.delay'):
+            other = Article.objects.create(
+                title='Обзор', content='Немного о футболе и погоде за неделю', category=sport, status='published'
+            )
+        index_articles([other.id])
+        self.assertNotEqual(get_searcher().search('футбол', limit=1)[0][0], other.id)
+
+        with override_settings(NEWS_SEARCH_INDEX_MAX_HITS=1):
+            res = self.client.get('/api/v1/articles/', {'search': 'футбол', 'category__slug': sport.slug})
+            self.assertEqual([x['id'] for x in res.data['results']], [other.id])
+            res = self.client.get('/api/v1/articles/', {'search': 'футбол'})
+            self.assertEqual([x['id'] for x in res.data['results']], [self.in_title.id])
+
+    def test_article_changes_are_queued_after_commit(self):
+        with mock.patch('news.tasks.index_articles.delay') as index_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.in_content.title = 'Хоккей'
+                self.in_content.save()
+        index_delay.assert_called_once_with([self.in_content.id])
+
+        with mock.patch('news.tasks.remove_articles_from_index.delay') as remove_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                article_id = self.draft.id
+                self.draft.delete()
+        remove_delay.assert_called_once_with([article_id])
+
+    def test_broker_errors_do_not_fail_writes(self):
+        broken = mock.patch.multiple(
+            'news.tasks',
+            index_articles=mock.Mock(**{'delay.side_effect': OSError('broker down')}),
+            remove_articles_from_index=mock.Mock(**{'delay.side_effect': OSError('broker down')}),
+        )
+        with broken, self.assertLogs(level='ERROR') as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.in_content.title = 'Хоккей'
+                self.in_content.save()
+                self.draft.delete()
+        self.assertEqual(len(logs.records), 2)
+
+    @override_settings(NEWS_SEARCH_BACKEND='simple')
+    def test_signals_inactive_for_other_backends(self):
+        with mock.patch('news.tasks.index_articles.delay') as index_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.in_content.save()
+        index_delay.assert_not_called()
+
+    def test_merge_task(self):
+        merge_search_index()
+        self.assertEqual(len(SearchIndex(self.path).read_manifest()['segments']), 1)
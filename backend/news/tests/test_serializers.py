@@ -1,4 +1,5 @@
 from django.test import TestCase
+from django.core.cache import cache
 from rest_framework.test import APIRequestFactory
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
@@ -11,6 +12,7 @@ from news.serializers import (
     ReactionSerializer,
     BookmarkSerializer,
 )
+from news.view_counter import flush_views
 
 User = get_user_model()
 
@@ -25,6 +27,7 @@ class NewsSerializersTests(TestCase):
         self.tag2 = Tag.objects.create(name='ML')
 
     def test_article_list_and_detail_counts(self):
+        cache.clear()
         a = Article.objects.create(title='T', content='C', category=self.category, author=self.reader, status='published')
         a.tags.add(self.tag1, self.tag2)
         req = self.factory.get('/')
@@ -32,7 +35,8 @@ class NewsSerializersTests(TestCase):
         self.assertEqual(data['likes_count'], 0)
         self.assertEqual(data['dislikes_count'], 0)
         dser = ArticleDetailSerializer(a, context={'request': req})
-        _ = dser.data
+        self.assertEqual(dser.data['views'], 1)
+        flush_views()
         a.refresh_from_db()
         self.assertEqual(a.views, 1)
 
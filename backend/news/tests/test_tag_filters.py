@@ -0,0 +1,45 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from news.models import Article, Tag
+
+
+@override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=0)
+class TagFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.ai, self.ml, self.gpu = (Tag.objects.create(name=name) for name in ('ai', 'ml', 'gpu'))
+        self.articles = {}
+        for title, tags in (('both', [self.ai, self.ml]), ('ai', [self.ai]), ('all', [self.ai, self.ml, self.gpu]),
+                            ('none', [])):
+            article = Article.objects.create(title=title, content='Body', status='published')
+            article.tags.set(tags)
+            self.articles[title] = article
+
+    def titles(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/api/v1/articles/', params)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['count'], len(res.data['results']))
+        self.assertFalse(any('DISTINCT' in query['sql'] for query in ctx.captured_queries))
+        return sorted(item['title'] for item in res.data['results'])
+
+    def test_any_mode(self):
+        self.assertEqual(self.titles(tags='ai,ml'), ['ai', 'all', 'both'])
+        self.assertEqual(self.titles(tags='ml,gpu', tag_mode='any'), ['all', 'both'])
+        self.assertEqual(self.titles(tags='missing'), [])
+
+    def test_all_mode(self):
+        self.assertEqual(self.titles(tags='ai,ml', tag_mode='all'), ['all', 'both'])
+        self.assertEqual(self.titles(tags='ai,ml,gpu', tag_mode='all'), ['all'])
+        self.assertEqual(self.titles(tags='ai,ai', tag_mode='all'), ['ai', 'all', 'both'])
+        self.assertEqual(self.titles(tags='ai,missing', tag_mode='all'), [])
+
+    def test_cursor_pagination(self):
+        res = self.client.get('/api/v1/articles/', {'tags': 'ai', 'pagination': 'cursor', 'page_size': 2})
+        seen = [item['id'] for item in res.data['results']]
+        seen += [item['id'] for item in self.client.get(res.data['next']).data['results']]
+        self.assertEqual(sorted(seen), sorted(self.articles[t].id for t in ('both', 'ai', 'all')))
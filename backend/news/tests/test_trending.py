@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from news.models import Article, Category, Comment, Reaction, TrendingScore
+from news.tasks import compute_trending_scores
+from news.trending import compute_trending, decay, top_n
+
+User = get_user_model()
+
+
+class TrendingMathTests(SimpleTestCase):
+    def test_decay_halves_per_half_life(self):
+        np.testing.assert_allclose(decay(np.array([0.0, 12.0, 24.0, -5.0]), 12.0), [1.0, 0.5, 0.25, 1.0])
+
+    def test_top_n_orders_best_first_with_stable_ties(self):
+        scores = np.array([1.0, 5.0, 3.0, 5.0, 0.5])
+        self.assertEqual(top_n(scores, 3).tolist(), [1, 3, 2])
+        self.assertEqual(top_n(scores, 10).tolist(), [1, 3, 2, 0, 4])
+
+
+@override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=0, NEWS_TRENDING_TOP_N=10)
+class TrendingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.users = [
+            User.objects.create_user(username=f'user{i}', email=f'u{i}@example.com', password='pass')
+            for i in range(3)
+        ]
+        self.tech = Category.objects.create(name='Tech')
+        self.sport = Category.objects.create(name='Sport')
+        now = timezone.now()
+
+        def article(title, category, hours_ago, views=0, status='published'):
+            return Article.objects.create(
+                title=title, content='Body', category=category, status=status, views=views,
+                published_at=now - timedelta(hours=hours_ago),
+            )
+
+        self.hot = article('Hot', self.tech, 2, views=50)
+        self.old = article('Old', self.tech, 200, views=10000)
+        self.stale = article('Stale', self.tech, 48, views=50)
+        self.discussed = article('Discussed', self.sport, 3)
+        self.plain = article('Plain', None, 1, views=5)
+        for user in self.users:
+            Reaction.objects.create(article=self.hot, user=user, value=Reaction.LIKE)
+            Comment.objects.create(article=self.discussed, author=user, content='!')
+        Reaction.objects.create(article=self.stale, user=self.users[0], value=Reaction.DISLIKE)
+
+    def test_scores_rank_globally_and_per_category(self):
+        self.assertEqual(compute_trending_scores(), 7)
+        global_rows = TrendingScore.objects.filter(category__isnull=True).order_by('rank')
+        self.assertEqual(
+            [row.article_id for row in global_rows],
+            [self.hot.id, self.discussed.id, self.plain.id, self.stale.id],
+        )
+        self.assertEqual(
+            list(TrendingScore.objects.filter(category=self.tech).values_list('article_id', flat=True)),
+            [self.hot.id, self.stale.id],
+        )
+        # Outside the window
+        self.assertFalse(TrendingScore.objects.filter(article=self.old).exists())
+
+    def test_recompute_replaces_rows_and_respects_top_n(self):
+        compute_trending()
+        with override_settings(NEWS_TRENDING_TOP_N=1):
+            compute_trending()
+        self.assertEqual(TrendingScore.objects.count(), 3)
+        self.assertEqual(TrendingScore.objects.get(category__isnull=True).article_id, self.hot.id)
+
+    def test_endpoint_reads_precomputed_rows(self):
+        compute_trending()
+        self.stale.status = 'draft'
+        self.stale.save()
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/api/v1/articles/trending/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([item['title'] for item in res.data], ['Hot', 'Discussed', 'Plain'])
+        # Ranking, articles and tags (the articles have no authors)
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+        res = self.client.get('/api/v1/articles/trending/', {'category': self.tech.slug, 'limit': 1})
+        self.assertEqual([item['title'] for item in res.data], ['Hot'])
+        self.assertEqual(self.client.get('/api/v1/articles/trending/', {'category': 'missing'}).data, [])
+
+    def test_endpoint_matches_serializer_output(self):
+        compute_trending()
+        res = self.client.get('/api/v1/articles/trending/')
+        with override_settings(NEWS_ARTICLE_LIST_FAST_PATH=False):
+            self.assertEqual(self.client.get('/api/v1/articles/trending/').content, res.content)
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from news.models import Article, Bookmark, Reaction
+
+User = get_user_model()
+
+
+@override_settings(NEWS_RESPONSE_CACHE_TIMEOUT=0)
+class ViewerStateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', email='a@example.com', password='pass')
+        self.reader = User.objects.create_user(username='reader', email='r@example.com', password='pass')
+        self.articles = [
+            Article.objects.create(title=f'Article {i}', content='Body', author=self.author, status='published')
+            for i in range(3)
+        ]
+        first, second, _ = self.articles
+        Reaction.objects.create(article=first, user=self.reader, value=Reaction.LIKE)
+        Reaction.objects.create(article=second, user=self.reader, value=Reaction.DISLIKE)
+        Reaction.objects.create(article=second, user=self.author, value=Reaction.LIKE)
+        Bookmark.objects.create(article=second, user=self.reader)
+        Bookmark.objects.create(article=first, user=self.author)
+
+    def expected(self):
+        first, second, third = self.articles
+        return {
+            first.pk: {'my_reaction': Reaction.LIKE, 'is_bookmarked': False},
+            second.pk: {'my_reaction': Reaction.DISLIKE, 'is_bookmarked': True},
+            third.pk: {'my_reaction': None, 'is_bookmarked': False},
+        }
+
+    def test_batch_endpoint_uses_two_queries(self):
+        self.client.force_authenticate(self.reader)
+        ids = ','.join(str(article.pk) for article in self.articles)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/articles/viewer_state/', {'ids': ids + ',999999'})
+        self.assertEqual(response.status_code, 200)
+        expected = {str(pk): state for pk, state in self.expected().items()}
+        expected['999999'] = {'my_reaction': None, 'is_bookmarked': False}
+        self.assertEqual(response.json(), expected)
+
+    def test_batch_endpoint_validates_ids(self):
+        url = '/api/v1/articles/viewer_state/'
+        self.assertEqual(self.client.get(url, {'ids': '1'}).status_code, 401)
+        self.client.force_authenticate(self.reader)
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'ids': '1,abc'}).status_code, 400)
+        with override_settings(NEWS_VIEWER_STATE_MAX_IDS=2):
+            self.assertEqual(self.client.get(url, {'ids': '1,2,3'}).status_code, 400)
+            self.assertEqual(self.client.get(url, {'ids': '1,2,2,1'}).status_code, 200)
+
+    def test_list_is_annotated_on_request(self):
+        self.client.force_authenticate(self.reader)
+        expected = self.expected()
+        for fast_path in (True, False):
+            with override_settings(NEWS_ARTICLE_LIST_FAST_PATH=fast_path):
+                results = self.client.get('/api/v1/articles/', {'with_viewer_state': '1'}).json()['results']
+                self.assertEqual(
+                    {item['id']: {key: item[key] for key in ('my_reaction', 'is_bookmarked')} for item in results},
+                    expected,
+                )
+                plain = self.client.get('/api/v1/articles/').json()['results'][0]
+                self.assertNotIn('is_bookmarked', plain)
+
+        results = self.client.get(
+            '/api/v1/articles/', {'with_viewer_state': 'true', 'fields': 'id,is_bookmarked'}
+        ).json()['results']
+        self.assertEqual(
+            {item['id']: item for item in results},
+            {pk: {'id': pk, 'is_bookmarked': state['is_bookmarked']} for pk, state in expected.items()},
+        )
+
+    def test_anonymous_list_gets_empty_state(self):
+        results = self.client.get('/api/v1/articles/', {'with_viewer_state': '1'}).json()['results']
+        self.assertEqual(len(results), 3)
+        for item in results:
+            self.assertIsNone(item['my_reaction'])
+            self.assertIs(item['is_bookmarked'], False)
+
+    def test_viewer_changes_move_the_etag(self):
+        self.client.force_authenticate(self.reader)
+        params = {'with_viewer_state': '1'}
+        etag = self.client.get('/api/v1/articles/', params)['ETag']
+        self.assertEqual(self.client.get('/api/v1/articles/', params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Bookmark.objects.create(article=self.articles[2], user=self.reader)
+        response = self.client.get('/api/v1/articles/', params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        Reaction.objects.filter(article=self.articles[0], user=self.reader).update(value=Reaction.DISLIKE)
+        self.assertEqual(self.client.get('/api/v1/articles/', params, HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -1,10 +1,14 @@
 from django.test import TestCase
 from django.urls import reverse
+from django.core.cache import cache
+from django.db import connection
 from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from news.models import Article, Category, Tag, Comment, Reaction
+from news.view_counter import flush_views
 
 User = get_user_model()
 
@@ -100,11 +104,21 @@ class ArticleViewSetTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
 
     def test_article_detail_increments_views(self):
+        cache.clear()
         start = self.pub.views
         res = self.client.get(f'/api/v1/articles/{self.pub.id}/')
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # buffered view is visible immediately and written on flush
+        self.assertEqual(res.data['views'], start + 1)
+        res = self.client.get('/api/v1/articles/')
+        self.assertEqual(res.data['results'][0]['views'], start + 1)
+        self.pub.refresh_from_db()
+        self.assertEqual(self.pub.views, start)
+        self.assertEqual(flush_views(), 1)
         self.pub.refresh_from_db()
         self.assertEqual(self.pub.views, start + 1)
+        res = self.client.get(f'/api/v1/articles/{self.pub.id}/')
+        self.assertEqual(res.data['views'], start + 2)
 
 
 class CommentReactionBookmarkViewTests(TestCase):
@@ -152,6 +166,25 @@ class CommentReactionBookmarkViewTests(TestCase):
         self.assertEqual(res3.status_code, status.HTTP_200_OK)
         self.assertEqual(len(res3.data), 1)  # only top-level
 
+    def test_comment_tree_is_loaded_at_once(self):
+        root = Comment.objects.create(article=self.article, author=self.reader, content='Root')
+        parent = root
+        for depth in range(5):
+            parent = Comment.objects.create(article=self.article, author=self.moderator, content=f'D{depth}', parent=parent)
+        hidden = Comment.objects.create(article=self.article, author=self.reader, content='Hidden', parent=root, is_active=False)
+        Comment.objects.create(article=self.article, author=self.reader, content='Under hidden', parent=hidden)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(f'/api/v1/articles/{self.article.id}/comments/')
+        # Validators, top-level comments, replies
+        self.assertEqual(len(ctx.captured_queries), 3)
+        node, depth = res.data[0], 0
+        self.assertEqual([reply['content'] for reply in node['replies']], ['D0'])
+        while node['replies']:
+            node, depth = node['replies'][0], depth + 1
+        self.assertEqual((node['content'], depth), ('D4', 5))
+        self.assertTrue(node['author']['can_manage_articles'])
+
     def test_reactions_and_my_reaction(self):
         self.client.force_authenticate(user=self.reader)
         res = self.client.post(f'/api/v1/articles/{self.article.id}/reactions/', {'value': 1}, format='json')
@@ -214,3 +247,42 @@ class TagCategoryPermissionsTests(TestCase):
         self.client.force_authenticate(user=self.staff)
         res2 = self.client.post('/api/v1/categories/', {'name': 'NewC2'}, format='json')
         self.assertIn(res2.status_code, [status.HTTP_201_CREATED, status.HTTP_200_OK])
+
+
+class ArticleFeedQueryCountTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='author', email='a@example.com', password='pass')
+        self.reader = User.objects.create_user(username='reader', email='r@example.com', password='pass')
+        self.category = Category.objects.create(name='Tech')
+        self.tags = [Tag.objects.create(name=f'tag{i}') for i in range(3)]
+
+    def _create_articles(self, count):
+        for i in range(count):
+            article = Article.objects.create(
+                title=f'Article {i}', content='Body', category=self.category,
+                author=self.author, status='published'
+            )
+            article.tags.add(*self.tags)
+            Comment.objects.create(article=article, author=self.reader, content='Hi')
+            Reaction.objects.create(article=article, user=self.reader, value=Reaction.LIKE)
+
+    def _list_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/api/v1/articles/')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), res.data['results']
+
+    def test_list_query_count_does_not_depend_on_page_size(self):
+        self._create_articles(2)
+        small_count, _ = self._list_queries()
+        self._create_articles(10)
+        large_count, results = self._list_queries()
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(len(results), 12)
+        first = results[0]
+        self.assertEqual(first['comment_count'], 1)
+        self.assertEqual(first['likes_count'], 1)
+        self.assertEqual(first['dislikes_count'], 0)
+        self.assertEqual(first['reaction_summary'], {'likes': 1, 'dislikes': 0})
+        self.assertEqual(len(first['tags']), 3)
@@ -0,0 +1,159 @@
+"""
+Trending articles.
+
+`compute_trending` (run periodically by Celery beat) scores every article
+published within the last `NEWS_TRENDING_WINDOW_HOURS` and stores the top
+`NEWS_TRENDING_TOP_N` globally and per category in `TrendingScore`, so the
+`/articles/trending/` endpoint only reads a few precomputed rows.
+
+Each signal decays exponentially with its age (half-life
+`NEWS_TRENDING_HALF_LIFE_HOURS`):
+
+* views have no timestamps, so ``log1p(views)`` decays with the article age;
+* likes, dislikes and active comments in the window decay with their own age.
+
+The scoring runs as vectorized NumPy operations over the window rows.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import view_counter
+from .models import Article, Comment, Reaction, TrendingScore
+
+VIEW_WEIGHT = 1.0
+LIKE_WEIGHT = 3.0
+DISLIKE_WEIGHT = -2.0
+COMMENT_WEIGHT = 4.0
+NO_CATEGORY = -1
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _epoch(values):
+    return np.fromiter((value.timestamp() for value in values), dtype=np.float64, count=len(values))
+
+
+def decay(ages, half_life):
+    """Exponential decay factors for `ages` in hours."""
+    return np.exp2(-np.maximum(ages, 0.0) / half_life)
+
+
+def _event_scores(index_of, article_ids, timestamps, weights, now, half_life):
+    """Sum decayed `weights` per article; events of unknown articles are dropped."""
+    positions = index_of(article_ids)
+    known = positions >= 0
+    decayed = weights[known] * decay((now - timestamps[known]) / 3600.0, half_life)
+    return np.bincount(positions[known], weights=decayed, minlength=index_of.size)
+
+
+class _Index:
+    """Maps article ids to positions in the (sorted) id array."""
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.size = len(ids)
+
+    def __call__(self, article_ids):
+        positions = np.minimum(np.searchsorted(self.ids, article_ids), self.size - 1)
+        return np.where(self.ids[positions] == article_ids, positions, -1)
+
+
+def compute_scores(now=None):
+    """
+    Return (article ids, category ids, scores) for articles published in
+    the window; articles without a category get `NO_CATEGORY`.
+    """
+    now = now or timezone.now()
+    half_life = float(_setting('NEWS_TRENDING_HALF_LIFE_HOURS', 12))
+    since = now - timedelta(hours=_setting('NEWS_TRENDING_WINDOW_HOURS', 72))
+    now_ts = now.timestamp()
+
+    articles = list(
+        Article.objects.filter(status='published', published_at__gte=since, published_at__lte=now)
+        .order_by('pk').values_list('pk', 'category_id', 'views', 'published_at')
+    )
+    if not articles:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+
+    pks, category_ids, views, published = zip(*articles)
+    ids = np.array(pks, dtype=np.int64)
+    index_of = _Index(ids)
+    pending = view_counter.pending_views(list(pks))
+    views = np.array(views, dtype=np.float64) + np.fromiter(
+        (pending.get(pk, 0) for pk in pks), dtype=np.float64, count=len(pks)
+    )
+    ages = (now_ts - _epoch(published)) / 3600.0
+    scores = VIEW_WEIGHT * np.log1p(views) * decay(ages, half_life)
+
+    window = {'article__status': 'published', 'article__published_at__gte': since, 'created_at__gte': since}
+    reactions = list(Reaction.objects.filter(**window).values_list('article_id', 'value', 'created_at'))
+    if reactions:
+        article_ids, values, created = zip(*reactions)
+        values = np.array(values)
+        weights = np.where(values == Reaction.LIKE, LIKE_WEIGHT, DISLIKE_WEIGHT)
+        scores += _event_scores(index_of, np.array(article_ids), _epoch(created), weights, now_ts, half_life)
+
+    comments = list(Comment.objects.filter(is_active=True, **window).values_list('article_id', 'created_at'))
+    if comments:
+        article_ids, created = zip(*comments)
+        weights = np.full(len(article_ids), COMMENT_WEIGHT)
+        scores += _event_scores(index_of, np.array(article_ids), _epoch(created), weights, now_ts, half_life)
+
+    categories = np.array([NO_CATEGORY if pk is None else pk for pk in category_ids], dtype=np.int64)
+    return ids, categories, scores
+
+
+def top_n(scores, n):
+    """Positions of the `n` highest scores, best first (ties: lower position)."""
+    if len(scores) > n:
+        candidates = np.argpartition(-scores, n - 1)[:n]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+@transaction.atomic
+def compute_trending(now=None):
+    """Recompute `TrendingScore`; returns the number of stored rows."""
+    now = now or timezone.now()
+    limit = _setting('NEWS_TRENDING_TOP_N', 100)
+    ids, categories, scores = compute_scores(now)
+
+    rows = []
+
+    def add(positions, category_id):
+        rows.extend(
+            TrendingScore(
+                article_id=int(ids[position]), category_id=category_id,
+                rank=rank, score=float(scores[position]), computed_at=now,
+            )
+            for rank, position in enumerate(positions, start=1)
+        )
+
+    add(top_n(scores, limit), None)
+    for category_id in np.unique(categories):
+        if category_id == NO_CATEGORY:
+            continue
+        members = np.flatnonzero(categories == category_id)
+        add(members[top_n(scores[members], limit)], int(category_id))
+
+    TrendingScore.objects.all().delete()
+    TrendingScore.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def trending_article_ids(category=None, limit=None):
+    """Ids of the top trending articles, globally or within `category`."""
+    limit = limit or _setting('NEWS_TRENDING_TOP_N', 100)
+    if category is None:
+        queryset = TrendingScore.objects.filter(category__isnull=True)
+    else:
+        queryset = TrendingScore.objects.filter(category=category)
+    return list(queryset.order_by('rank').values_list('article_id', flat=True)[:limit])
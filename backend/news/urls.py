@@ -44,6 +44,10 @@ urlpatterns = [
     path('', include(router.urls)),
     path('', include(article_router.urls)),
     path('', include(user_router.urls)),
+    path('cache/stats/', views.ResponseCacheStatsView.as_view(), name='response-cache-stats'),
+    path('profiles/<str:profile_id>/', views.RequestProfileView.as_view(), name='request-profile'),
+    path('profiles/<str:profile_id>/speedscope/', views.RequestProfileSpeedscopeView.as_view(),
+         name='request-profile-speedscope'),
     
     # Authentication URLs
     path('auth/', include(auth_patterns)),
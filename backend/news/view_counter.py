@@ -0,0 +1,138 @@
+"""
+Write-behind buffer for article view counts.
+
+Article retrieves only increment a counter in the shared cache. Article ids
+with pending views are registered in a "dirty" set, and `flush_views` (run
+periodically by Celery beat) moves the accumulated deltas into the database
+with a handful of `UPDATE ... SET views = views + n` statements. Readers add
+the pending delta to the stored value.
+
+The dirty set is a single cache entry; adding ids and taking the whole set
+happen under a short-lived lock, so an article registered while a flush runs
+is never lost. Ids whose views could not be written are registered again.
+
+A separate, never-decremented per-article total lets cached responses catch
+up with views recorded after they were stored (see `news.response_cache`).
+It only has to outlive those responses: flushes keep the totals of viewed
+articles alive, and an article nobody viewed for `RECORDED_TIMEOUT` seconds
+loses its total and starts again from zero.
+"""
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import transaction
+
+from . import counters
+
+PENDING_KEY = 'news:views:pending:{}'
+RECORDED_KEY = 'news:views:recorded:{}'
+DIRTY_KEY = 'news:views:dirty'
+DIRTY_LOCK_KEY = 'news:views:dirty-lock'
+# Only held for one get and set; expires in case its holder died
+DIRTY_LOCK_TIMEOUT = 5
+FLUSH_LOCK_KEY = 'news:views:flush-lock'
+FLUSH_LOCK_TIMEOUT = 60
+# Idle lifetime of a recorded total; far longer than any cached response
+RECORDED_TIMEOUT = 24 * 60 * 60
+
+
+def _incr(key, delta=1, timeout=None):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, timeout=timeout):
+            return delta
+        return cache.incr(key, delta)
+
+
+@contextmanager
+def _dirty_lock():
+    while not cache.add(DIRTY_LOCK_KEY, 1, timeout=DIRTY_LOCK_TIMEOUT):
+        time.sleep(0.001)
+    try:
+        yield
+    finally:
+        cache.delete(DIRTY_LOCK_KEY)
+
+
+def _mark_dirty(*article_ids):
+    with _dirty_lock():
+        dirty = cache.get(DIRTY_KEY) or set()
+        dirty.update(article_ids)
+        cache.set(DIRTY_KEY, dirty, timeout=None)
+
+
+def record_view(article_id):
+    """Buffer a single view of the article."""
+    _incr(RECORDED_KEY.format(article_id), timeout=RECORDED_TIMEOUT)
+    # Register the article only when its buffer goes from empty to non-empty
+    if _incr(PENDING_KEY.format(article_id)) == 1:
+        _mark_dirty(article_id)
+
+
+def pending_views(article_ids):
+    """Return {article_id: buffered views} for the given articles."""
+    keys = {PENDING_KEY.format(pk): pk for pk in article_ids}
+    if not keys:
+        return {}
+    values = cache.get_many(list(keys))
+    return {keys[key]: value for key, value in values.items() if value}
+
+
+def recorded_views(article_ids):
+    """
+    Return {article_id: views recorded so far} (cache-only; monotonic until
+    the total expires and restarts).
+    """
+    keys = {RECORDED_KEY.format(pk): pk for pk in article_ids}
+    if not keys:
+        return {}
+    values = cache.get_many(list(keys))
+    return {pk: values.get(key, 0) for key, pk in keys.items()}
+
+
+def _take_dirty_article_ids():
+    with _dirty_lock():
+        dirty = cache.get(DIRTY_KEY) or set()
+        cache.delete(DIRTY_KEY)
+    return dirty
+
+
+def flush_views():
+    """
+    Move buffered views into Article.views (or its counter shards, see
+    news.counters).
+
+    Articles with the same pending delta are updated by one statement, so a
+    flush costs one UPDATE per distinct delta rather than one per article.
+    Returns the number of views written.
+    """
+    if not cache.add(FLUSH_LOCK_KEY, 1, timeout=FLUSH_LOCK_TIMEOUT):
+        return 0
+    try:
+        pending = pending_views(_take_dirty_article_ids())
+        try:
+            with transaction.atomic():
+                counters.apply_view_deltas(pending)
+        except Exception:
+            # Nothing was written, keep the articles for the next flush
+            if pending:
+                _mark_dirty(*pending)
+            raise
+
+        # Subtract what was written; views recorded meanwhile stay buffered
+        still_pending = []
+        for article_id, delta in pending.items():
+            try:
+                remaining = cache.decr(PENDING_KEY.format(article_id), delta)
+            except ValueError:
+                continue
+            if remaining > 0:
+                still_pending.append(article_id)
+            cache.touch(RECORDED_KEY.format(article_id), RECORDED_TIMEOUT)
+        if still_pending:
+            _mark_dirty(*still_pending)
+        return sum(pending.values())
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
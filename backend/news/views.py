@@ -1,14 +1,36 @@
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
-from django.db.models import Q, Count
+from rest_framework.views import APIView
+from django.db.models import Q, Count, F, Sum
+from django.http import HttpResponse
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+import orjson
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import Article, Category, Tag, Comment, Reaction, Bookmark
+from .search import ArticleSearchFilter
+from .response_cache import (
+    ARTICLE_SCOPE, ARTICLES_SCOPE, GLOBAL_SCOPE, AnonymousResponseCacheMixin, get_stats,
+)
+from .conditional import ConditionalGetMixin
+from .fieldsets import SparseFieldsetViewMixin
+from .fast_list import FastArticleListMixin, article_rows, serialize_articles
+from .comment_tree import build_thread, iter_subtree
+from .related import related_article_ids
+from .trending import trending_article_ids
+from . import counters, view_counter
+from .reactions import clear_reaction, toggle_reaction
+from .pagination import (
+    ArticleCursorPagination, CommentCursorPagination, CommentThreadPagination, SelectablePaginationMixin
+)
 from .serializers import (
     ArticleListSerializer, ArticleDetailSerializer, ArticleCreateUpdateSerializer,
-    CategorySerializer, TagSerializer, CommentSerializer,
-    ReactionSerializer, BookmarkSerializer, UserSerializer
+    CategorySerializer, TagSerializer, CommentSerializer, CommentThreadSerializer, FlatCommentSerializer,
+    ReactionSerializer, BookmarkSerializer, UserSerializer, nest_comment_data
 )
 from django.contrib.auth import get_user_model
 from accounts.permissions import (
@@ -16,6 +38,7 @@ from accounts.permissions import (
     IsAdmin, CanModerateContent
 )
 from accounts.utils import log_user_activity
+from pulse_news.profiling import load_profile
 
 User = get_user_model()
 
@@ -31,14 +54,22 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
         # Write permissions are only allowed to the author or admin
         return obj.author == request.user or request.user.is_staff
 
-class ArticleViewSet(viewsets.ModelViewSet):
+class ArticleViewSet(ConditionalGetMixin, AnonymousResponseCacheMixin, SparseFieldsetViewMixin,
+                     SelectablePaginationMixin, FastArticleListMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows articles to be viewed or edited.
+    Supports `?pagination=cursor` for keyset pagination (infinite scroll)
+    and `?fields=`/`?expand=` sparse fieldsets. Full lists bypass the
+    serializer (see news.fast_list).
+    List and detail responses for anonymous users are cached; all reads
+    support conditional requests (ETag / Last-Modified).
+    `?with_viewer_state=1` adds the current user's `my_reaction` and
+    `is_bookmarked` to every listed article.
     """
     queryset = Article.objects.all().order_by('-published_at', '-created_at')
     permission_classes = [CanManageArticles]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend, filters.OrderingFilter]
-    search_fields = ['title', 'content', 'excerpt']
+    # Search runs last so relevance ordering can replace the default ordering
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ArticleSearchFilter]
     filterset_fields = {
         'category__slug': ['exact'],
         'tags__slug': ['exact'],
@@ -48,9 +79,13 @@ class ArticleViewSet(viewsets.ModelViewSet):
     }
     ordering_fields = ['published_at', 'views', 'created_at', 'updated_at']
     ordering = ['-published_at', '-created_at']
+    cursor_pagination_class = ArticleCursorPagination
+    fast_list_serializer_class = ArticleListSerializer
+    # Counters are updated without touching updated_at
+    validator_fields = ('likes_count', 'dislikes_count', 'active_comment_count')
 
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ('list', 'trending', 'related'):
             return ArticleListSerializer
         elif self.action == 'retrieve':
             return ArticleDetailSerializer
@@ -59,6 +94,12 @@ class ArticleViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = super().get_queryset()
         
+        # Load related objects in bulk for read endpoints
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.with_feed_data()
+        if self.with_viewer_state():
+            queryset = queryset.with_viewer_state(self.request.user)
+        
         # Check if status filter is explicitly provided
         status_filter = self.request.query_params.get('status', None)
         
@@ -86,24 +127,62 @@ class ArticleViewSet(viewsets.ModelViewSet):
             else:
                 queryset = queryset.filter(status='published')
         
-        # Filter by multiple tags (comma-separated)
+        # Filter by multiple tags (comma-separated); `tag_mode=all` requires
+        # every tag, the default `any` at least one
         tags = self.request.query_params.get('tags', None)
         if tags:
             tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
             if tag_list:
-                queryset = queryset.filter(tags__slug__in=tag_list).distinct()
-        
-        # Full-text search with ranking
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(content__icontains=search) |
-                Q(excerpt__icontains=search)
-            ).distinct()
+                match_all = self.request.query_params.get('tag_mode') == 'all'
+                queryset = queryset.tagged(tag_list, match_all=match_all)
         
+        # Full-text search is applied by ArticleSearchFilter
         return queryset
     
+    def with_viewer_state(self):
+        return (
+            self.action == 'list'
+            and self.request.query_params.get('with_viewer_state', '').lower() in ('1', 'true')
+        )
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['with_viewer_state'] = self.with_viewer_state()
+        return context
+    
+    def get_validator_aggregates(self):
+        aggregates = {}
+        if self.with_viewer_state() and self.request.user.is_authenticated:
+            # The viewer's reactions and bookmarks change neither updated_at
+            # nor (for bookmarks) any counter; checksums over the annotations
+            # make each change move the ETag
+            aggregates.update({
+                'viewer_reactions': Count('my_reaction'),
+                'viewer_reaction_sum': Sum(F('pk') * F('my_reaction')),
+                'viewer_bookmarks': Count('pk', filter=Q(is_bookmarked=True)),
+                'viewer_bookmark_sum': Sum('pk', filter=Q(is_bookmarked=True)),
+            })
+        return aggregates
+    
+    def get_validator_scopes(self):
+        # Bumped by every write to articles, their comments, reactions, tags
+        # and categories (counter shards included), so plain reads validate
+        # without a query
+        if self.action == 'retrieve':
+            return [GLOBAL_SCOPE, ARTICLE_SCOPE.format(self.kwargs['pk'])]
+        return [GLOBAL_SCOPE, ARTICLES_SCOPE]
+    
+    def get_object(self):
+        article = super().get_object()
+        if self.action == 'retrieve':
+            counters.add_unsettled(article)
+        return article
+    
+    def on_not_modified(self, request, *args, **kwargs):
+        # A revalidated article is still a view
+        if self.action == 'retrieve':
+            view_counter.record_view(int(kwargs['pk']))
+    
     def perform_create(self, serializer):
         # Set the author to the current user
         article = serializer.save(author=self.request.user)
@@ -114,6 +193,83 @@ class ArticleViewSet(viewsets.ModelViewSet):
             'article_title': article.title
         })
     
+    def _limit_param(self):
+        limit = self.request.query_params.get('limit')
+        try:
+            return max(1, int(limit)) if limit else None
+        except ValueError:
+            return None
+    
+    def _ranked_response(self, ids):
+        """Render published articles with `ids` in that order, like the list."""
+        queryset = Article.objects.filter(pk__in=ids, status='published').with_feed_data()
+        position = {pk: index for index, pk in enumerate(ids)}
+        if self.use_fast_list():
+            data = serialize_articles(article_rows(queryset), self.request)
+            data.sort(key=lambda item: position[item['id']])
+            return Response(data)
+        articles = sorted(queryset, key=lambda article: position[article.pk])
+        return Response(self.get_serializer(articles, many=True).data)
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def trending(self, request):
+        """
+        Top trending published articles, globally or within `?category=<slug>`;
+        `?limit=` caps the number of results.
+        """
+        category = None
+        if request.query_params.get('category'):
+            category = Category.objects.filter(slug=request.query_params['category']).first()
+            if category is None:
+                return Response([])
+        return self._ranked_response(trending_article_ids(category, self._limit_param()))
+    
+    @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny])
+    def related(self, request, pk=None):
+        """
+        Published articles most similar to this one by tags and category
+        ("read next"); `?limit=` caps the number of results.
+        """
+        try:
+            article_id = int(pk)
+        except ValueError:
+            return Response([])
+        return self._ranked_response(related_article_ids(article_id, self._limit_param()))
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def viewer_state(self, request):
+        """
+        The current user's reaction and bookmark status of the articles in
+        `?ids=1,2,3`, keyed by article id, so that a feed hydrates all of its
+        cards with one request (and two queries) instead of two per card.
+        """
+        try:
+            ids = list(dict.fromkeys(
+                int(pk) for pk in request.query_params.get('ids', '').split(',') if pk.strip()
+            ))
+        except ValueError:
+            raise ValidationError({'ids': 'Must be a comma-separated list of article ids.'})
+        if not ids:
+            raise ValidationError({'ids': 'This parameter is required.'})
+        max_ids = getattr(settings, 'NEWS_VIEWER_STATE_MAX_IDS', 100)
+        if len(ids) > max_ids:
+            raise ValidationError({'ids': f'At most {max_ids} ids are allowed.'})
+        
+        reactions = dict(
+            Reaction.objects.filter(user=request.user, article_id__in=ids)
+            .order_by()
+            .values_list('article_id', 'value')
+        )
+        bookmarked = set(
+            Bookmark.objects.filter(user=request.user, article_id__in=ids)
+            .order_by()
+            .values_list('article_id', flat=True)
+        )
+        return Response({
+            str(pk): {'my_reaction': reactions.get(pk), 'is_bookmarked': pk in bookmarked}
+            for pk in ids
+        })
+    
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def publish(self, request, pk=None):
         """Custom action to publish an article."""
@@ -161,7 +317,52 @@ class ArticleViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class ResponseCacheStatsView(APIView):
+    """
+    Hit/miss counters of the anonymous article response cache (staff only).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_stats())
+
+
+class RequestProfileView(APIView):
+    """
+    A stored request profile (staff only): phase times and the SQL timeline
+    (see pulse_news.profiling).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id):
+        profile = load_profile(profile_id)
+        if profile is None:
+            return Response({"detail": "Profile not found or expired"}, status=status.HTTP_404_NOT_FOUND)
+        data = {key: value for key, value in profile.items() if key != 'speedscope'}
+        return Response({
+            'id': profile_id,
+            **data,
+            'speedscope_url': reverse('request-profile-speedscope', args=[profile_id]),
+        })
+
+
+class RequestProfileSpeedscopeView(APIView):
+    """
+    The call timeline of a stored request profile as a speedscope file
+    (staff only).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id):
+        profile = load_profile(profile_id)
+        if profile is None:
+            return Response({"detail": "Profile not found or expired"}, status=status.HTTP_404_NOT_FOUND)
+        response = HttpResponse(orjson.dumps(profile['speedscope']), content_type='application/json')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.speedscope.json"'
+        return response
+
+
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows categories to be viewed or edited.
     """
@@ -171,6 +372,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter]
     search_fields = ['name', 'description']
     lookup_field = 'slug'
+    versioned = True
     
     def get_permissions(self):
         """
@@ -181,7 +383,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows tags to be viewed or edited.
     """
@@ -191,6 +393,7 @@ class TagViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter]
     search_fields = ['name']
     lookup_field = 'slug'
+    versioned = True
     
     def get_permissions(self):
         """
@@ -201,21 +404,57 @@ class TagViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentThreadMixin:
+    """
+    Threaded comment responses: one level of a thread (top-level comments or
+    the replies of a comment) in cursor pages of thread order, each comment
+    with its reply count and first `?replies=` replies (see news.comment_tree).
+    """
+
+    def can_see_inactive(self):
+        return self.request.user.is_authenticated and self.request.user.can_moderate_content()
+
+    def _reply_preview_param(self):
+        default = getattr(settings, 'NEWS_COMMENT_REPLY_PREVIEW', 3)
+        try:
+            preview = int(self.request.query_params.get('replies', default))
+        except ValueError:
+            preview = default
+        return max(0, min(preview, CommentThreadPagination.max_page_size))
+
+    def thread_response(self, queryset):
+        paginator = CommentThreadPagination()
+        page = paginator.paginate_queryset(queryset.select_related('author__role'), self.request, view=self)
+        context = {**self.get_serializer_context(), 'reply_preview': self._reply_preview_param()}
+        serializer = CommentThreadSerializer(page, many=True, context=context)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class CommentViewSet(CommentThreadMixin, ConditionalGetMixin, SelectablePaginationMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows comments to be viewed or edited.
+    
+    With `?article=` every comment of the article is listed, each with its
+    nested replies. `&mode=flat` lists each visible comment once, in thread
+    order, with its `parent` id and `depth` and without nested replies;
+    `&mode=nested` lists the top-level comments with their reply trees.
+    Both modes build the thread from a single fetch (see
+    news.comment_tree.build_thread).
     """
     serializer_class = CommentSerializer
+    cursor_pagination_class = CommentCursorPagination
     permission_classes = [CanManageComments]
     filter_backends = [filters.OrderingFilter, DjangoFilterBackend]
     ordering_fields = ['created_at', 'updated_at']
     filterset_fields = ['article', 'parent', 'is_active']
+    thread_modes = ('flat', 'nested')
     
     def get_queryset(self):
-        queryset = Comment.objects.all()
+        queryset = Comment.objects.select_related('author__role')
         
-        # For non-moderators, only show active comments
-        if not (self.request.user.is_authenticated and self.request.user.can_moderate_content()):
+        # For non-moderators, only show active comments (thread listings
+        # fetch the inactive ones too and hide them with their replies)
+        if not (self.can_see_inactive() or self.thread_mode()):
             queryset = queryset.filter(is_active=True)
             
         # For article detail, show all comments (including replies)
@@ -225,6 +464,53 @@ class CommentViewSet(viewsets.ModelViewSet):
         # For list view, only show top-level comments
         return queryset.filter(parent__isnull=True)
     
+    def get_validator_queryset(self, queryset):
+        # Replies are nested into the response
+        return Comment.objects.filter(article_id__in=queryset.values('article_id'))
+    
+    def thread_mode(self):
+        """`?mode=` of an article's comment listing, or None."""
+        if self.action != 'list' or 'article' not in self.request.query_params:
+            return None
+        return self.request.query_params.get('mode')
+    
+    def list(self, request, *args, **kwargs):
+        mode = self.thread_mode()
+        if mode is None:
+            return super().list(request, *args, **kwargs)
+        if mode not in self.thread_modes:
+            raise ValidationError({'mode': f'Must be one of: {", ".join(self.thread_modes)}.'})
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(request, queryset, self._thread_list, queryset, mode)
+    
+    def _thread_list(self, request, queryset, mode):
+        comments = build_thread(queryset.order_by('path'), hide_inactive=not self.can_see_inactive())
+        if mode == 'nested':
+            # Replies whose parent was filtered out are roots as well
+            ids = {comment.pk for comment in comments}
+            comments = [comment for comment in comments if comment.parent_id not in ids]
+        # The thread is assembled in memory, so pages are numbered even with ?pagination=cursor
+        paginator = self.pagination_class() if self.pagination_class else None
+        page = paginator.paginate_queryset(comments, request, view=self) if paginator else None
+        if page is not None:
+            comments = page
+        if mode == 'nested':
+            # Serialize every comment once, then link the results
+            comments = [comment for root in comments for comment in iter_subtree(root)]
+        data = FlatCommentSerializer(comments, many=True, context=self.get_serializer_context()).data
+        if mode == 'nested':
+            data = nest_comment_data(data)
+        if page is not None:
+            return paginator.get_paginated_response(data)
+        return Response(data)
+    
+    @action(detail=True, methods=['get'])
+    def replies(self, request, pk=None):
+        """Active direct replies of a comment, threaded (see CommentThreadMixin)."""
+        comments = Comment.objects.all() if self.can_see_inactive() else Comment.objects.filter(is_active=True)
+        parent = get_object_or_404(comments, pk=pk)
+        return self.thread_response(Comment.objects.children(parent).filter(is_active=True))
+    
     def perform_create(self, serializer):
         comment = serializer.save(author=self.request.user)
         
@@ -243,15 +529,18 @@ class ReactionViewSet(viewsets.ModelViewSet):
     permission_classes = [CanRateArticles]
     
     def get_queryset(self):
-        return Reaction.objects.filter(user=self.request.user)
+        return Reaction.objects.filter(user=self.request.user).select_related('user__role')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
-class ArticleCommentViewSet(viewsets.ModelViewSet):
+class ArticleCommentViewSet(CommentThreadMixin, ConditionalGetMixin, SparseFieldsetViewMixin,
+                            SelectablePaginationMixin, viewsets.ModelViewSet):
     """
     API endpoint for comments under a specific article (nested route).
+    Unpaginated unless `?pagination=cursor` is requested; supports
+    `?fields=`/`?expand=`. `threads/` pages through the comments lazily.
     """
     serializer_class = CommentSerializer
     permission_classes = [CanManageComments]
@@ -259,17 +548,29 @@ class ArticleCommentViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'updated_at']
     ordering = ['created_at']
     pagination_class = None  # Disable pagination for comments
+    cursor_pagination_class = CommentCursorPagination
     
     def get_queryset(self):
         article_pk = self.kwargs.get('article_pk')
-        queryset = Comment.objects.filter(article_id=article_pk, parent__isnull=True)
+        queryset = Comment.objects.filter(
+            article_id=article_pk, parent__isnull=True
+        ).select_related('author__role')
         
         # For non-moderators, only show active comments
-        if not (self.request.user.is_authenticated and self.request.user.can_moderate_content()):
+        if not self.can_see_inactive():
             queryset = queryset.filter(is_active=True)
             
         return queryset
     
+    def get_validator_queryset(self, queryset):
+        # Replies are nested into the response
+        return Comment.objects.filter(article_id=self.kwargs.get('article_pk'))
+    
+    @action(detail=False, methods=['get'])
+    def threads(self, request, article_pk=None):
+        """Top-level comments of the article, threaded (see CommentThreadMixin)."""
+        return self.thread_response(self.get_queryset().filter(depth=0))
+    
     def perform_create(self, serializer):
         article_pk = self.kwargs.get('article_pk')
         comment = serializer.save(author=self.request.user, article_id=article_pk)
@@ -284,6 +585,8 @@ class ArticleCommentViewSet(viewsets.ModelViewSet):
 class ArticleReactionViewSet(viewsets.ModelViewSet):
     """
     API endpoint for reactions under a specific article (nested route).
+    Writes are single-statement upserts (see news.reactions); `toggle/` and
+    `clear/` change the current user's reaction without looking it up first.
     """
     serializer_class = ReactionSerializer
     permission_classes = [CanRateArticles]
@@ -292,12 +595,46 @@ class ArticleReactionViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         article_pk = self.kwargs.get('article_pk')
         if self.request.user.is_authenticated:
-            return Reaction.objects.filter(article_id=article_pk, user=self.request.user)
+            return Reaction.objects.filter(
+                article_id=article_pk, user=self.request.user
+            ).select_related('user__role')
         return Reaction.objects.none()
     
     def perform_create(self, serializer):
-        article_pk = self.kwargs.get('article_pk')
-        serializer.save(user=self.request.user, article_id=article_pk)
+        serializer.save(user=self.request.user, article_id=self._article_id())
+    
+    @action(detail=False, methods=['post'])
+    def toggle(self, request, article_pk=None):
+        """
+        Like or dislike (`value`), or take the reaction back when it already
+        is `value`. Returns the new and the previous value.
+        """
+        try:
+            value = int(request.data.get('value'))
+        except (TypeError, ValueError):
+            value = None
+        if value not in (Reaction.LIKE, Reaction.DISLIKE):
+            raise ValidationError({'value': 'Reaction value must be 1 (like) or -1 (dislike).'})
+        current, previous = toggle_reaction(self._article_id(), request.user, value)
+        return Response({'value': current, 'previous': previous})
+    
+    @action(detail=False, methods=['post'])
+    def clear(self, request, article_pk=None):
+        """Remove the current user's reaction, if any; returns the previous value."""
+        previous = clear_reaction(self._article_id(), request.user)
+        return Response({'value': None, 'previous': previous})
+    
+    def _article_id(self):
+        """Id of the article in the URL; 404 when there is no such article."""
+        try:
+            article_id = int(self.kwargs['article_pk'])
+        except ValueError:
+            raise NotFound()
+        # Reactions are written with the bare id, which would otherwise
+        # surface as a foreign key violation
+        if not Article.objects.filter(pk=article_id).exists():
+            raise NotFound()
+        return article_id
     
     @action(detail=False, methods=['get'])
     def my_reaction(self, request, article_pk=None):
@@ -310,15 +647,17 @@ class ArticleReactionViewSet(viewsets.ModelViewSet):
             return Response({'value': None}, status=status.HTTP_200_OK)
 
 
-class BookmarkViewSet(viewsets.ModelViewSet):
+class BookmarkViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
-    API endpoint for user bookmarks.
+    API endpoint for user bookmarks. Supports `?fields=`/`?expand=`.
     """
     serializer_class = BookmarkSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Bookmark.objects.filter(user=self.request.user).select_related('article')
+        return Bookmark.objects.filter(user=self.request.user).select_related(
+            'article__author__role', 'article__category'
+        ).prefetch_related('article__tags')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -0,0 +1,4 @@
+# Load the Celery app so tasks queued from Django use its configuration
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
@@ -6,3 +6,6 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pulse_news.settings')
 app = Celery('pulse_news')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
+
+# Task duration metrics (signal handlers, see pulse_news.metrics)
+from . import metrics  # noqa: E402,F401
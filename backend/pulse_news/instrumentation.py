@@ -0,0 +1,103 @@
+"""
+SQL query instrumentation.
+
+`record_queries()` installs a `connection.execute_wrapper` on every database
+connection and collects, for the duration of the block, the number of
+queries, the total time spent in the database and a count per query
+fingerprint (the SQL with literals and IN lists normalized), so repeated
+queries (N+1) stand out.
+
+`QueryInstrumentationMiddleware` records every request when
+`QUERY_INSTRUMENTATION` is enabled (the default in DEBUG) and reports the
+numbers in response headers:
+
+* ``X-DB-Query-Count``: number of queries;
+* ``X-DB-Time-Ms``: total database time;
+* ``X-DB-Duplicate-Queries``: executions of a fingerprint beyond its first.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST_RE = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Normalize `sql` so executions differing only in parameters compare equal."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_LIST_RE.sub('(...)', sql.replace('%s', '?'))
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """Execute wrapper accumulating query statistics."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Fingerprints executed more than once, with their counts."""
+        return {sql: count for sql, count in self.fingerprints.items() if count > 1}
+
+    @property
+    def duplicate_count(self):
+        return sum(count - 1 for count in self.fingerprints.values())
+
+
+@contextmanager
+def record_queries(using=None):
+    """Record the queries run on `using` (all connections by default)."""
+    recorder = QueryRecorder()
+    aliases = [using] if using else list(connections)
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+class QueryInstrumentationMiddleware:
+    """Adds query count, database time and duplicate counts to responses."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'QUERY_INSTRUMENTATION', settings.DEBUG)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        with record_queries() as recorder:
+            response = self.get_response(request)
+
+        response['X-DB-Query-Count'] = str(recorder.count)
+        response['X-DB-Time-Ms'] = f'{recorder.duration * 1000:.2f}'
+        response['X-DB-Duplicate-Queries'] = str(recorder.duplicate_count)
+        if recorder.duplicates:
+            logger.debug(
+                '%s %s repeated queries: %s', request.method, request.path,
+                '; '.join(f'{count}x {sql}' for sql, count in recorder.duplicates.items()),
+            )
+        return response
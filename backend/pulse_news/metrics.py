@@ -0,0 +1,401 @@
+"""
+Multiprocess metrics in the Prometheus text format.
+
+Every process (gunicorn worker, Celery worker) adds to its own
+memory-mapped file in `METRICS_DIR`, named after its pid, so recording is a
+locked in-place float update with no IPC. `/metrics` reads all files in the
+directory and sums the samples, so the numbers cover every worker that
+shares the directory (and survive worker restarts).
+
+A process holds an exclusive `flock` on its file while it runs. On every
+scrape, the files of exited processes (their lock is free) are added to
+`merged.db` and removed, so the directory does not fill up with dead pids
+(the idea of prometheus_client's ``mark_process_dead``). Without `fcntl`
+(Windows) the files are kept.
+
+Recorded:
+
+* ``http_requests_total{view, method, status}``;
+* ``http_request_duration_seconds{view, method}`` (histogram);
+* ``db_queries_total{view}`` and ``db_query_duration_seconds_total{view}``;
+* ``response_cache_requests_total{result}`` and the derived
+  ``response_cache_hit_ratio`` (see news.response_cache);
+* ``celery_task_duration_seconds{task, state}`` (histogram), e.g. for
+  ``news.tasks.parse_and_create_article``.
+
+The view label is the URL name (e.g. ``article-list``), which keeps the
+number of series bounded. `/metrics` only answers `METRICS_ALLOWED_IPS`.
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+INITIAL_SIZE = 1 << 16
+USED = struct.Struct('<Q')
+KEY_LENGTH = struct.Struct('<I')
+VALUE = struct.Struct('<d')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+MERGED_FILE = 'merged.db'
+MERGE_LOCK_FILE = 'merge.lock'
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None) or os.path.join(tempfile.gettempdir(), 'pulse_news_metrics')
+
+
+def _entries(buffer, used):
+    """Yield (key, value, value offset) of the entries of a metrics file."""
+    position = USED.size
+    while position < used:
+        length = KEY_LENGTH.unpack_from(buffer, position)[0]
+        key = bytes(buffer[position + KEY_LENGTH.size:position + KEY_LENGTH.size + length]).decode()
+        position += _padded(length)
+        yield key, VALUE.unpack_from(buffer, position)[0], position
+        position += VALUE.size
+
+
+def _padded(length):
+    """Size of a key record; keeps the following value 8-byte aligned."""
+    size = KEY_LENGTH.size + length
+    return size + (-size % 8)
+
+
+class MetricsFile:
+    """
+    Float values by key in a growing memory-mapped file. Entries are
+    appended and then published by updating the used size in the header,
+    so readers never see a partial entry.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.file = os.fdopen(fd, 'r+b')
+        size = os.fstat(fd).st_size
+        if size < INITIAL_SIZE:
+            self.file.truncate(INITIAL_SIZE)
+            size = INITIAL_SIZE
+        self.map = mmap.mmap(fd, size)
+        self.used = USED.unpack_from(self.map, 0)[0] or USED.size
+        self.positions = {key: position for key, _, position in _entries(self.map, self.used)}
+
+    def _add(self, key):
+        encoded = key.encode()
+        position = self.used + _padded(len(encoded))
+        end = position + VALUE.size
+        if end > len(self.map):
+            size = max(len(self.map) * 2, end)
+            self.map.close()
+            self.file.truncate(size)
+            self.map = mmap.mmap(self.file.fileno(), size)
+        KEY_LENGTH.pack_into(self.map, self.used, len(encoded))
+        self.map[self.used + KEY_LENGTH.size:self.used + KEY_LENGTH.size + len(encoded)] = encoded
+        VALUE.pack_into(self.map, position, 0.0)
+        self.used = end
+        USED.pack_into(self.map, 0, self.used)
+        self.positions[key] = position
+        return position
+
+    def inc(self, key, amount):
+        with self.lock:
+            position = self.positions.get(key)
+            if position is None:
+                position = self._add(key)
+            VALUE.pack_into(self.map, position, VALUE.unpack_from(self.map, position)[0] + amount)
+
+    def claim(self):
+        """
+        Lock the file for this process until it exits. False if a scrape
+        merged and removed it meanwhile; open the path again then.
+        """
+        if fcntl is None:
+            return True
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        try:
+            return os.stat(self.path).st_ino == os.fstat(self.file.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def read_file(path):
+    """{key: value} of a metrics file written by any process."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < USED.size:
+        return {}
+    return {key: value for key, value, _ in _entries(data, USED.unpack_from(data, 0)[0])}
+
+
+class Registry:
+    """The metrics file of the current process, reopened after a fork."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.owner = None
+        self.file = None
+
+    def _file(self):
+        owner = (os.getpid(), metrics_dir())
+        if self.owner != owner:
+            with self.lock:
+                if self.owner != owner:
+                    os.makedirs(owner[1], exist_ok=True)
+                    path = os.path.join(owner[1], f'{owner[0]}.db')
+                    file = MetricsFile(path)
+                    while not file.claim():
+                        file.close()
+                        file = MetricsFile(path)
+                    if self.file is not None:
+                        # The parent's file after a fork, or the old directory
+                        self.file.close()
+                    self.file = file
+                    self.owner = owner
+        return self.file
+
+    def inc(self, name, labels, amount=1.0):
+        if getattr(settings, 'METRICS_ENABLED', True):
+            self._file().inc(json.dumps([name, labels], sort_keys=True), amount)
+
+
+registry = Registry()
+METRICS = {}
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        METRICS[name] = self
+
+    def inc(self, amount=1.0, **labels):
+        registry.inc(self.name, labels, amount)
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        METRICS[name] = self
+
+    def observe(self, value, **labels):
+        # Buckets are stored non-cumulative, one write per observation
+        bound = next((bucket for bucket in self.buckets if value <= bucket), math.inf)
+        registry.inc(f'{self.name}_bucket', {**labels, 'le': _format_value(bound)})
+        registry.inc(f'{self.name}_sum', labels, value)
+        registry.inc(f'{self.name}_count', labels)
+
+
+REQUESTS = Counter('http_requests_total', 'HTTP requests by view, method and status.')
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'HTTP request latency by view and method.')
+DB_QUERIES = Counter('db_queries_total', 'SQL queries run by requests, by view.')
+DB_DURATION = Counter('db_query_duration_seconds_total', 'Time spent in SQL queries by requests, by view.')
+RESPONSE_CACHE = Counter('response_cache_requests_total', 'Anonymous response cache lookups by result.')
+TASK_DURATION = Histogram('celery_task_duration_seconds', 'Celery task run time by task and final state.')
+
+
+# Collection
+
+def _merge_dead_files(directory):
+    """Add the files of exited processes to `MERGED_FILE` and remove them."""
+    merged = None
+    try:
+        for filename in os.listdir(directory):
+            if not (filename.endswith('.db') and filename[:-3].isdigit()):
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            with os.fdopen(fd, 'rb') as f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # Its process is still running
+                if merged is None:
+                    merged = MetricsFile(os.path.join(directory, MERGED_FILE))
+                for key, value in read_file(path).items():
+                    merged.inc(key, value)
+                os.unlink(path)
+    finally:
+        if merged is not None:
+            merged.close()
+
+
+def collect():
+    """Sum the samples of every process: {(sample name, labels tuple): value}."""
+    totals = defaultdict(float)
+    directory = metrics_dir()
+    if not os.path.isdir(directory):
+        return totals
+    with ExitStack() as stack:
+        if fcntl is not None:
+            # One scrape at a time merges and reads, so nothing is counted twice
+            lock = stack.enter_context(open(os.path.join(directory, MERGE_LOCK_FILE), 'a'))
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            _merge_dead_files(directory)
+        for filename in os.listdir(directory):
+            if not filename.endswith('.db'):
+                continue
+            try:
+                values = read_file(os.path.join(directory, filename))
+            except OSError:
+                continue
+            for key, value in values.items():
+                name, labels = json.loads(key)
+                totals[name, tuple(sorted(labels.items()))] += value
+    return totals
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(float(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _sample(name, labels, value):
+    label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels)
+    return f'{name}{{{label_text}}} {_format_value(value)}' if label_text else f'{name} {_format_value(value)}'
+
+
+def _histogram_lines(metric, samples):
+    lines = []
+    series = defaultdict(dict)
+    for (name, labels), value in samples.items():
+        if name == f'{metric.name}_bucket':
+            labels = dict(labels)
+            bound = labels.pop('le')
+            series[tuple(sorted(labels.items()))][float(bound)] = value
+    for labels in sorted(series):
+        cumulative = 0.0
+        for bound in metric.buckets:
+            cumulative += series[labels].get(float(bound), 0.0)
+            lines.append(_sample(f'{metric.name}_bucket', labels + (('le', _format_value(bound)),), cumulative))
+        lines.append(_sample(f'{metric.name}_sum', labels, samples.get((f'{metric.name}_sum', labels), 0.0)))
+        lines.append(_sample(f'{metric.name}_count', labels, samples.get((f'{metric.name}_count', labels), 0.0)))
+    return lines
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    samples = collect()
+    lines = []
+    for metric in METRICS.values():
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        if metric.type == 'histogram':
+            lines.extend(_histogram_lines(metric, samples))
+        else:
+            lines.extend(
+                _sample(name, labels, value)
+                for (name, labels), value in sorted(samples.items()) if name == metric.name
+            )
+
+    hits = samples.get((RESPONSE_CACHE.name, (('result', 'hit'),)), 0.0)
+    misses = samples.get((RESPONSE_CACHE.name, (('result', 'miss'),)), 0.0)
+    lines.append('# HELP response_cache_hit_ratio Share of anonymous response cache lookups that hit.')
+    lines.append('# TYPE response_cache_hit_ratio gauge')
+    lines.append(_sample('response_cache_hit_ratio', (), hits / (hits + misses) if hits + misses else 0.0))
+    return '\n'.join(lines) + '\n'
+
+
+# Recording
+
+class _QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """Records latency, status and SQL statistics of every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        timer = _QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match.route) if match else 'unresolved'
+        REQUESTS.inc(view=view, method=request.method, status=str(response.status_code))
+        REQUEST_DURATION.observe(duration, view=view, method=request.method)
+        if timer.count:
+            DB_QUERIES.inc(timer.count, view=view)
+            DB_DURATION.inc(timer.duration, view=view)
+        return response
+
+
+_task_starts = {}
+
+
+@task_prerun.connect
+def _task_started(task_id=None, **kwargs):
+    _task_starts[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _task_finished(task_id=None, task=None, state=None, **kwargs):
+    start = _task_starts.pop(task_id, None)
+    if start is not None:
+        TASK_DURATION.observe(time.perf_counter() - start, task=task.name, state=state or 'UNKNOWN')
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; only answers `METRICS_ALLOWED_IPS`."""
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1')):
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,265 @@
+"""
+Per-request profiling for staff.
+
+A staff user (authenticated by JWT) can profile any ``/api/v1/`` request by
+sending ``X-Profile: 1`` or ``?_profile=1``. The request then runs under a
+deterministic profiler (`sys.setprofile`) and a query recorder, and the
+result is stored in the cache for `REQUEST_PROFILER_TTL` seconds:
+
+* a call timeline in the speedscope "evented" format
+  (https://www.speedscope.app), viewable as a flame chart;
+* every SQL statement with its start, duration and Python call site;
+* the time spent in authentication, permission checks, throttling,
+  serializers and rendering (database time overlaps these).
+
+The response carries ``X-Profile-Id`` and ``X-Profile-Url`` headers pointing
+at the stored report. With ``X-Profile: speedscope`` (or
+``?_profile=speedscope``) the speedscope file is returned instead of the
+response. Other users' profiling requests are ignored.
+
+The profiler records every Python and C call, so a profiled request runs
+several times slower than usual; compare phases relative to each other.
+"""
+import sys
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+import orjson
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+
+from . import instrumentation, metrics
+from .instrumentation import fingerprint
+
+PROFILE_KEY = 'request-profile:{}'
+HEADER = 'HTTP_X_PROFILE'
+QUERY_PARAM = '_profile'
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+# Timeline events kept per profile (a few MB in the cache); later calls are
+# left out and the report is marked truncated
+MAX_EVENTS = 50_000
+# Query wrappers, never the interesting call site
+WRAPPER_FILES = {__file__, instrumentation.__file__, metrics.__file__}
+
+# (phase, file suffix, function names or None for every function in the file)
+PHASE_RULES = (
+    ('authentication', 'rest_framework/views.py', {'perform_authentication'}),
+    ('permissions', 'rest_framework/views.py', {'check_permissions', 'check_object_permissions'}),
+    ('throttling', 'rest_framework/views.py', {'check_throttles'}),
+    ('rendering', 'rest_framework/response.py', {'rendered_content'}),
+    ('serialization', 'rest_framework/serializers.py', None),
+    ('serialization', 'news/fast_list.py', {'serialize_articles'}),
+)
+
+
+def _phase(filename, qualname):
+    filename = filename.replace('\\', '/')
+    name = qualname.rpartition('.')[2]
+    for phase, suffix, names in PHASE_RULES:
+        if filename.endswith(suffix) and (names is None or name in names):
+            return phase
+    return None
+
+
+def call_site(frame):
+    """Project frames (innermost first) above `frame`, as "path:line in function"."""
+    sites = []
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(PROJECT_ROOT) and 'site-packages' not in filename
+                and filename not in WRAPPER_FILES):
+            sites.append(
+                f'{Path(filename).relative_to(PROJECT_ROOT).as_posix()}:{frame.f_lineno} in {frame.f_code.co_name}'
+            )
+        frame = frame.f_back
+    return sites
+
+
+class RequestProfiler:
+    """Collects the call timeline, SQL statements and phase times of a request."""
+
+    def __init__(self):
+        self.frames = []
+        self.frame_index = {}
+        self.events = []
+        self.stack = []
+        self.phases = {}
+        self.open_phase = None
+        self.queries = []
+        self.truncated = False
+        self.start = self.end = None
+
+    def _frame(self, key, name, filename, line):
+        index = self.frame_index.get(key)
+        if index is None:
+            index = self.frame_index[key] = len(self.frames)
+            self.frames.append({'name': name, 'file': filename, 'line': line, 'phase': _phase(filename, name)})
+        return index
+
+    def _callback(self, frame, event, arg):
+        now = time.perf_counter()
+        if event == 'call':
+            code = frame.f_code
+            self._open(self._frame(code, code.co_qualname, code.co_filename, code.co_firstlineno), now)
+        elif event == 'c_call':
+            # Bound builtin methods are new objects on every call; key them by name
+            module = getattr(arg, '__module__', None) or ''
+            name = getattr(arg, '__qualname__', None) or repr(arg)
+            self._open(self._frame((module, name), name, module, None), now)
+        elif self.stack:
+            # return, c_return, c_exception; frames entered before start are not on the stack
+            index = self.stack.pop()
+            if index is not None:
+                self.events.append(('C', index, now))
+            if self.open_phase and self.open_phase[1] == len(self.stack):
+                phase, _, started = self.open_phase
+                self.phases[phase] = self.phases.get(phase, 0.0) + now - started
+                self.open_phase = None
+
+    def _open(self, index, now):
+        if len(self.events) >= MAX_EVENTS:
+            # Keep the stack balanced but stop growing the timeline
+            self.truncated = True
+            self.stack.append(None)
+            return
+        phase = self.frames[index]['phase']
+        if phase and self.open_phase is None:
+            self.open_phase = (phase, len(self.stack), now)
+        self.stack.append(index)
+        self.events.append(('O', index, now))
+
+    def _execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            sites = call_site(sys._getframe(1))
+            self.queries.append({
+                'sql': sql,
+                'fingerprint': fingerprint(sql),
+                'start_ms': round((started - self.start) * 1000, 3),
+                'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+                'call_site': sites[0] if sites else None,
+                'stack': sites[:8],
+            })
+
+    def run(self, func, *args):
+        """Call `func(*args)` under the profiler and return its result."""
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(self._execute))
+            self.start = time.perf_counter()
+            sys.setprofile(self._callback)
+            try:
+                return func(*args)
+            finally:
+                sys.setprofile(None)
+                self.end = time.perf_counter()
+                while self.stack:
+                    index = self.stack.pop()
+                    if index is not None:
+                        self.events.append(('C', index, self.end))
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def speedscope(self, name):
+        """The call timeline as a speedscope file (a JSON-serializable dict)."""
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'name': name,
+            'exporter': 'pulse_news.profiling',
+            'shared': {'frames': [
+                {key: value for key, value in frame.items() if key != 'phase' and value is not None}
+                for frame in self.frames
+            ]},
+            'profiles': [{
+                'type': 'evented',
+                'name': name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': round(self.duration * 1000, 4),
+                'events': [
+                    {'type': kind, 'frame': index, 'at': round((at - self.start) * 1000, 4)}
+                    for kind, index, at in self.events
+                ],
+            }],
+        }
+
+    def report(self):
+        """Summary of the request: phase times and the SQL timeline."""
+        phases = {phase: round(seconds * 1000, 3) for phase, seconds in sorted(self.phases.items())}
+        return {
+            'duration_ms': round(self.duration * 1000, 3),
+            'phases_ms': phases,
+            'database': {
+                'count': len(self.queries),
+                'duration_ms': round(sum(query['duration_ms'] for query in self.queries), 3),
+            },
+            'queries': self.queries,
+            'truncated': self.truncated,
+        }
+
+
+def save_profile(data, timeout=None):
+    profile_id = uuid.uuid4().hex
+    if timeout is None:
+        timeout = getattr(settings, 'REQUEST_PROFILER_TTL', 3600)
+    cache.set(PROFILE_KEY.format(profile_id), data, timeout=timeout)
+    return profile_id
+
+
+def load_profile(profile_id):
+    return cache.get(PROFILE_KEY.format(profile_id))
+
+
+def _is_staff(request):
+    """Authenticate the JWT of `request` (views have not run yet)."""
+    from rest_framework.exceptions import APIException
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except APIException:
+        return False
+    return bool(result and result[0].is_staff)
+
+
+class RequestProfilerMiddleware:
+    """Profiles staff requests that ask for it (see the module docstring)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_PROFILER', True)
+
+    def __call__(self, request):
+        mode = request.META.get(HEADER) or request.GET.get(QUERY_PARAM)
+        if not (self.enabled and mode and request.path.startswith('/api/v1/') and _is_staff(request)):
+            return self.get_response(request)
+
+        profiler = RequestProfiler()
+        response = profiler.run(self.get_response, request)
+        name = f'{request.method} {request.get_full_path()}'
+        speedscope = profiler.speedscope(name)
+        profile_id = save_profile({
+            'request': name,
+            'status': response.status_code,
+            'created_at': timezone.now().isoformat(),
+            **profiler.report(),
+            'speedscope': speedscope,
+        })
+
+        if mode == 'speedscope':
+            response = HttpResponse(orjson.dumps(speedscope), content_type='application/json')
+            response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.speedscope.json"'
+        response['X-Profile-Id'] = profile_id
+        response['X-Profile-Url'] = reverse('request-profile', args=[profile_id])
+        return response
@@ -30,6 +30,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Right below security, so queries of the other middleware are counted too
+    'pulse_news.instrumentation.QueryInstrumentationMiddleware',
+    'pulse_news.metrics.MetricsMiddleware',
+    'pulse_news.profiling.RequestProfilerMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -39,6 +43,22 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request SQL query count, time and duplicate headers
+# (see pulse_news.instrumentation)
+QUERY_INSTRUMENTATION = os.getenv('QUERY_INSTRUMENTATION', str(DEBUG)) == 'True'
+
+# Staff-triggered request profiles (X-Profile header or ?_profile=) and how
+# long they are kept in the cache, in seconds (see pulse_news.profiling)
+REQUEST_PROFILER = os.getenv('REQUEST_PROFILER', 'True') == 'True'
+REQUEST_PROFILER_TTL = int(os.getenv('REQUEST_PROFILER_TTL', 3600))
+
+# Prometheus metrics at /metrics (see pulse_news.metrics). Every process
+# writes a file to METRICS_DIR; gunicorn and Celery workers that share the
+# directory are aggregated. Empty means a directory under the system temp dir.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+
 ROOT_URLCONF = 'pulse_news.urls'
 
 TEMPLATES = [
@@ -120,7 +140,8 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        # Byte-compatible with rest_framework.renderers.JSONRenderer
+        'news.renderers.ORJSONRenderer',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 12,
@@ -151,10 +172,94 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Article search backend: 'auto' uses PostgreSQL full-text search when
+# available (see news.search)
+NEWS_SEARCH_BACKEND = os.getenv('NEWS_SEARCH_BACKEND', 'auto')
+
+# On-disk inverted index used by NEWS_SEARCH_BACKEND='segment'
+# (see news.search_index); must be shared by web and Celery workers
+NEWS_SEARCH_INDEX_DIR = os.getenv('NEWS_SEARCH_INDEX_DIR', str(BASE_DIR / 'search_index'))
+# Segment index searches return the best this many matches that pass the
+# list filters
+NEWS_SEARCH_INDEX_MAX_HITS = int(os.getenv('NEWS_SEARCH_INDEX_MAX_HITS', '1000'))
+NEWS_SEARCH_INDEX_MERGE_INTERVAL = int(os.getenv('NEWS_SEARCH_INDEX_MERGE_INTERVAL', '300'))
+
+# Cache shared by gunicorn workers and Celery (view counter buffer etc.);
+# set CACHE_URL (e.g. redis://localhost:6379/2) wherever more than one
+# process serves the site. Without it each process keeps its own LocMem cache
+CACHE_URL = os.getenv('CACHE_URL')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+    } if CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Build /articles/ list pages from .values() rows instead of
+# ArticleListSerializer (see news.fast_list)
+NEWS_ARTICLE_LIST_FAST_PATH = os.getenv('NEWS_ARTICLE_LIST_FAST_PATH', 'True') == 'True'
+
+# Anonymous article list/detail responses are cached for this many seconds
+# (0 disables the cache, see news.response_cache)
+NEWS_RESPONSE_CACHE_TIMEOUT = int(os.getenv('NEWS_RESPONSE_CACHE_TIMEOUT', '60'))
+
+# Replies embedded under each comment of the threaded comment API unless
+# ?replies= asks for another number (see news.comment_tree)
+NEWS_COMMENT_REPLY_PREVIEW = int(os.getenv('NEWS_COMMENT_REPLY_PREVIEW', '3'))
+
+# Most articles `/articles/viewer_state/?ids=` answers for at once
+NEWS_VIEWER_STATE_MAX_IDS = int(os.getenv('NEWS_VIEWER_STATE_MAX_IDS', '100'))
+
 # Celery settings
 CELERY_BROKER_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/1')
 CELERY_RESULT_BACKEND = os.getenv('REDIS_URL', 'redis://localhost:6379/1')
 
+# Buffered article views are written to the database by Celery beat
+VIEW_COUNT_FLUSH_INTERVAL = int(os.getenv('VIEW_COUNT_FLUSH_INTERVAL', '10'))
+
+# Above 1, counter increments (likes, dislikes, comments, views) go to one of
+# this many rows per article instead of the article row (see news.counters);
+# lists see them once compacted, every NEWS_COUNTER_COMPACT_INTERVAL seconds
+NEWS_COUNTER_SHARDS = int(os.getenv('NEWS_COUNTER_SHARDS', '0'))
+NEWS_COUNTER_COMPACT_INTERVAL = int(os.getenv('NEWS_COUNTER_COMPACT_INTERVAL', '5'))
+
+# Trending articles (see news.trending): scores of articles published in the
+# last NEWS_TRENDING_WINDOW_HOURS, recomputed every NEWS_TRENDING_INTERVAL seconds
+NEWS_TRENDING_INTERVAL = int(os.getenv('NEWS_TRENDING_INTERVAL', '300'))
+NEWS_TRENDING_WINDOW_HOURS = int(os.getenv('NEWS_TRENDING_WINDOW_HOURS', '72'))
+NEWS_TRENDING_HALF_LIFE_HOURS = float(os.getenv('NEWS_TRENDING_HALF_LIFE_HOURS', '12'))
+NEWS_TRENDING_TOP_N = int(os.getenv('NEWS_TRENDING_TOP_N', '100'))
+
+# Related articles per article (see news.related); the table is updated
+# incrementally and rebuilt every NEWS_RELATED_ARTICLES_REBUILD_INTERVAL seconds
+NEWS_RELATED_ARTICLES_COUNT = int(os.getenv('NEWS_RELATED_ARTICLES_COUNT', '10'))
+NEWS_RELATED_ARTICLES_REBUILD_INTERVAL = int(os.getenv('NEWS_RELATED_ARTICLES_REBUILD_INTERVAL', '86400'))
+
+CELERY_BEAT_SCHEDULE = {
+    'flush-article-views': {
+        'task': 'news.tasks.flush_article_views',
+        'schedule': timedelta(seconds=VIEW_COUNT_FLUSH_INTERVAL),
+    },
+    'compact-counter-shards': {
+        'task': 'news.tasks.compact_counter_shards',
+        'schedule': timedelta(seconds=NEWS_COUNTER_COMPACT_INTERVAL),
+    },
+    'merge-search-index': {
+        'task': 'news.tasks.merge_search_index',
+        'schedule': timedelta(seconds=NEWS_SEARCH_INDEX_MERGE_INTERVAL),
+    },
+    'compute-trending-scores': {
+        'task': 'news.tasks.compute_trending_scores',
+        'schedule': timedelta(seconds=NEWS_TRENDING_INTERVAL),
+    },
+    'rebuild-related-articles': {
+        'task': 'news.tasks.rebuild_related_articles',
+        'schedule': timedelta(seconds=NEWS_RELATED_ARTICLES_REBUILD_INTERVAL),
+    },
+}
+
 # Logging
 LOGGING = {
     'version': 1,
@@ -16,6 +16,12 @@ DATABASES = {
 }
 
 # Redis configuration for Docker
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://:redispass123@redis:6379/2',
+    }
+}
 CELERY_BROKER_URL = 'redis://:redispass123@redis:6379/1'
 CELERY_RESULT_BACKEND = 'redis://:redispass123@redis:6379/1'
 
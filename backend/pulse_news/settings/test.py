@@ -1,3 +1,5 @@
+import tempfile
+
 from .base import *
 
 DEBUG = True
@@ -27,3 +29,11 @@ CACHES = {
 ALLOWED_HOSTS = ['testserver', 'localhost', '127.0.0.1']
 
 MEDIA_ROOT = BASE_DIR / 'test_media'
+
+# Run tasks queued by signals in-process (no broker in tests)
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_BROKER_URL = 'memory://'
+CELERY_RESULT_BACKEND = None
+
+# Keep metrics files of test runs out of the shared directory
+METRICS_DIR = tempfile.mkdtemp(prefix='pulse-news-metrics-')
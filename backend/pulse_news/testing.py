@@ -0,0 +1,52 @@
+"""
+Test helpers shared by the apps' test suites.
+"""
+from django.core.cache import cache
+
+from .instrumentation import record_queries
+
+DATASET_SIZES = (1, 5, 20)
+
+
+class QueryBudgetMixin:
+    """
+    `assertQueryBudget` runs a request against growing datasets and fails
+    when any run exceeds the budget, so per-row queries (N+1) are caught.
+    """
+    dataset_sizes = DATASET_SIZES
+
+    def grow(self, size):
+        """Extend the dataset to `size` rows per table; subclasses override."""
+
+    def assertQueryBudget(self, budget, request, status=None, prepare=None, warm=False):
+        """
+        Fail if `request()` runs more than `budget` queries at any dataset
+        size; `prepare()` runs (unrecorded) after the dataset was grown. With
+        `warm` the request also runs once unrecorded first, so cached
+        responses are measured.
+        """
+        runs = []
+        for size in self.dataset_sizes:
+            self.grow(size)
+            if prepare is not None:
+                prepare()
+            cache.clear()
+            if warm:
+                request()
+            with record_queries() as recorder:
+                response = request()
+            if status is not None:
+                self.assertEqual(response.status_code, status, getattr(response, 'data', response))
+            else:
+                self.assertLess(response.status_code, 400, getattr(response, 'data', response))
+            runs.append((size, recorder))
+
+        over = [(size, recorder) for size, recorder in runs if recorder.count > budget]
+        if over:
+            size, recorder = over[-1]
+            self.fail(
+                f'{recorder.count} queries with {size} rows, budget is {budget} '
+                f'(counts per size: {[(s, r.count) for s, r in runs]}); repeated: '
+                + '; '.join(f'{count}x {sql}' for sql, count in recorder.duplicates.items())
+            )
+        return runs[-1][1]
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from pulse_news.metrics import metrics_view
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -27,6 +28,9 @@ urlpatterns = [
     # API v1
     path('api/v1/', include(api_patterns)),
     
+    # Prometheus metrics (local scrapes only)
+    path('metrics', metrics_view, name='metrics'),
+    
     # DRF Browsable API auth (for testing)
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
 ]
@@ -50,10 +50,7 @@ class ReactionService {
 
   async removeArticleReaction(articleId: number): Promise<void> {
     try {
-      const reaction = await this.getArticleReaction(articleId);
-      if (reaction) {
-        await this.deleteReaction(articleId, reaction.id);
-      }
+      await api.post(`/articles/${articleId}/reactions/clear/`);
     } catch (error) {
       console.error('Failed to remove reaction:', error);
       throw error;